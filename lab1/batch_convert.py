@@ -0,0 +1,181 @@
+import argparse
+import os
+import re
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import color_engine
+
+DEFAULT_CHUNK_SIZE = 50000
+
+COLUMNS = ['input',
+           'r', 'g', 'b',
+           'c', 'm', 'y', 'k',
+           'hsv_h', 'hsv_s', 'hsv_v',
+           'hls_h', 'hls_l', 'hls_s',
+           'x', 'y', 'z',
+           'lab_l', 'lab_a', 'lab_b']
+
+# Допустимые значения каналов по моделям; XYZ - до опорного белого D65
+CHANNEL_RANGES = {
+    'rgb': ((0, 255),) * 3,
+    'cmyk': ((0, 100),) * 4,
+    'hsv': ((0, 360), (0, 100), (0, 100)),
+    'hls': ((0, 360), (0, 100), (0, 100)),
+    'xyz': tuple((0, white) for white in color_engine.REF_WHITE),
+    'lab': ((0, 100), (-128, 127), (-128, 127)),
+}
+
+_SEPARATORS = re.compile(r'[,;\s]+')
+_HEX = re.compile(r'#?([0-9a-fA-F]{6}|[0-9a-fA-F]{3})')
+
+
+def parse_line(line: str, src: str = 'rgb') -> Optional[List[float]]:
+    """HEX-код (#RRGGBB, RRGGBB, #RGB) или значения через запятую/пробел.
+
+    None, если строку не удалось разобрать или значения вне диапазонов
+    CHANNEL_RANGES; RGB должен быть целым.
+    """
+    text = line.strip()
+    match = _HEX.fullmatch(text)
+    if match:
+        digits = match.group(1)
+        if len(digits) == 3:
+            digits = ''.join(d * 2 for d in digits)
+        return [int(digits[i:i+2], 16) for i in (0, 2, 4)]
+    try:
+        values = [float(part) for part in _SEPARATORS.split(text) if part]
+    except ValueError:
+        return None
+    if len(values) != color_engine.CHANNELS[src]:
+        return None
+    if not all(lo <= v <= hi for v, (lo, hi) in zip(values, CHANNEL_RANGES[src])):
+        return None
+    if src == 'rgb':
+        if not all(v.is_integer() for v in values):
+            return None
+        return [int(v) for v in values]
+    return values
+
+
+def convert_lines(lines: List[Tuple[int, str]], src: str = 'rgb',
+                  precision: int = 4) -> Tuple[str, int, List[Tuple[int, str]]]:
+    """Обработать порцию пронумерованных строк.
+
+    Возвращает текст CSV, число цветов и список строк, которые не удалось
+    разобрать или значения которых вне диапазонов модели.
+    """
+    names, models, colors, errors = [], [], [], []
+    for number, line in lines:
+        text = line.strip()
+        if not text:
+            continue
+        values = parse_line(text, src)
+        if values is None:
+            errors.append((number, line.rstrip('\n')))
+            continue
+        names.append(text)
+        # HEX всегда задаёт RGB, даже если остальные строки в другой модели
+        models.append('rgb' if _HEX.fullmatch(text) else src)
+        colors.append(values)
+    if not colors:
+        return '', 0, errors
+
+    is_src = np.array(models) == src
+    rgb = np.array([c if m == 'rgb' else [0, 0, 0] for m, c in zip(models, colors)], dtype=np.int64)
+    if src != 'rgb' and is_src.any():
+        source_values = np.array([c for m, c in zip(models, colors) if m == src])
+        rgb[is_src] = color_engine.convert(source_values, src, 'rgb')
+
+    result = color_engine.rgb_to_all_batch(rgb)
+    # Исходная модель сохраняет введённые значения, как и в интерфейсе
+    if src != 'rgb' and is_src.any():
+        result[src][is_src] = source_values
+
+    table = np.hstack([result[model] for model in color_engine.MODELS]).tolist()
+    # Исходная строка может содержать запятые, поэтому берётся в кавычки
+    row_format = ','.join(['"%s"'] + ['%d'] * 3 + [f'%.{precision}f'] * (len(COLUMNS) - 4)) + '\n'
+    text = ''.join(row_format % ((name,) + tuple(row)) for name, row in zip(names, table))
+    return text, len(colors), errors
+
+
+def iter_chunks(lines: Iterable[str], chunk_size: int) -> Iterator[List[Tuple[int, str]]]:
+    numbered = enumerate(lines, start=1)
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run(input_stream, output_stream, src: str = 'rgb', workers: int = 1,
+        chunk_size: int = DEFAULT_CHUNK_SIZE, precision: int = 4,
+        skip_header: bool = False, error_stream=sys.stderr, max_errors_shown: int = 20) -> Tuple[int, int]:
+    """Потоковое преобразование; в памяти не больше 2 * workers порций сразу"""
+    if skip_header:
+        next(input_stream, None)
+    output_stream.write(','.join(COLUMNS) + '\n')
+
+    converted, failed = 0, 0
+
+    def write(result):
+        nonlocal converted, failed
+        text, count, errors = result
+        output_stream.write(text)
+        converted += count
+        for number, line in errors:
+            if failed < max_errors_shown:
+                error_stream.write(f"Строка {number}: не удалось разобрать или значения вне диапазона {line!r}\n")
+            failed += 1
+
+    chunks = iter_chunks(input_stream, chunk_size)
+    if workers <= 1:
+        for chunk in chunks:
+            write(convert_lines(chunk, src, precision))
+        return converted, failed
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(pool.submit(convert_lines, chunk, src, precision))
+            if len(in_flight) >= 2 * workers:
+                write(in_flight.popleft().result())
+        while in_flight:
+            write(in_flight.popleft().result())
+    return converted, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Пакетное преобразование списка цветов (HEX или CSV) во все цветовые модели")
+    parser.add_argument('input', help="файл со цветами, '-' - стандартный ввод")
+    parser.add_argument('-o', '--output', default='-', help="CSV-файл результата, '-' - стандартный вывод")
+    parser.add_argument('--from', dest='src', default='rgb', choices=color_engine.MODELS,
+                        help="модель значений в CSV-строках (HEX всегда RGB)")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--precision', type=int, default=4)
+    parser.add_argument('--skip-header', action='store_true')
+    args = parser.parse_args()
+
+    input_stream = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    output_stream = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8', newline='')
+    try:
+        converted, failed = run(input_stream, output_stream, args.src, args.workers,
+                                args.chunk_size, args.precision, args.skip_header)
+    finally:
+        if input_stream is not sys.stdin:
+            input_stream.close()
+        if output_stream is not sys.stdout:
+            output_stream.close()
+    print(f"Преобразовано цветов: {converted}, ошибок: {failed}", file=sys.stderr)
+    return 1 if failed and not converted else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
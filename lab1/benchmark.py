@@ -0,0 +1,296 @@
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+import color_cache
+import color_engine
+
+MODES = ('scalar', 'memo', 'batch', 'cycle', 'cached')
+PAIRS = tuple(color_engine.SCALAR_CONVERSIONS)
+DEFAULT_SEED = 12345
+DEFAULT_COLORS = 20000
+DEFAULT_BATCH = 65536
+DEFAULT_REPEAT = 20
+# Рабочий набор для режима с кэшем: при движении слайдера цвета повторяются
+DEFAULT_WORKING_SET = 512
+DEFAULT_CYCLE_STEPS = 200
+# Диапазоны и шаг слайдеров lab1.py по каналам: значения цикла берутся из них
+SLIDER_RANGES = {
+    'rgb': ((0, 255),) * 3,
+    'cmyk': ((0, 100),) * 4,
+    'hsv': ((0, 360), (0, 100), (0, 100)),
+    'hls': ((0, 360), (0, 100), (0, 100)),
+    'xyz': ((0, 100),) * 3,
+    'lab': ((0, 100), (-128, 127), (-128, 127)),
+}
+SLIDER_DECIMALS = {'rgb': 0}
+RESULTS_VERSION = 1
+
+
+@dataclass
+class BenchResult:
+    """Один замер: пропускная способность и задержки одного вызова в мкс"""
+    name: str
+    mode: str
+    calls: int
+    colors: int
+    seconds: float
+    throughput: float
+    p50_us: float
+    p95_us: float
+    p99_us: float
+    extra: Optional[Dict[str, float]] = None
+
+    def __str__(self) -> str:
+        line = (f"{self.mode:<7}{self.name:<22}{self.throughput:>14,.0f} цв/с   "
+                f"p50 {self.p50_us:>9.2f}  p95 {self.p95_us:>9.2f}  p99 {self.p99_us:>9.2f} мкс")
+        if self.extra:
+            line += ''.join(f"  {key} {value:.2f}" for key, value in self.extra.items())
+        return line
+
+
+def _result(name: str, mode: str, latencies_ns: Sequence[int], colors_per_call: int,
+            extra: Optional[Dict[str, float]] = None) -> BenchResult:
+    lat = np.asarray(latencies_ns, dtype=np.float64) / 1000.0
+    seconds = float(lat.sum()) / 1e6
+    colors = len(lat) * colors_per_call
+    p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+    return BenchResult(name, mode, len(lat), colors, seconds, colors / seconds if seconds else 0.0,
+                       float(p50), float(p95), float(p99), extra)
+
+
+def _timed(func: Callable, args_list: Sequence, warmup: int = 100) -> List[int]:
+    """Задержка каждого вызова в нс; сборщик мусора на время замера отключён, как в timeit"""
+    for args in args_list[:warmup]:
+        func(*args)
+    clock = time.perf_counter_ns
+    latencies = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for args in args_list:
+            t0 = clock()
+            func(*args)
+            latencies.append(clock() - t0)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return latencies
+
+
+def sample_colors(model: str, count: int, rng) -> np.ndarray:
+    """Допустимые значения модели: случайные RGB, переведённые в модель"""
+    rgb = rng.integers(0, 256, (count, 3))
+    if model == 'rgb':
+        return rgb
+    return color_engine.convert(rgb, 'rgb', model)
+
+
+def _rng(seed: int, mode: str, name: str):
+    """Генератор для одного замера: входные данные не зависят от набора
+    выбранных режимов и пар, поэтому частичные прогоны сравнимы с полными"""
+    return np.random.default_rng([seed, MODES.index(mode), *name.encode()])
+
+
+def bench_scalar(pairs, count: int, seed: int) -> List[BenchResult]:
+    results = []
+    for src, dst in pairs:
+        func = color_engine.SCALAR_CONVERSIONS[(src, dst)]
+        rng = _rng(seed, 'scalar', f'{src}->{dst}')
+        colors = [(c,) for c in sample_colors(src, count, rng).tolist()]
+        results.append(_result(f'{src}->{dst}', 'scalar', _timed(func, colors), 1))
+    return results
+
+
+def bench_memo(pairs, count: int, working_set: int, seed: int) -> List[BenchResult]:
+    results = []
+    for src, dst in pairs:
+        rng = _rng(seed, 'memo', f'{src}->{dst}')
+        cache = color_cache.ConversionCache(max(working_set, 1))
+        pool = sample_colors(src, working_set, rng).tolist()
+        colors = [(pool[i], src, dst) for i in rng.integers(0, working_set, count)]
+        latencies = _timed(cache.convert_color, colors)
+        results.append(_result(f'{src}->{dst}', 'memo', latencies, 1,
+                               {'hit_ratio': cache.stats()['hit_ratio']}))
+    return results
+
+
+def bench_batch(pairs, batch_size: int, repeat: int, seed: int) -> List[BenchResult]:
+    results = []
+    for src, dst in pairs:
+        func = color_engine.BATCH_CONVERSIONS[(src, dst)]
+        colors = sample_colors(src, batch_size, _rng(seed, 'batch', f'{src}->{dst}'))
+        latencies = _timed(func, [(colors,)] * repeat, warmup=1)
+        results.append(_result(f'{src}->{dst}', 'batch', latencies, batch_size))
+    return results
+
+
+def bench_cached(pairs, batch_size: int, repeat: int, working_set: int, seed: int) -> List[BenchResult]:
+    """Пакетный путь ConversionCache на пакетах из working_set повторяющихся
+    цветов (палитра, плакат). В extra - доля попаданий и ускорение медианы
+    относительно color_engine.convert на тех же данных"""
+    results = []
+    for src, dst in pairs:
+        rng = _rng(seed, 'cached', f'{src}->{dst}')
+        pool = sample_colors(src, working_set, rng)
+        colors = pool[rng.integers(0, working_set, batch_size)]
+        cache = color_cache.ConversionCache(max(working_set, 1))
+        latencies = _timed(cache.convert, [(colors, src, dst)] * repeat, warmup=1)
+        engine = _timed(color_engine.convert, [(colors, src, dst)] * repeat, warmup=1)
+        results.append(_result(f'{src}->{dst}', 'cached', latencies, batch_size,
+                               {'hit_ratio': cache.stats()['hit_ratio'],
+                                'speedup': float(np.median(engine) / np.median(latencies))}))
+    return results
+
+
+def bench_cycle(steps: int, seed: int) -> List[BenchResult]:
+    """Полный цикл update_from_slider в настоящем окне Tk (скрытом).
+
+    Включает пересчёт моделей и обновление виджетов видимой вкладки вместе с
+    отрисовкой (update_idletasks). Значения берутся в пределах слайдера
+    каждого канала. Окно создаётся без фоновой сборки кубов, чтобы она не шла
+    во время замера: кубы подключаются заранее флагом --cubes. Без tkinter или
+    дисплея замер пропускается.
+    """
+    try:
+        import tkinter as tk
+        import lab1
+        root = tk.Tk()
+    except Exception as e:
+        print(f"Цикл update_from_slider пропущен: {e}", file=sys.stderr)
+        return []
+
+    results = []
+    try:
+        root.withdraw()
+        app = lab1.ColorConverterApp(root, cubes=False)
+
+        def cycle(model, channel, value):
+            app.update_from_slider(model, channel, value)
+            root.update_idletasks()
+
+        for index, model in enumerate(color_engine.MODELS):
+            app.notebook.select(index)
+            root.update()
+            rng = _rng(seed, 'cycle', model)
+            channels = rng.integers(0, color_engine.CHANNELS[model], steps)
+            bounds = np.array(SLIDER_RANGES[model], dtype=np.float64)[channels]
+            values = np.round(rng.uniform(bounds[:, 0], bounds[:, 1]), SLIDER_DECIMALS.get(model, 1))
+            args = [(model, int(c), float(v)) for c, v in zip(channels, values)]
+            results.append(_result(f'update_from_slider:{model}', 'cycle',
+                                   _timed(cycle, args, warmup=10), 1))
+    finally:
+        root.destroy()
+    return results
+
+
+def environment() -> Dict[str, str]:
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cubes': ','.join(color_engine.registered_cubes()) or 'none',
+    }
+
+
+def run(modes: Sequence[str] = MODES, pairs: Sequence = PAIRS, count: int = DEFAULT_COLORS,
+        batch_size: int = DEFAULT_BATCH, repeat: int = DEFAULT_REPEAT,
+        working_set: int = DEFAULT_WORKING_SET, cycle_steps: int = DEFAULT_CYCLE_STEPS,
+        seed: int = DEFAULT_SEED, report: Optional[Callable[[BenchResult], None]] = None) -> Dict:
+    """Все замеры выбранных режимов и пар; входные данные задаются зерном seed"""
+    for pair in pairs:
+        if pair not in color_engine.SCALAR_CONVERSIONS:
+            raise ValueError(f"Неизвестная пара моделей: {'->'.join(pair)}")
+    # Окружение (в том числе подключённые кубы) - то, при котором шли замеры
+    env = environment()
+    results = []
+    for mode in modes:
+        if mode == 'scalar':
+            batch = bench_scalar(pairs, count, seed)
+        elif mode == 'memo':
+            batch = bench_memo(pairs, count, working_set, seed)
+        elif mode == 'batch':
+            batch = bench_batch(pairs, batch_size, repeat, seed)
+        elif mode == 'cycle':
+            batch = bench_cycle(cycle_steps, seed)
+        elif mode == 'cached':
+            batch = bench_cached(pairs, batch_size, repeat, working_set, seed)
+        else:
+            raise ValueError(f"Неизвестный режим: {mode}, доступны {MODES}")
+        for result in batch:
+            if report:
+                report(result)
+            results.append(result)
+    return {
+        'version': RESULTS_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': env,
+        'parameters': {'seed': seed, 'colors': count, 'batch_size': batch_size, 'repeat': repeat,
+                       'working_set': working_set, 'cycle_steps': cycle_steps},
+        'results': [asdict(r) for r in results],
+    }
+
+
+def compare(base: Dict, current: Dict) -> List[str]:
+    """Строки сравнения двух прогонов: изменение пропускной способности и медианы задержки"""
+    before = {(r['mode'], r['name']): r for r in base['results']}
+    lines = []
+    for r in current['results']:
+        old = before.get((r['mode'], r['name']))
+        if old is None or not old['throughput']:
+            continue
+        speed = r['throughput'] / old['throughput'] - 1
+        p50 = r['p50_us'] / old['p50_us'] - 1 if old['p50_us'] else 0.0
+        lines.append(f"{r['mode']:<7}{r['name']:<22}{speed:>+8.1%} цв/с   p50 {p50:>+8.1%}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры скорости преобразований lab1")
+    parser.add_argument('-o', '--output', help="JSON-файл результатов")
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=MODES)
+    parser.add_argument('--pairs', nargs='+', metavar='SRC:DST',
+                        help="пары моделей, по умолчанию все 12")
+    parser.add_argument('-n', '--colors', type=int, default=DEFAULT_COLORS,
+                        help="число вызовов в скалярном режиме и режиме с кэшем")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH)
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="повторов пакетного вызова")
+    parser.add_argument('--working-set', type=int, default=DEFAULT_WORKING_SET)
+    parser.add_argument('--cycle-steps', type=int, default=DEFAULT_CYCLE_STEPS)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--cubes', action='store_true', help="подключить кубы RGB -> XYZ/LAB, если они собраны")
+    parser.add_argument('--compare', metavar='BASE.json', help="сравнить с сохранённым прогоном")
+    args = parser.parse_args()
+
+    pairs = PAIRS
+    if args.pairs:
+        pairs = [tuple(p.lower().split(':')) for p in args.pairs]
+    if args.cubes:
+        import color_cube
+        color_cube.enable_cubes(rebuild=False)
+
+    data = run(args.modes, pairs, args.colors, args.batch_size, args.repeat,
+               args.working_set, args.cycle_steps, args.seed, report=print)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        print(f"Сохранено: {args.output}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            base = json.load(f)
+        print(f"\nСравнение с {args.compare}:")
+        for line in compare(base, data):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
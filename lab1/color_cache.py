@@ -0,0 +1,216 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+import color_engine
+
+DEFAULT_CACHE_SIZE = 4096
+# Пакет, в котором среди первых DISTINCT_PROBE промахов больше DISTINCT_LIMIT
+# разных цветов, преобразуется движком без кэша
+DISTINCT_PROBE = 4096
+DISTINCT_LIMIT = 0.5
+
+
+def _packed_rgb(arr: np.ndarray) -> Optional[np.ndarray]:
+    """Целые RGB (..., 3) как числа R<<16 | G<<8 | B или None для других значений.
+
+    Дробные массивы не упаковываются: движок считает их по другой ветви, и
+    128.0 может отличаться от 128 в последних знаках.
+    """
+    if arr.dtype.kind not in 'iu' or not arr.size:
+        return None
+    if arr.dtype != np.uint8 and (arr.min() < 0 or arr.max() > 255):
+        return None
+    rgb = arr.reshape(-1, 3)
+    return (rgb[:, 0].astype(np.int32) << 16) | (rgb[:, 1].astype(np.int32) << 8) | rgb[:, 2].astype(np.int32)
+
+
+class ConversionCache:
+    """Ограниченный LRU-кэш преобразований между моделями.
+
+    Ключ - (исходная модель, целевая модель, кортеж значений), где значения
+    приведены к float: 128 и 128.0 дают один ключ, а результат для ключа
+    совпадает с тем, что вернул бы сам движок.
+
+    Пакетный путь (convert) кэширует только целочисленные RGB: цвет упакован
+    в 24-битное число, и поиск - это индексация плотной таблицы слотов
+    (2^24 int32, 64 МБ, создаётся при первом пакетном вызове), без цикла по
+    цветам. В ней до maxsize цветов со своими значениями для каждой целевой
+    модели; вытесняются цвета, дольше всех не встречавшиеся в пакетах. Для
+    других моделей, а также для пакетов почти из одних разных цветов поиск по
+    ключам медленнее самого движка, и пакет преобразуется без кэша.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        if maxsize <= 0:
+            raise ValueError("Размер кэша должен быть положительным")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        # Пакетный путь: свой замок, чтобы большой пакет не задерживал скалярные вызовы
+        self._batch_lock = threading.Lock()
+        self._reset_batch()
+
+    def _reset_batch(self) -> None:
+        self._slots = None                        # упакованный RGB -> слот или -1
+        self._slot_keys = np.full(self.maxsize, -1, dtype=np.int32)
+        self._slot_used = np.zeros(self.maxsize, dtype=np.int64)   # номер пакета последнего обращения
+        self._batches = 0
+        self._values: Dict[str, np.ndarray] = {}  # целевая модель -> (maxsize, C)
+        self._known: Dict[str, np.ndarray] = {}   # целевая модель -> слоты со значением
+
+    @staticmethod
+    def _key(src: str, dst: str, values) -> tuple:
+        return src, dst, tuple(float(v) for v in values)
+
+    def _get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def _put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def convert_color(self, color: Sequence[float], src: str, dst: str) -> List[float]:
+        key = self._key(src, dst, color)
+        cached = self._get(key)
+        if cached is None:
+            cached = tuple(color_engine.convert_color(list(color), src, dst))
+            self._put(key, cached)
+        return list(cached)
+
+    def rgb_to_all(self, rgb: Sequence[int]) -> Dict[str, List[float]]:
+        key = self._key('rgb', '*', rgb)
+        cached = self._get(key)
+        if cached is None:
+            cached = {model: tuple(values) for model, values in color_engine.rgb_to_all(rgb).items()}
+            self._put(key, cached)
+        return {model: list(values) for model, values in cached.items()}
+
+    def convert(self, colors, src: str, dst: str) -> np.ndarray:
+        arr = np.asarray(colors)
+        if arr.ndim == 0 or arr.shape[-1] != color_engine.CHANNELS[src]:
+            raise ValueError(f"Ожидался массив формы (..., {color_engine.CHANNELS[src]}), получено {arr.shape}")
+        if src == dst:
+            return arr.astype(np.float64)
+        keys = _packed_rgb(arr) if src == 'rgb' else None
+        if keys is None:
+            return color_engine.convert(arr, src, dst)
+
+        out_channels = color_engine.CHANNELS[dst]
+        shape = arr.shape[:-1] + (out_channels,)
+        with self._batch_lock:
+            if self._slots is None:
+                self._slots = np.full(1 << 24, -1, dtype=np.int32)
+            if dst not in self._values:
+                self._values[dst] = np.zeros((self.maxsize, out_channels), dtype=np.float64)
+                self._known[dst] = np.zeros(self.maxsize, dtype=bool)
+            values, known = self._values[dst], self._known[dst]
+            self._batches += 1
+
+            # Почти все цвета разные (фотография, шум): кэш их не удержит, а
+            # поиск уникальных дороже самого преобразования. Проверяется по
+            # началу пакета, до поиска всех цветов
+            probe = keys[:DISTINCT_PROBE]
+            probe_slots = self._slots[probe]
+            probe_missed = probe[(probe_slots < 0) | ~known[probe_slots]]
+            bypass = len(np.unique(probe_missed)) > DISTINCT_LIMIT * len(probe)
+            if bypass:
+                with self._lock:
+                    self.misses += len(keys)
+            else:
+                slots = self._slots[keys]
+                # Для отсутствующих цветов slots = -1: known[-1] читается, но отсекается первым условием
+                hit = (slots >= 0) & known[slots]
+                n_hit = int(np.count_nonzero(hit))
+                with self._lock:
+                    self.hits += n_hit
+                    self.misses += len(keys) - n_hit
+                if n_hit == len(keys):
+                    self._slot_used[slots] = self._batches
+                    return np.take(values, slots, axis=0).reshape(shape)
+
+                missed = ~hit
+                self._slot_used[slots[hit]] = self._batches
+                result = np.take(values, slots, axis=0)
+                new_keys, inverse = np.unique(keys[missed], return_inverse=True)
+                computed = color_engine.convert(
+                    np.stack([new_keys >> 16, (new_keys >> 8) & 255, new_keys & 255], axis=-1), 'rgb', dst)
+                result[missed] = computed[inverse.reshape(-1)]
+                self._store(new_keys, computed, dst)
+                return result.reshape(shape)
+        return color_engine.convert(arr, src, dst)
+
+    def _store(self, keys: np.ndarray, computed: np.ndarray, dst: str) -> None:
+        """Записать новые значения; новым цветам отдаются самые давние слоты"""
+        slots = self._slots[keys]
+        present = slots >= 0
+        self._slot_used[slots[present]] = self._batches
+        absent = np.flatnonzero(~present)
+        # Слоты, к которым обращался этот пакет, не вытесняются; если их не
+        # хватает, лишние цвета пакета просто не кэшируются
+        free = np.flatnonzero(self._slot_used < self._batches)
+        absent = absent[:len(free)]
+        if 0 < len(absent) < len(free):
+            free = free[np.argpartition(self._slot_used[free], len(absent) - 1)[:len(absent)]]
+        free = free[:len(absent)]
+        evicted = self._slot_keys[free]
+        self._slots[evicted[evicted >= 0]] = -1
+        for known in self._known.values():
+            known[free] = False
+        self._slots[keys[absent]] = free
+        self._slot_keys[free] = keys[absent]
+        slots[absent] = free
+
+        stored = present.copy()
+        stored[absent] = True
+        self._values[dst][slots[stored]] = computed[stored]
+        self._known[dst][slots[stored]] = True
+        self._slot_used[slots[stored]] = self._batches
+
+    def resize(self, maxsize: int) -> None:
+        if maxsize <= 0:
+            raise ValueError("Размер кэша должен быть положительным")
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        with self._batch_lock:
+            self._reset_batch()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+        with self._batch_lock:
+            self._reset_batch()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'batch_colors': int(np.count_nonzero(self._slot_keys >= 0)),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
+
+    def summary(self) -> str:
+        stats = self.stats()
+        return (f"Кэш: {stats['size']}/{stats['maxsize']}, попаданий: {stats['hits']}, "
+                f"промахов: {stats['misses']} ({stats['hit_ratio']:.0%})")
@@ -0,0 +1,148 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+import color_engine
+
+CUBE_VERSION = 1
+CUBE_SIZE = 256 ** 3
+CUBE_DTYPE = np.float32
+CUBE_MODELS = ('xyz', 'lab')
+DEFAULT_CACHE_DIR = Path(os.environ.get('LAB1_CUBE_DIR', Path.home() / '.cache' / 'lab1_color_cube'))
+
+# Строим куб слоями по значению R: 65536 цветов за вызов пакетного движка
+_SLAB = 256 * 256
+
+_BUILDERS = {
+    'xyz': color_engine.rgb_to_xyz_batch,
+    'lab': color_engine.rgb_to_lab_batch,
+}
+
+
+class ColorCube:
+    """Отображённая в память таблица RGB -> XYZ/LAB для всех 24-битных цветов"""
+
+    def __init__(self, model: str, path):
+        self.model = model
+        self.path = Path(path)
+        self.table = np.load(self.path, mmap_mode='r')
+        if self.table.shape != (CUBE_SIZE, 3):
+            raise ValueError(f"Неверная форма куба {self.path}: {self.table.shape}")
+
+    def lookup(self, rgb) -> np.ndarray:
+        rgb = np.asarray(rgb).astype(np.intp)
+        index = (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+        return self.table[index].astype(np.float64)
+
+
+def cube_paths(model: str, cache_dir=None):
+    cache_dir = Path(cache_dir or DEFAULT_CACHE_DIR)
+    return cache_dir / f'rgb_to_{model}.npy', cache_dir / f'rgb_to_{model}.json'
+
+
+def engine_fingerprint(model: str) -> str:
+    """Отпечаток формул движка: если они изменились, куб считается устаревшим"""
+    levels = np.arange(0, 256, 15)
+    probe = np.stack(np.meshgrid(levels, levels, levels, indexing='ij'), axis=-1).reshape(-1, 3)
+    values = _BUILDERS[model](probe, use_cube=False)
+    digest = hashlib.sha256()
+    digest.update(f'{model}:{CUBE_VERSION}:{np.dtype(CUBE_DTYPE).str}'.encode())
+    digest.update(values.astype('<f8').tobytes())
+    return digest.hexdigest()
+
+
+def is_cube_fresh(model: str, cache_dir=None) -> bool:
+    data_path, meta_path = cube_paths(model, cache_dir)
+    try:
+        meta = json.loads(meta_path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return False
+    if not data_path.exists():
+        return False
+    return meta.get('fingerprint') == engine_fingerprint(model)
+
+
+def build_cube(model: str, cache_dir=None,
+               progress: Optional[Callable[[int, int], None]] = None) -> Path:
+    """Посчитать куб формулами и атомарно записать его в кэш"""
+    data_path, meta_path = cube_paths(model, cache_dir)
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = data_path.with_name(data_path.name + '.tmp')
+
+    table = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=CUBE_DTYPE, shape=(CUBE_SIZE, 3))
+    gb = np.stack(np.meshgrid(np.arange(256), np.arange(256), indexing='ij'), axis=-1).reshape(-1, 2)
+    slab = np.empty((_SLAB, 3), dtype=np.uint8)
+    slab[:, 1:] = gb
+    for r in range(256):
+        slab[:, 0] = r
+        table[r * _SLAB:(r + 1) * _SLAB] = _BUILDERS[model](slab, use_cube=False)
+        if progress:
+            progress(r + 1, 256)
+    table.flush()
+    del table
+
+    os.replace(tmp_path, data_path)
+    meta = {'model': model, 'version': CUBE_VERSION, 'dtype': np.dtype(CUBE_DTYPE).str,
+            'fingerprint': engine_fingerprint(model)}
+    meta_path.write_text(json.dumps(meta, indent=2), encoding='utf-8')
+    return data_path
+
+
+def load_cube(model: str, cache_dir=None, rebuild: bool = True) -> Optional[ColorCube]:
+    """Открыть куб; отсутствующий или устаревший куб пересобирается.
+
+    Возвращает None, если куб недоступен (нет места, нет прав, rebuild=False) -
+    тогда движок продолжает считать формулами.
+    """
+    try:
+        if not is_cube_fresh(model, cache_dir):
+            if not rebuild:
+                return None
+            build_cube(model, cache_dir)
+        return ColorCube(model, cube_paths(model, cache_dir)[0])
+    except (OSError, ValueError):
+        return None
+
+
+def enable_cubes(cache_dir=None, rebuild: bool = True, models=CUBE_MODELS) -> Dict[str, ColorCube]:
+    """Загрузить кубы и подключить их к пакетному движку"""
+    loaded = {}
+    for model in models:
+        cube = load_cube(model, cache_dir, rebuild)
+        if cube is not None:
+            color_engine.register_cube(model, cube)
+            loaded[model] = cube
+    return loaded
+
+
+def enable_cubes_async(cache_dir=None, rebuild: bool = True, models=CUBE_MODELS) -> threading.Thread:
+    """То же в фоновом потоке: до готовности куба движок считает формулами"""
+    thread = threading.Thread(target=enable_cubes, args=(cache_dir, rebuild, models), daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сборка кэша RGB -> XYZ/LAB для всех 24-битных цветов")
+    parser.add_argument('--dir', default=None, help=f"каталог кэша (по умолчанию {DEFAULT_CACHE_DIR})")
+    parser.add_argument('--force', action='store_true', help="пересобрать даже актуальный куб")
+    args = parser.parse_args()
+
+    for model in CUBE_MODELS:
+        if args.force or not is_cube_fresh(model, args.dir):
+            print(f"Сборка куба rgb -> {model}...")
+            path = build_cube(model, args.dir,
+                              progress=lambda done, total: print(f"\r  {done}/{total}", end='', flush=True))
+            print(f"\n  {path}")
+        else:
+            print(f"Куб rgb -> {model} актуален")
+
+
+if __name__ == "__main__":
+    main()
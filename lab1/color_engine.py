@@ -0,0 +1,660 @@
+import colorsys
+from bisect import bisect_right
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+MODELS = ('rgb', 'cmyk', 'hsv', 'hls', 'xyz', 'lab')
+CHANNELS = {'rgb': 3, 'cmyk': 4, 'hsv': 3, 'hls': 3, 'xyz': 3, 'lab': 3}
+
+REF_WHITE = (95.047, 100.000, 108.883)
+
+RGB_TO_XYZ = ((0.4124564, 0.3575761, 0.1804375),
+              (0.2126729, 0.7151522, 0.0721750),
+              (0.0193339, 0.1191920, 0.9503041))
+XYZ_TO_RGB = ((3.2404542, -1.5371385, -0.4985314),
+              (-0.9692660, 1.8760108, 0.0415560),
+              (0.0556434, -0.2040259, 1.0572252))
+
+ONE_SIXTH = 1.0 / 6.0
+TWO_THIRD = 2.0 / 3.0
+ONE_THIRD = 1.0 / 3.0
+
+
+# ---------------------------------------------------------------------------
+# Таблицы гамма-коррекции sRGB
+#
+# Прямая таблица точная: 8-битный канал принимает всего 256 значений, и каждое
+# посчитано той же формулой, что и раньше. Обратная таблица плотная
+# (GAMMA_TABLE_SIZE узлов на участке степенной функции) с линейной
+# интерполяцией; погрешность не превышает 3e-4 уровня 8-битного канала.
+#
+# Для целого результата (xyz_to_rgb) интерполяции недостаточно: после
+# RGB -> XYZ -> RGB значения лежат вплотную к целым, и int() от них зависит от
+# последнего разряда. Поэтому для него хранятся 255 порогов - наименьшие
+# линейные значения, при которых формула даёт уровень n, - и уровень по ним
+# в точности повторяет int(формула * 255).
+# ---------------------------------------------------------------------------
+
+GAMMA_TABLE_SIZE = 16384
+GAMMA_KNEE = 0.0031308
+
+
+def _srgb_to_linear(c: float) -> float:
+    return c/12.92 if c <= 0.04045 else ((c + 0.055)/1.055) ** 2.4
+
+
+def _linear_to_srgb(c: float) -> float:
+    return 12.92 * c if c <= GAMMA_KNEE else 1.055 * (c ** (1/2.4)) - 0.055
+
+
+SRGB_TO_LINEAR = [_srgb_to_linear(i/255.0) for i in range(256)]
+SRGB_TO_LINEAR_ARRAY = np.array(SRGB_TO_LINEAR)
+
+_INV_STEP = (1.0 - GAMMA_KNEE) / (GAMMA_TABLE_SIZE - 1)
+LINEAR_TO_SRGB = [_linear_to_srgb(GAMMA_KNEE + i * _INV_STEP) for i in range(GAMMA_TABLE_SIZE - 1)]
+# Последний узел ровно в 1.0 и его повтор, чтобы интерполяция не выходила за таблицу
+LINEAR_TO_SRGB += [_linear_to_srgb(1.0)] * 2
+LINEAR_TO_SRGB_ARRAY = np.array(LINEAR_TO_SRGB)
+
+
+def _level_threshold(level: int) -> float:
+    lo, hi = -1.0, 2.0
+    while True:
+        mid = (lo + hi) / 2
+        if mid <= lo or mid >= hi:
+            return hi
+        if _linear_to_srgb(mid) * 255 >= level:
+            hi = mid
+        else:
+            lo = mid
+
+
+SRGB_LEVEL_THRESHOLDS = [_level_threshold(level) for level in range(1, 256)]
+
+# Пакетный вариант: отрезок [0, последний порог] разбит на корзины уже самого
+# узкого промежутка между порогами, так что в корзину попадает не больше
+# одного порога. Уровень = уровень начала корзины + (c >= порог корзины).
+LEVEL_BINS = 8192
+_LEVEL_SCALE = LEVEL_BINS / SRGB_LEVEL_THRESHOLDS[-1]
+_bin_of_threshold = [int(t * _LEVEL_SCALE) for t in SRGB_LEVEL_THRESHOLDS]
+assert len(set(_bin_of_threshold)) == len(_bin_of_threshold)
+LEVEL_BASE = np.array([bisect_right(_bin_of_threshold, k - 1) for k in range(LEVEL_BINS + 1)], dtype=np.int64)
+LEVEL_SPLIT = np.full(LEVEL_BINS + 1, np.inf)
+LEVEL_SPLIT[_bin_of_threshold] = SRGB_LEVEL_THRESHOLDS
+
+
+def linearize_channel(value) -> float:
+    """8-битный канал sRGB -> линейная яркость (табличная для целых 0..255)"""
+    if isinstance(value, int) and 0 <= value <= 255:
+        return SRGB_TO_LINEAR[value]
+    return _srgb_to_linear(value/255.0)
+
+
+def delinearize_channel(c: float) -> float:
+    """Линейная яркость -> канал sRGB в диапазоне 0..1 (интерполяция по таблице)"""
+    if c <= GAMMA_KNEE:
+        return 12.92 * c
+    if c >= 1.0:
+        # За пределами гаммы результат всё равно обрежется, таблица не нужна
+        return _linear_to_srgb(c)
+    pos = (c - GAMMA_KNEE) / _INV_STEP
+    i = int(pos)
+    lo = LINEAR_TO_SRGB[i]
+    return lo + (pos - i) * (LINEAR_TO_SRGB[i + 1] - lo)
+
+
+def linear_to_level(c: float) -> int:
+    """Линейная яркость -> 8-битный уровень sRGB, как int(формула * 255) с обрезкой"""
+    return bisect_right(SRGB_LEVEL_THRESHOLDS, c)
+
+
+# ---------------------------------------------------------------------------
+# Скалярные преобразования (один цвет в виде списка)
+# ---------------------------------------------------------------------------
+
+def rgb_to_cmyk(rgb: Sequence[float]) -> List[float]:
+    r, g, b = rgb[0]/255.0, rgb[1]/255.0, rgb[2]/255.0
+    k = 1 - max(r, g, b)
+    if k == 1:
+        return [0.0, 0.0, 0.0, 100.0]
+    c = (1 - r - k) / (1 - k)
+    m = (1 - g - k) / (1 - k)
+    y = (1 - b - k) / (1 - k)
+    return [c*100, m*100, y*100, k*100]
+
+
+def cmyk_to_rgb(cmyk: Sequence[float]) -> List[int]:
+    c, m, y, k = cmyk[0]/100.0, cmyk[1]/100.0, cmyk[2]/100.0, cmyk[3]/100.0
+    r = 255 * (1 - c) * (1 - k)
+    g = 255 * (1 - m) * (1 - k)
+    b = 255 * (1 - y) * (1 - k)
+    return [int(max(0, min(255, r))),
+            int(max(0, min(255, g))),
+            int(max(0, min(255, b)))]
+
+
+def rgb_to_hsv(rgb: Sequence[float]) -> List[float]:
+    r, g, b = rgb[0]/255.0, rgb[1]/255.0, rgb[2]/255.0
+    h, s, v = colorsys.rgb_to_hsv(r, g, b)
+    return [h * 360, s * 100, v * 100]
+
+
+def hsv_to_rgb(hsv: Sequence[float]) -> List[int]:
+    h, s, v = hsv[0]/360.0, hsv[1]/100.0, hsv[2]/100.0
+    r, g, b = colorsys.hsv_to_rgb(h, s, v)
+    return [int(r * 255), int(g * 255), int(b * 255)]
+
+
+def rgb_to_hls(rgb: Sequence[float]) -> List[float]:
+    r, g, b = rgb[0]/255.0, rgb[1]/255.0, rgb[2]/255.0
+    h, l, s = colorsys.rgb_to_hls(r, g, b)
+    return [h * 360, l * 100, s * 100]
+
+
+def hls_to_rgb(hls: Sequence[float]) -> List[int]:
+    h, l, s = hls[0]/360.0, hls[1]/100.0, hls[2]/100.0
+    r, g, b = colorsys.hls_to_rgb(h, l, s)
+    return [int(r * 255), int(g * 255), int(b * 255)]
+
+
+def rgb_to_xyz(rgb: Sequence[float]) -> List[float]:
+    r = linearize_channel(rgb[0])
+    g = linearize_channel(rgb[1])
+    b = linearize_channel(rgb[2])
+
+    x = r * 0.4124564 + g * 0.3575761 + b * 0.1804375
+    y = r * 0.2126729 + g * 0.7151522 + b * 0.0721750
+    z = r * 0.0193339 + g * 0.1191920 + b * 0.9503041
+
+    return [x * 100, y * 100, z * 100]
+
+
+def xyz_to_rgb(xyz: Sequence[float]) -> List[int]:
+    x, y, z = xyz[0]/100.0, xyz[1]/100.0, xyz[2]/100.0
+
+    r_linear = x * 3.2404542 + y * -1.5371385 + z * -0.4985314
+    g_linear = x * -0.9692660 + y * 1.8760108 + z * 0.0415560
+    b_linear = x * 0.0556434 + y * -0.2040259 + z * 1.0572252
+
+    return [linear_to_level(r_linear),
+            linear_to_level(g_linear),
+            linear_to_level(b_linear)]
+
+
+def xyz_to_lab(xyz: Sequence[float], white: Sequence[float] = REF_WHITE) -> List[float]:
+    ref_x, ref_y, ref_z = white
+    x, y, z = xyz[0], xyz[1], xyz[2]
+
+    x = x / ref_x
+    y = y / ref_y
+    z = z / ref_z
+
+    x = x ** (1/3) if x > 0.008856 else (7.787 * x) + (16/116)
+    y = y ** (1/3) if y > 0.008856 else (7.787 * y) + (16/116)
+    z = z ** (1/3) if z > 0.008856 else (7.787 * z) + (16/116)
+
+    l = max(0, min(100, (116 * y) - 16))
+    a = max(-128, min(127, 500 * (x - y)))
+    b = max(-128, min(127, 200 * (y - z)))
+
+    return [l, a, b]
+
+
+def lab_to_xyz(lab: Sequence[float], white: Sequence[float] = REF_WHITE) -> List[float]:
+    ref_x, ref_y, ref_z = white
+    l, a, b = lab[0], lab[1], lab[2]
+
+    y = (l + 16) / 116
+    x = a / 500 + y
+    z = y - b / 200
+
+    x3 = x ** 3
+    y3 = y ** 3
+    z3 = z ** 3
+
+    x = x3 if x3 > 0.008856 else (x - 16/116) / 7.787
+    y = y3 if y3 > 0.008856 else (y - 16/116) / 7.787
+    z = z3 if z3 > 0.008856 else (z - 16/116) / 7.787
+
+    return [x * ref_x, y * ref_y, z * ref_z]
+
+
+# Слитые ядра RGB <-> LAB: промежуточный XYZ не строится, множитель 100 и
+# белая точка внесены в матрицы. Результат отличается от цепочки через
+# xyz_to_lab / lab_to_xyz только в последних разрядах.
+_RGB_TO_XYZN = tuple(m * 100 / white for row, white in zip(RGB_TO_XYZ, REF_WHITE) for m in row)
+_XYZN_TO_RGB = tuple(m * white / 100 for row in XYZ_TO_RGB for m, white in zip(row, REF_WHITE))
+
+
+def rgb_to_lab(rgb: Sequence[float]) -> List[float]:
+    xr, xg, xb, yr, yg, yb, zr, zg, zb = _RGB_TO_XYZN
+    r = linearize_channel(rgb[0])
+    g = linearize_channel(rgb[1])
+    b = linearize_channel(rgb[2])
+
+    x = r * xr + g * xg + b * xb
+    y = r * yr + g * yg + b * yb
+    z = r * zr + g * zg + b * zb
+
+    x = x ** (1/3) if x > 0.008856 else (7.787 * x) + (16/116)
+    y = y ** (1/3) if y > 0.008856 else (7.787 * y) + (16/116)
+    z = z ** (1/3) if z > 0.008856 else (7.787 * z) + (16/116)
+
+    return [max(0, min(100, (116 * y) - 16)),
+            max(-128, min(127, 500 * (x - y))),
+            max(-128, min(127, 200 * (y - z)))]
+
+
+def lab_to_rgb(lab: Sequence[float]) -> List[int]:
+    rx, ry, rz, gx, gy, gz, bx, by, bz = _XYZN_TO_RGB
+    y = (lab[0] + 16) / 116
+    x = lab[1] / 500 + y
+    z = y - lab[2] / 200
+
+    x3 = x ** 3
+    y3 = y ** 3
+    z3 = z ** 3
+
+    x = x3 if x3 > 0.008856 else (x - 16/116) / 7.787
+    y = y3 if y3 > 0.008856 else (y - 16/116) / 7.787
+    z = z3 if z3 > 0.008856 else (z - 16/116) / 7.787
+
+    return [linear_to_level(x * rx + y * ry + z * rz),
+            linear_to_level(x * gx + y * gy + z * gz),
+            linear_to_level(x * bx + y * by + z * bz)]
+
+
+# ---------------------------------------------------------------------------
+# Пакетные преобразования (массивы формы (..., 3) / (..., 4))
+#
+# Формулы повторяют скалярные функции операция в операцию и используют те же
+# таблицы гамма-коррекции: RGB/CMYK/HSV/HLS/XYZ совпадают со скалярными бит в
+# бит, LAB - с точностью до последних разрядов (кубический корень и слитые
+# матрицы). *_to_rgb возвращают int64 с тем же усечением, что и int().
+# ---------------------------------------------------------------------------
+
+def _as_colors(colors, channels: int) -> np.ndarray:
+    arr = np.asarray(colors, dtype=np.float64)
+    if arr.ndim == 0 or arr.shape[-1] != channels:
+        raise ValueError(f"Ожидался массив формы (..., {channels}), получено {arr.shape}")
+    return arr
+
+
+def rgb_to_cmyk_batch(rgb) -> np.ndarray:
+    rgb = _as_colors(rgb, 3) / 255.0
+    k = 1 - rgb.max(axis=-1)
+    black = k == 1
+    denom = np.where(black, 1.0, 1 - k)[..., None]
+    cmyk = np.empty(rgb.shape[:-1] + (4,))
+    cmyk[..., :3] = (1 - rgb - k[..., None]) / denom * 100
+    cmyk[..., 3] = k * 100
+    cmyk[black] = (0.0, 0.0, 0.0, 100.0)
+    return cmyk
+
+
+def cmyk_to_rgb_batch(cmyk) -> np.ndarray:
+    cmyk = _as_colors(cmyk, 4) / 100.0
+    inv_k = 1 - cmyk[..., 3:]
+    rgb = 255 * (1 - cmyk[..., :3]) * inv_k
+    return np.clip(rgb, 0, 255).astype(np.int64)
+
+
+def _hue_from_rgb(r, g, b, maxc, rangec) -> np.ndarray:
+    rc = (maxc - r) / rangec
+    gc = (maxc - g) / rangec
+    bc = (maxc - b) / rangec
+    h = np.where(r == maxc, bc - gc,
+                 np.where(g == maxc, 2.0 + rc - bc, 4.0 + gc - rc))
+    return (h / 6.0) % 1.0
+
+
+def rgb_to_hsv_batch(rgb) -> np.ndarray:
+    rgb = _as_colors(rgb, 3) / 255.0
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    maxc = rgb.max(axis=-1)
+    minc = rgb.min(axis=-1)
+    rangec = maxc - minc
+    gray = minc == maxc
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = np.where(gray, 0.0, rangec / maxc)
+        h = np.where(gray, 0.0, _hue_from_rgb(r, g, b, maxc, rangec))
+    return np.stack([h * 360, s * 100, maxc * 100], axis=-1)
+
+
+def hsv_to_unit_rgb_batch(hsv) -> np.ndarray:
+    hsv = _as_colors(hsv, 3)
+    h, s, v = hsv[..., 0] / 360.0, hsv[..., 1] / 100.0, hsv[..., 2] / 100.0
+    i = np.trunc(h * 6.0)
+    f = (h * 6.0) - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    i = np.asarray(i, dtype=np.int64) % 6
+    r = np.choose(i, [v, q, p, p, t, v])
+    g = np.choose(i, [t, v, v, q, p, p])
+    b = np.choose(i, [p, p, t, v, v, q])
+    gray = s == 0.0
+    return np.stack([np.where(gray, v, r), np.where(gray, v, g), np.where(gray, v, b)], axis=-1)
+
+
+def hsv_to_rgb_batch(hsv) -> np.ndarray:
+    return (hsv_to_unit_rgb_batch(hsv) * 255).astype(np.int64)
+
+
+def rgb_to_hls_batch(rgb) -> np.ndarray:
+    rgb = _as_colors(rgb, 3) / 255.0
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    maxc = rgb.max(axis=-1)
+    minc = rgb.min(axis=-1)
+    sumc = maxc + minc
+    rangec = maxc - minc
+    l = sumc / 2.0
+    gray = minc == maxc
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = np.where(l <= 0.5, rangec / sumc, rangec / (2.0 - maxc - minc))
+        s = np.where(gray, 0.0, s)
+        h = np.where(gray, 0.0, _hue_from_rgb(r, g, b, maxc, rangec))
+    return np.stack([h * 360, l * 100, s * 100], axis=-1)
+
+
+def _hls_channel(m1, m2, hue) -> np.ndarray:
+    hue = hue % 1.0
+    return np.where(hue < ONE_SIXTH, m1 + (m2 - m1) * hue * 6.0,
+                    np.where(hue < 0.5, m2,
+                             np.where(hue < TWO_THIRD, m1 + (m2 - m1) * (TWO_THIRD - hue) * 6.0, m1)))
+
+
+def hls_to_unit_rgb_batch(hls) -> np.ndarray:
+    hls = _as_colors(hls, 3)
+    h, l, s = hls[..., 0] / 360.0, hls[..., 1] / 100.0, hls[..., 2] / 100.0
+    m2 = np.where(l <= 0.5, l * (1.0 + s), l + s - (l * s))
+    m1 = 2.0 * l - m2
+    gray = s == 0.0
+    return np.stack([np.where(gray, l, _hls_channel(m1, m2, h + ONE_THIRD)),
+                     np.where(gray, l, _hls_channel(m1, m2, h)),
+                     np.where(gray, l, _hls_channel(m1, m2, h - ONE_THIRD))], axis=-1)
+
+
+def hls_to_rgb_batch(hls) -> np.ndarray:
+    return (hls_to_unit_rgb_batch(hls) * 255).astype(np.int64)
+
+
+def linearize_batch(rgb) -> np.ndarray:
+    """Линейные компоненты sRGB (..., 3) из уровней 0..255; для целых - по таблице"""
+    arr = np.asarray(rgb)
+    if arr.dtype.kind in 'iu' and arr.size and arr.min() >= 0 and arr.max() <= 255:
+        _as_colors(arr, 3)
+        return SRGB_TO_LINEAR_ARRAY[arr]
+    c = _as_colors(arr, 3) / 255.0
+    return np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+
+
+def delinearize_batch(c) -> np.ndarray:
+    pos = (np.clip(np.nan_to_num(c), GAMMA_KNEE, 1.0) - GAMMA_KNEE) / _INV_STEP
+    i = pos.astype(np.intp)
+    lo = LINEAR_TO_SRGB_ARRAY[i]
+    curve = lo + (pos - i) * (LINEAR_TO_SRGB_ARRAY[i + 1] - lo)
+    srgb = np.where(c <= GAMMA_KNEE, 12.92 * c, curve)
+    over = c > 1.0
+    if over.any():
+        srgb[over] = 1.055 * (c[over] ** (1/2.4)) - 0.055
+    return srgb
+
+
+def _linear_to_levels(c) -> np.ndarray:
+    k = np.fmin(np.fmax(c * _LEVEL_SCALE, 0), LEVEL_BINS).astype(np.intp)
+    return LEVEL_BASE[k] + (c >= LEVEL_SPLIT[k])
+
+
+def rgb_to_xyz_batch(rgb, use_cube: bool = True) -> np.ndarray:
+    cached = _cube_lookup('xyz', rgb) if use_cube else None
+    if cached is not None:
+        return cached
+    rgb = linearize_batch(rgb)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    x = r * 0.4124564 + g * 0.3575761 + b * 0.1804375
+    y = r * 0.2126729 + g * 0.7151522 + b * 0.0721750
+    z = r * 0.0193339 + g * 0.1191920 + b * 0.9503041
+    return np.stack([x * 100, y * 100, z * 100], axis=-1)
+
+
+def xyz_to_linear_batch(xyz) -> np.ndarray:
+    """Линейные компоненты sRGB без ограничения: вне [0, 1] - цвет вне охвата"""
+    xyz = _as_colors(xyz, 3) / 100.0
+    x, y, z = xyz[..., 0], xyz[..., 1], xyz[..., 2]
+    r = x * 3.2404542 + y * -1.5371385 + z * -0.4985314
+    g = x * -0.9692660 + y * 1.8760108 + z * 0.0415560
+    b = x * 0.0556434 + y * -0.2040259 + z * 1.0572252
+    return np.stack([r, g, b], axis=-1)
+
+
+def linear_to_rgb_batch(linear) -> np.ndarray:
+    """Уровни 0..255 из линейных компонент sRGB, с тем же ограничением, что в xyz_to_rgb"""
+    return _linear_to_levels(np.asarray(linear, dtype=np.float64))
+
+
+def xyz_to_rgb_batch(xyz) -> np.ndarray:
+    return _linear_to_levels(xyz_to_linear_batch(xyz))
+
+
+# Матрицы для пакетных ядер LAB: линейные шаги делаются одним умножением
+# массива (..., 3) на матрицу, нелинейные - поэлементно по всему массиву.
+# Деление на белую точку - тоже умножение на диагональную матрицу: поканальное
+# деление с транслированием (3,) в NumPy заметно медленнее
+_WHITE_SCALES = {}
+_RGB_TO_XYZN_T = np.array(_RGB_TO_XYZN).reshape(3, 3).T.copy()
+_XYZN_TO_RGB_T = np.array(_XYZN_TO_RGB).reshape(3, 3).T.copy()
+# (L*, a*, b*) -> (fx, fy, fz) без слагаемого 16/116
+_LAB_TO_F = np.array([[1/116, 1/116, 1/116],
+                      [1/500, 0.0, 0.0],
+                      [0.0, 0.0, -1/200]])
+
+
+def _white_scales(white) -> Tuple[np.ndarray, np.ndarray]:
+    """Диагональные матрицы умножения и деления на белую точку, по одной на точку"""
+    white = tuple(float(v) for v in white)
+    scales = _WHITE_SCALES.get(white)
+    if scales is None:
+        if len(white) != 3 or min(white) <= 0:
+            raise ValueError(f"Белая точка должна состоять из трёх положительных чисел, получено {white}")
+        scales = _WHITE_SCALES[white] = (np.diag(white), np.diag([1 / v for v in white]))
+    return scales
+
+
+def ratios_to_lab_batch(t) -> np.ndarray:
+    """(X/Xn, Y/Yn, Z/Zn) -> LAB с ограничением диапазонов, как в xyz_to_lab"""
+    t = _as_colors(t, 3)
+    with np.errstate(invalid='ignore'):
+        f = np.cbrt(t)
+    small = t <= 0.008856
+    if small.any():
+        f[small] = (7.787 * t[small]) + (16/116)
+    # Разности считаются явно, а не умножением на матрицу: у чёрного a* и b*
+    # должны получаться точные нули, а не остатки округления
+    fx, fy, fz = f[..., 0], f[..., 1], f[..., 2]
+    lab = np.empty_like(f)
+    l, a, b = lab[..., 0], lab[..., 1], lab[..., 2]
+    np.multiply(fy, 116, out=l)
+    l -= 16
+    np.subtract(fx, fy, out=a)
+    a *= 500
+    np.subtract(fy, fz, out=b)
+    b *= 200
+    np.clip(l, 0, 100, out=l)
+    np.clip(a, -128, 127, out=a)
+    np.clip(b, -128, 127, out=b)
+    return lab
+
+
+def lab_to_ratios_batch(lab) -> np.ndarray:
+    """LAB -> (X/Xn, Y/Yn, Z/Zn), как в lab_to_xyz"""
+    f = _as_colors(lab, 3) @ _LAB_TO_F
+    f += 16/116
+    t = f ** 3
+    small = t <= 0.008856
+    if small.any():
+        t[small] = (f[small] - 16/116) / 7.787
+    return t
+
+
+def xyz_to_lab_batch(xyz, white: Sequence[float] = REF_WHITE) -> np.ndarray:
+    return ratios_to_lab_batch(_as_colors(xyz, 3) @ _white_scales(white)[1])
+
+
+def lab_to_xyz_batch(lab, white: Sequence[float] = REF_WHITE) -> np.ndarray:
+    return lab_to_ratios_batch(lab) @ _white_scales(white)[0]
+
+
+def rgb_to_lab_batch(rgb, use_cube: bool = True) -> np.ndarray:
+    cached = _cube_lookup('lab', rgb) if use_cube else None
+    if cached is not None:
+        return cached
+    return ratios_to_lab_batch(linearize_batch(rgb) @ _RGB_TO_XYZN_T)
+
+
+def lab_to_rgb_batch(lab) -> np.ndarray:
+    return _linear_to_levels(lab_to_ratios_batch(lab) @ _XYZN_TO_RGB_T)
+
+
+# Обратные преобразования без усечения до уровней: sRGB 0..1 с плавающей
+# точкой и тем же ограничением диапазона. Нужны там, где результат дальше
+# интерполируется (3D LUT), а не показывается как цвет.
+
+def cmyk_to_unit_rgb_batch(cmyk) -> np.ndarray:
+    cmyk = _as_colors(cmyk, 4) / 100.0
+    return np.clip((1 - cmyk[..., :3]) * (1 - cmyk[..., 3:]), 0, 1)
+
+
+def xyz_to_unit_rgb_batch(xyz) -> np.ndarray:
+    return np.clip(delinearize_batch(xyz_to_linear_batch(xyz)), 0, 1)
+
+
+def lab_to_unit_rgb_batch(lab) -> np.ndarray:
+    return np.clip(delinearize_batch(lab_to_ratios_batch(lab) @ _XYZN_TO_RGB_T), 0, 1)
+
+
+UNIT_RGB_CONVERSIONS = {
+    'rgb': lambda rgb: np.clip(_as_colors(rgb, 3) / 255.0, 0, 1),
+    'cmyk': cmyk_to_unit_rgb_batch,
+    'hsv': hsv_to_unit_rgb_batch,
+    'hls': hls_to_unit_rgb_batch,
+    'xyz': xyz_to_unit_rgb_batch,
+    'lab': lab_to_unit_rgb_batch,
+}
+
+
+# ---------------------------------------------------------------------------
+# Кэш-кубы RGB -> XYZ/LAB
+#
+# Куб (см. color_cube.py) хранит результат для всех 16.7 млн цветов sRGB, и
+# пакетное преобразование целочисленного RGB превращается в одну выборку по
+# индексу. Маленькие пакеты считаются формулами: там выборка из отображённого
+# файла не окупается.
+# ---------------------------------------------------------------------------
+
+CUBE_MIN_SIZE = 4096
+
+_cubes = {}
+
+
+def register_cube(model: str, cube) -> None:
+    """Подключить куб для модели 'xyz' или 'lab' (объект с методом lookup)"""
+    if model not in ('xyz', 'lab'):
+        raise ValueError(f"Куб поддерживается только для xyz и lab, получено {model}")
+    _cubes[model] = cube
+
+
+def unregister_cube(model: str = None) -> None:
+    if model is None:
+        _cubes.clear()
+    else:
+        _cubes.pop(model, None)
+
+
+def registered_cubes() -> List[str]:
+    return sorted(_cubes)
+
+
+def _cube_lookup(model: str, rgb):
+    cube = _cubes.get(model)
+    if cube is None:
+        return None
+    arr = np.asarray(rgb)
+    if arr.dtype.kind not in 'iu' or arr.size < CUBE_MIN_SIZE * 3 or arr.shape[-1] != 3:
+        return None
+    if arr.min() < 0 or arr.max() > 255:
+        return None
+    return cube.lookup(arr)
+
+
+# ---------------------------------------------------------------------------
+# Диспетчеры
+# ---------------------------------------------------------------------------
+
+SCALAR_CONVERSIONS = {
+    ('rgb', 'cmyk'): rgb_to_cmyk, ('cmyk', 'rgb'): cmyk_to_rgb,
+    ('rgb', 'hsv'): rgb_to_hsv, ('hsv', 'rgb'): hsv_to_rgb,
+    ('rgb', 'hls'): rgb_to_hls, ('hls', 'rgb'): hls_to_rgb,
+    ('rgb', 'xyz'): rgb_to_xyz, ('xyz', 'rgb'): xyz_to_rgb,
+    ('xyz', 'lab'): xyz_to_lab, ('lab', 'xyz'): lab_to_xyz,
+    ('rgb', 'lab'): rgb_to_lab, ('lab', 'rgb'): lab_to_rgb,
+}
+
+BATCH_CONVERSIONS = {
+    ('rgb', 'cmyk'): rgb_to_cmyk_batch, ('cmyk', 'rgb'): cmyk_to_rgb_batch,
+    ('rgb', 'hsv'): rgb_to_hsv_batch, ('hsv', 'rgb'): hsv_to_rgb_batch,
+    ('rgb', 'hls'): rgb_to_hls_batch, ('hls', 'rgb'): hls_to_rgb_batch,
+    ('rgb', 'xyz'): rgb_to_xyz_batch, ('xyz', 'rgb'): xyz_to_rgb_batch,
+    ('xyz', 'lab'): xyz_to_lab_batch, ('lab', 'xyz'): lab_to_xyz_batch,
+    ('rgb', 'lab'): rgb_to_lab_batch, ('lab', 'rgb'): lab_to_rgb_batch,
+}
+
+
+def _route(table, src: str, dst: str):
+    if src not in CHANNELS or dst not in CHANNELS:
+        raise ValueError(f"Неизвестная цветовая модель: {src} -> {dst}")
+    if (src, dst) in table:
+        return [table[(src, dst)]]
+    # Все остальные пары идут через RGB, как и в интерфейсе
+    return [table[(src, 'rgb')], table[('rgb', dst)]]
+
+
+def convert_color(color: Sequence[float], src: str, dst: str) -> List[float]:
+    """Преобразование одного цвета между любыми двумя моделями"""
+    if src == dst:
+        return list(color)
+    for func in _route(SCALAR_CONVERSIONS, src, dst):
+        color = func(color)
+    return color
+
+
+def convert(colors, src: str, dst: str) -> np.ndarray:
+    """Пакетное преобразование массива цветов (..., C) между любыми двумя моделями"""
+    if src == dst:
+        return _as_colors(colors, CHANNELS[src]).copy()
+    for func in _route(BATCH_CONVERSIONS, src, dst):
+        colors = func(colors)
+    return colors
+
+
+def rgb_to_all_batch(rgb) -> Dict[str, np.ndarray]:
+    """Все модели для массива RGB-цветов за один проход"""
+    xyz = rgb_to_xyz_batch(rgb)
+    lab = _cube_lookup('lab', rgb)
+    if lab is None:
+        lab = xyz_to_lab_batch(xyz)
+    rgb = _as_colors(rgb, 3)
+    return {
+        'rgb': rgb.astype(np.int64),
+        'cmyk': rgb_to_cmyk_batch(rgb),
+        'hsv': rgb_to_hsv_batch(rgb),
+        'hls': rgb_to_hls_batch(rgb),
+        'xyz': xyz,
+        'lab': lab,
+    }
+
+
+def rgb_to_all(rgb: Sequence[int]) -> Dict[str, List[float]]:
+    """Все модели для одного RGB-цвета через пакетный движок"""
+    return {model: values.tolist() for model, values in rgb_to_all_batch(rgb).items()}
@@ -0,0 +1,399 @@
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+import color_engine
+
+DEFAULT_PORT = 8765
+DEFAULT_HOST = '127.0.0.1'
+# Пакет собирается, пока не наберётся столько цветов или не истечёт задержка
+DEFAULT_MAX_BATCH = 65536
+DEFAULT_MAX_DELAY = 0.002
+# Окно для скорости запросов и число последних пакетов для перцентилей
+RATE_WINDOW = 10.0
+HISTORY = 1024
+MAX_BODY = 64 * 1024 * 1024
+# Очередь соединений: по умолчанию в socketserver всего 5, и при десятке
+# одновременных клиентов часть соединений сбрасывается
+LISTEN_BACKLOG = 128
+# Сколько ждать результата пакета для ответа по HTTP, с
+REPLY_TIMEOUT = 30.0
+# Ответов в очереди одного Unix-соединения: если клиент не успевает их читать,
+# сервис перестаёт читать его запросы, а не копит ответы в памяти
+MAX_PENDING_REPLIES = 1024
+
+
+class _Job:
+    __slots__ = ('colors', 'src', 'dst', 'future', 'queued')
+
+    def __init__(self, colors: np.ndarray, src: str, dst: str):
+        self.colors = colors
+        self.src = src
+        self.dst = dst
+        self.future = Future()
+        self.queued = time.perf_counter()
+
+
+class ServiceMetrics:
+    """Счётчики сервиса: скорость запросов, размеры пакетов и ожидание в очереди"""
+
+    def __init__(self, window: float = RATE_WINDOW, history: int = HISTORY):
+        self.window = window
+        self.started = time.time()
+        self.requests = 0
+        self.colors = 0
+        self.batches = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._arrivals = deque()
+        self._batch_requests = deque(maxlen=history)
+        self._batch_colors = deque(maxlen=history)
+        self._waits = deque(maxlen=history)
+
+    def record_request(self, colors: int) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            self.requests += 1
+            self.colors += colors
+            self._arrivals.append((now, colors))
+            self._trim(now)
+
+    def record_batch(self, requests: int, colors: int, waits: Sequence[float]) -> None:
+        with self._lock:
+            self.batches += 1
+            self._batch_requests.append(requests)
+            self._batch_colors.append(colors)
+            self._waits.extend(waits)
+
+    def record_error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def _trim(self, now: float) -> None:
+        while self._arrivals and now - self._arrivals[0][0] > self.window:
+            self._arrivals.popleft()
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            self._trim(time.perf_counter())
+            recent = list(self._arrivals)
+            requests = np.array(self._batch_requests, dtype=np.float64)
+            colors = np.array(self._batch_colors, dtype=np.float64)
+            waits = np.array(self._waits, dtype=np.float64) * 1000
+            data = {
+                'uptime_s': time.time() - self.started,
+                'requests_total': self.requests,
+                'colors_total': self.colors,
+                'batches_total': self.batches,
+                'errors_total': self.errors,
+            }
+        window = min(self.window, data['uptime_s']) or 1.0
+        data['requests_per_s'] = len(recent) / window
+        data['colors_per_s'] = sum(n for _, n in recent) / window
+        for name, values in (('batch_requests', requests), ('batch_colors', colors), ('queue_wait_ms', waits)):
+            if len(values):
+                p50, p95 = np.percentile(values, [50, 95])
+                data.update({f'{name}_mean': float(values.mean()), f'{name}_p50': float(p50),
+                             f'{name}_p95': float(p95), f'{name}_max': float(values.max())})
+        return data
+
+
+class ConversionBatcher:
+    """Очередь запросов, которую один поток разбирает пакетами.
+
+    Запросы, пришедшие почти одновременно, объединяются: для каждой пары
+    моделей цвета всех запросов склеиваются в один массив, преобразуются
+    одним вызовом color_engine.convert, и результат раздаётся обратно по
+    Future каждого запроса.
+    """
+
+    def __init__(self, max_batch: int = DEFAULT_MAX_BATCH, max_delay: float = DEFAULT_MAX_DELAY,
+                 metrics: Optional[ServiceMetrics] = None):
+        if max_batch <= 0 or max_delay < 0:
+            raise ValueError("Размер пакета должен быть положительным, задержка - неотрицательной")
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.metrics = metrics or ServiceMetrics()
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='color-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, colors, src: str, dst: str) -> Future:
+        """Поставить массив (N, C) в очередь; результат придёт в Future"""
+        if self._closed:
+            raise RuntimeError("Сервис преобразований остановлен")
+        if src not in color_engine.CHANNELS or dst not in color_engine.CHANNELS:
+            raise ValueError(f"Неизвестная цветовая модель: {src} -> {dst}")
+        # Ошибки формы проверяются здесь, чтобы один плохой запрос не ронял весь пакет
+        arr = np.asarray(colors)
+        if arr.dtype.kind not in 'iuf' or arr.ndim != 2 or arr.shape[1] != color_engine.CHANNELS[src]:
+            raise ValueError(f"Ожидался массив чисел формы (N, {color_engine.CHANNELS[src]}), "
+                             f"получено {arr.shape}")
+        job = _Job(arr, src, dst)
+        self.metrics.record_request(len(arr))
+        self._queue.put(job)
+        return job.future
+
+    def convert(self, colors, src: str, dst: str, timeout: Optional[float] = None) -> np.ndarray:
+        return self.submit(colors, src, dst).result(timeout)
+
+    def close(self) -> None:
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            jobs, size = [job], len(job.colors)
+            deadline = time.perf_counter() + self.max_delay
+            stop = False
+            while size < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    stop = True
+                    break
+                jobs.append(job)
+                size += len(job.colors)
+            self._process(jobs)
+            if stop:
+                return
+
+    def _process(self, jobs: List[_Job]) -> None:
+        started = time.perf_counter()
+        groups = {}
+        for job in jobs:
+            groups.setdefault((job.src, job.dst), []).append(job)
+        for (src, dst), group in groups.items():
+            try:
+                if len(group) == 1:
+                    parts = [color_engine.convert(group[0].colors, src, dst)]
+                else:
+                    merged = color_engine.convert(np.concatenate([job.colors for job in group]), src, dst)
+                    parts = np.split(merged, np.cumsum([len(job.colors) for job in group])[:-1])
+            except Exception as e:
+                for job in group:
+                    self.metrics.record_error()
+                    job.future.set_exception(e)
+                continue
+            for job, part in zip(group, parts):
+                job.future.set_result(part)
+        self.metrics.record_batch(len(jobs), sum(len(job.colors) for job in jobs),
+                                  [started - job.queued for job in jobs])
+
+
+def _parse_request(data: dict):
+    """Запрос {"from", "to", "colors": [[...], ...]} или с одним цветом в "color" """
+    if not isinstance(data, dict):
+        raise ValueError("Запрос должен быть объектом JSON")
+    try:
+        src, dst = str(data['from']).lower(), str(data['to']).lower()
+    except KeyError as e:
+        raise ValueError(f"В запросе нет поля {e}")
+    single = 'color' in data
+    colors = [data['color']] if single else data.get('colors')
+    if colors is None:
+        raise ValueError("В запросе нет поля colors или color")
+    return src, dst, colors, single
+
+
+def _reply(result: np.ndarray, single: bool) -> dict:
+    values = result.tolist()
+    return {'color': values[0]} if single else {'colors': values}
+
+
+class _HttpHandler(BaseHTTPRequestHandler):
+    server_version = 'lab1-colors/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/metrics':
+            self._send(200, self.server.batcher.metrics.snapshot())
+        else:
+            self._send(404, {'error': "Доступны POST /convert и GET /metrics"})
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/convert':
+            self._send(404, {'error': "Доступны POST /convert и GET /metrics"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            if not 0 < length <= MAX_BODY:
+                raise ValueError("Неверная длина тела запроса")
+            src, dst, colors, single = _parse_request(json.loads(self.rfile.read(length)))
+            future = self.server.batcher.submit(colors, src, dst)
+        except ValueError as e:
+            self._send(400, {'error': str(e)})
+            return
+        try:
+            result = future.result(self.server.reply_timeout)
+        except FutureTimeoutError:
+            self.server.batcher.metrics.record_error()
+            self._send(503, {'error': f"Нет ответа за {self.server.reply_timeout:g} с"})
+            return
+        except Exception as e:
+            self._send(500, {'error': str(e)})
+            return
+        self._send(200, _reply(result, single))
+
+
+class _UnixHandler(socketserver.StreamRequestHandler):
+    """Строки JSON в обе стороны. Клиент может отправить несколько запросов
+    подряд: ответы приходят в порядке запросов и содержат их id.
+
+    В сокет пишет отдельный поток соединения, а не поток пакетов: медленный
+    клиент задерживает только свои ответы.
+    """
+
+    def handle(self):
+        replies = queue.Queue(MAX_PENDING_REPLIES)
+        writer = threading.Thread(target=self._write_replies, args=(replies,),
+                                  name='color-unix-writer', daemon=True)
+        writer.start()
+        try:
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                request_id = None
+                try:
+                    data = json.loads(line)
+                    request_id = data.get('id') if isinstance(data, dict) else None
+                    if isinstance(data, dict) and data.get('op') == 'metrics':
+                        replies.put({'id': request_id, 'metrics': self.server.batcher.metrics.snapshot()})
+                        continue
+                    src, dst, colors, single = _parse_request(data)
+                    future = self.server.batcher.submit(colors, src, dst)
+                except ValueError as e:
+                    replies.put({'id': request_id, 'error': str(e)})
+                    continue
+                replies.put((future, request_id, single))
+        finally:
+            # Соединение закрыто клиентом: ответить на уже принятые запросы
+            replies.put(None)
+            writer.join()
+
+    def _write_replies(self, replies: queue.Queue) -> None:
+        broken = False
+        while True:
+            item = replies.get()
+            if item is None:
+                return
+            if isinstance(item, tuple):
+                future, request_id, single = item
+                try:
+                    payload = _reply(future.result(), single)
+                except Exception as e:
+                    payload = {'error': str(e)}
+                payload['id'] = request_id
+            else:
+                payload = item
+            if broken:
+                # Клиент отключился: очередь разбирается дальше, чтобы не блокировать чтение
+                continue
+            try:
+                self.wfile.write((json.dumps(payload, ensure_ascii=False) + '\n').encode('utf-8'))
+                self.wfile.flush()
+            except OSError:
+                broken = True
+
+
+class _HttpServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+
+def make_http_server(batcher: ConversionBatcher, host: str = DEFAULT_HOST,
+                     port: int = DEFAULT_PORT, reply_timeout: float = REPLY_TIMEOUT) -> ThreadingHTTPServer:
+    if reply_timeout <= 0:
+        raise ValueError("Время ожидания ответа должно быть положительным")
+    server = _HttpServer((host, port), _HttpHandler)
+    server.batcher = batcher
+    server.reply_timeout = reply_timeout
+    return server
+
+
+def make_unix_server(batcher: ConversionBatcher, path: str) -> socketserver.BaseServer:
+    if not hasattr(socket, 'AF_UNIX'):
+        raise ValueError("Unix-сокеты недоступны на этой платформе, используйте --port")
+    if os.path.exists(path):
+        os.unlink(path)
+    server = _UnixServer(path, _UnixHandler)
+    server.batcher = batcher
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Локальный сервис преобразования цветов с объединением запросов в пакеты")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="порт HTTP, 0 - не запускать HTTP")
+    parser.add_argument('--unix', metavar='PATH', help="путь Unix-сокета (строки JSON)")
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH, help="цветов в пакете")
+    parser.add_argument('--max-delay-ms', type=float, default=DEFAULT_MAX_DELAY * 1000,
+                        help="сколько ждать попутных запросов, мс")
+    parser.add_argument('--timeout', type=float, default=REPLY_TIMEOUT,
+                        help="сколько ждать результата для ответа по HTTP, с")
+    args = parser.parse_args()
+
+    if not args.port and not args.unix:
+        parser.error("нужен хотя бы один из --port и --unix")
+    batcher = ConversionBatcher(args.max_batch, args.max_delay_ms / 1000)
+    servers = []
+    if args.port:
+        servers.append(make_http_server(batcher, args.host, args.port, args.timeout))
+        print(f"HTTP: http://{args.host}:{args.port}/convert, метрики: /metrics")
+    if args.unix:
+        servers.append(make_unix_server(batcher, args.unix))
+        print(f"Unix-сокет: {args.unix}")
+    threads = [threading.Thread(target=server.serve_forever, daemon=True) for server in servers]
+    for thread in threads:
+        thread.start()
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+        if args.unix and os.path.exists(args.unix):
+            os.unlink(args.unix)
+        batcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""Целочисленные HSV/HLS для 8-битных цветов, без плавающей точки.
+
+Форматы (bits = 8 или 16):
+    H - доли круга: 0..2^bits - 1, 360° = 2^bits (тон замыкается переполнением);
+    S, V, L - 0..2^bits - 1 вместо 0..100 %.
+Массивы хранятся в uint8 / uint16: в 8 и 4 раза меньше памяти, чем float64.
+
+Каждое значение получается одним целочисленным делением с округлением
+к ближайшему, поэтому оценки погрешности точные (проверены на всех 16.7 млн
+цветов, python fixed_point.py --verify):
+    прямое преобразование - H, S, L не дальше 0.5 единицы формата от точного
+        значения (8 бит: 0.70° и 0.20 %, 16 бит: 0.0028° и 0.00077 %), V точно;
+    обратное - уровень RGB не дальше 0.5 от точного значения формулы для тех же
+        целых H, S, V/L, то есть это правильно округлённый результат;
+    RGB -> модель -> RGB - 16 бит: без потерь; 8 бит: до ROUNDTRIP_ERROR[model]
+        уровней из-за шага тона 1.4°.
+"""
+import argparse
+import sys
+from typing import Sequence, Tuple
+
+import numpy as np
+
+import color_engine
+
+FORMATS = {8: np.uint8, 16: np.uint16}
+DEFAULT_BITS = 8
+# Цветов в порции пакетного преобразования: промежуточные int32/int64
+# остаются небольшими, сколько бы ни было пикселей
+CHUNK = 1 << 18
+# Наибольшая ошибка RGB -> модель -> RGB в уровнях (см. --verify)
+ROUNDTRIP_ERROR = {('hsv', 8): 3, ('hls', 8): 4, ('hsv', 16): 0, ('hls', 16): 0}
+
+
+def _scales(bits: int) -> Tuple[int, int]:
+    """(число делений круга тона, максимум S/V/L)"""
+    if bits not in FORMATS:
+        raise ValueError(f"Поддерживаются форматы {tuple(FORMATS)} бит, получено {bits}")
+    return 1 << bits, (1 << bits) - 1
+
+
+def _div(num, den):
+    """Деление неотрицательных целых с округлением к ближайшему"""
+    return (2 * num + den) // (2 * den)
+
+
+# ---------------------------------------------------------------------------
+# Скалярные функции: только int Python
+# ---------------------------------------------------------------------------
+
+def _hue(r: int, g: int, b: int, maxc: int, delta: int, hue_range: int) -> int:
+    # Позиция на шестиугольнике в единицах delta: сектор * delta + смещение
+    if r == maxc:
+        t = g - b if g >= b else 6 * delta + g - b
+    elif g == maxc:
+        t = 2 * delta + b - r
+    else:
+        t = 4 * delta + r - g
+    return _div(hue_range * t, 6 * delta) % hue_range
+
+
+def rgb_to_hsv_fixed(rgb: Sequence[int], bits: int = DEFAULT_BITS) -> Tuple[int, int, int]:
+    hue_range, full = _scales(bits)
+    r, g, b = int(rgb[0]), int(rgb[1]), int(rgb[2])
+    maxc, minc = max(r, g, b), min(r, g, b)
+    delta = maxc - minc
+    v = _div(maxc * full, 255)
+    if delta == 0:
+        return 0, 0, v
+    return _hue(r, g, b, maxc, delta, hue_range), _div(delta * full, maxc), v
+
+
+def rgb_to_hls_fixed(rgb: Sequence[int], bits: int = DEFAULT_BITS) -> Tuple[int, int, int]:
+    hue_range, full = _scales(bits)
+    r, g, b = int(rgb[0]), int(rgb[1]), int(rgb[2])
+    maxc, minc = max(r, g, b), min(r, g, b)
+    delta, total = maxc - minc, maxc + minc
+    l = _div(total * full, 510)
+    if delta == 0:
+        return 0, l, 0
+    den = total if total <= 255 else 510 - total
+    return _hue(r, g, b, maxc, delta, hue_range), l, _div(delta * full, den)
+
+
+def hsv_fixed_to_rgb(hsv: Sequence[int], bits: int = DEFAULT_BITS) -> Tuple[int, int, int]:
+    hue_range, full = _scales(bits)
+    h, s, v = int(hsv[0]) % hue_range, int(hsv[1]), int(hsv[2])
+    sector, f = divmod(6 * h, hue_range)
+    # Все три канала в масштабе 255 * full * full * hue_range
+    den = full * full * hue_range
+    top = v * 255 * full * hue_range
+    p = v * 255 * (full - s) * hue_range
+    q = v * 255 * (full * hue_range - s * f)
+    t = v * 255 * (full * hue_range - s * (hue_range - f))
+    r, g, b = ((top, q, p, p, t, top)[sector], (t, top, top, q, p, p)[sector],
+               (p, p, t, top, top, q)[sector])
+    return _div(r, den), _div(g, den), _div(b, den)
+
+
+def _hls_channel(m1: int, m2: int, h6: int, hue_range: int) -> int:
+    # h6 - тон канала, умноженный на 6, в единицах hue_range
+    if h6 < hue_range:
+        return m1 * hue_range + (m2 - m1) * h6
+    if h6 < 3 * hue_range:
+        return m2 * hue_range
+    if h6 < 4 * hue_range:
+        return m1 * hue_range + (m2 - m1) * (4 * hue_range - h6)
+    return m1 * hue_range
+
+
+def hls_fixed_to_rgb(hls: Sequence[int], bits: int = DEFAULT_BITS) -> Tuple[int, int, int]:
+    hue_range, full = _scales(bits)
+    h, l, s = int(hls[0]) % hue_range, int(hls[1]), int(hls[2])
+    # m1, m2 в масштабе full * full
+    m2 = l * (full + s) if 2 * l <= full else (l + s) * full - l * s
+    m1 = 2 * l * full - m2
+    den = full * full * hue_range
+    turn = 6 * hue_range
+    return tuple(_div(255 * _hls_channel(m1, m2, (6 * h + shift) % turn, hue_range), den)
+                 for shift in (2 * hue_range, 0, 4 * hue_range))
+
+
+# ---------------------------------------------------------------------------
+# Пакетные функции: массивы (..., 3) uint8 -> uint8/uint16 и обратно
+# ---------------------------------------------------------------------------
+
+def _as_rgb8(rgb) -> np.ndarray:
+    rgb = np.asarray(rgb)
+    if rgb.ndim == 0 or rgb.shape[-1] != 3:
+        raise ValueError(f"Ожидался массив формы (..., 3), получено {rgb.shape}")
+    if rgb.dtype != np.uint8:
+        if rgb.dtype.kind not in 'iu' or (rgb.size and (rgb.min() < 0 or rgb.max() > 255)):
+            raise ValueError("Ожидались целые уровни RGB 0..255")
+        rgb = rgb.astype(np.uint8)
+    return rgb
+
+
+def _as_fixed(values, bits: int) -> np.ndarray:
+    values = np.asarray(values)
+    if values.ndim == 0 or values.shape[-1] != 3:
+        raise ValueError(f"Ожидался массив формы (..., 3), получено {values.shape}")
+    if values.dtype.kind not in 'iu':
+        raise ValueError(f"Ожидались целые значения формата {bits} бит, получено {values.dtype}")
+    return values
+
+
+def _chunked(func, values: np.ndarray, out_dtype, bits: int, wide: bool = False) -> np.ndarray:
+    flat = values.reshape(-1, 3)
+    out = np.empty(flat.shape, dtype=out_dtype)
+    # 8 бит укладываются в int32 (до 2 * 255 * 255 * 256), 16 бит - нет
+    work = np.int64 if wide or bits == 16 else np.int32
+    for start in range(0, len(flat), CHUNK):
+        out[start:start + CHUNK] = func(flat[start:start + CHUNK].astype(work), bits)
+    return out.reshape(values.shape)
+
+
+def _forward(rgb: np.ndarray, bits: int, model: str) -> np.ndarray:
+    hue_range, full = _scales(bits)
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    maxc = rgb.max(axis=1)
+    minc = rgb.min(axis=1)
+    delta = maxc - minc
+    gray = delta == 0
+    safe = np.where(gray, 1, delta)
+
+    t = np.where(r == maxc, g - b, np.where(g == maxc, 2 * delta + b - r, 4 * delta + r - g))
+    t += np.where(t < 0, 6 * delta, 0)
+    h = _div(hue_range * t, 6 * safe) % hue_range
+
+    out = np.empty_like(rgb)
+    if model == 'hsv':
+        out[:, 2] = _div(maxc * full, 255)
+        out[:, 1] = _div(delta * full, np.where(gray, 1, maxc))
+    else:
+        total = maxc + minc
+        out[:, 1] = _div(total * full, 510)
+        den = np.where(total <= 255, total, 510 - total)
+        out[:, 2] = _div(delta * full, np.where(gray, 1, den))
+        out[gray, 2] = 0
+    out[:, 0] = h
+    if model == 'hsv':
+        out[gray, 1] = 0
+    out[gray, 0] = 0
+    return out
+
+
+def _inverse_hsv(hsv: np.ndarray, bits: int) -> np.ndarray:
+    hue_range, full = _scales(bits)
+    h, s, v = hsv[:, 0] % hue_range, hsv[:, 1], hsv[:, 2]
+    sector, f = np.divmod(6 * h, hue_range)
+    # Канал = v * (1 - s * k) с k = 0, f, 1, 1 - f (в масштабе hue_range);
+    # итог 255 * v * (...) / (full * full * hue_range) при v, s в масштабе full.
+    # Для 8 бит full = 255 сокращается, и числитель остаётся в int32
+    if bits == 8:
+        scale, den = v, full * hue_range
+    else:
+        scale, den = v * 255, full * full * hue_range
+    top = scale * (full * hue_range)
+    p = scale * ((full - s) * hue_range)
+    q = scale * (full * hue_range - s * f)
+    t = scale * (full * hue_range - s * (hue_range - f))
+    r = np.choose(sector, [top, q, p, p, t, top])
+    g = np.choose(sector, [t, top, top, q, p, p])
+    b = np.choose(sector, [p, p, t, top, top, q])
+    return _div(np.stack([r, g, b], axis=-1), den)
+
+
+def _inverse_hls(hls: np.ndarray, bits: int) -> np.ndarray:
+    hue_range, full = _scales(bits)
+    h, l, s = hls[:, 0] % hue_range, hls[:, 1], hls[:, 2]
+    m2 = np.where(2 * l <= full, l * (full + s), (l + s) * full - l * s)
+    m1 = 2 * l * full - m2
+    den = full * full * hue_range
+    turn = 6 * hue_range
+    channels = []
+    for shift in (2 * hue_range, 0, 4 * hue_range):
+        h6 = (6 * h + shift) % turn
+        rising = m1 * hue_range + (m2 - m1) * h6
+        falling = m1 * hue_range + (m2 - m1) * (4 * hue_range - h6)
+        value = np.where(h6 < hue_range, rising,
+                         np.where(h6 < 3 * hue_range, m2 * hue_range,
+                                  np.where(h6 < 4 * hue_range, falling, m1 * hue_range)))
+        channels.append(_div(255 * value, den))
+    return np.stack(channels, axis=-1)
+
+
+def rgb_to_hsv_fixed_batch(rgb, bits: int = DEFAULT_BITS) -> np.ndarray:
+    _scales(bits)
+    return _chunked(lambda c, b: _forward(c, b, 'hsv'), _as_rgb8(rgb), FORMATS[bits], bits)
+
+
+def rgb_to_hls_fixed_batch(rgb, bits: int = DEFAULT_BITS) -> np.ndarray:
+    _scales(bits)
+    return _chunked(lambda c, b: _forward(c, b, 'hls'), _as_rgb8(rgb), FORMATS[bits], bits)
+
+
+def hsv_fixed_to_rgb_batch(hsv, bits: int = DEFAULT_BITS) -> np.ndarray:
+    _scales(bits)
+    return _chunked(_inverse_hsv, _as_fixed(hsv, bits), np.uint8, bits)
+
+
+def hls_fixed_to_rgb_batch(hls, bits: int = DEFAULT_BITS) -> np.ndarray:
+    # m1, m2 для 8 бит доходят до 2 * 255 * 255 * 256 * 6 - нужен int64
+    _scales(bits)
+    return _chunked(_inverse_hls, _as_fixed(hls, bits), np.uint8, bits, wide=True)
+
+
+# ---------------------------------------------------------------------------
+# Перевод в градусы и проценты color_engine и обратно
+# ---------------------------------------------------------------------------
+
+def to_float(values, bits: int = DEFAULT_BITS) -> np.ndarray:
+    """(H, S, V) или (H, L, S) формата -> градусы и проценты, как в color_engine"""
+    hue_range, full = _scales(bits)
+    values = np.asarray(values, dtype=np.float64)
+    return values * np.array([360.0 / hue_range, 100.0 / full, 100.0 / full])
+
+
+def from_float(values, bits: int = DEFAULT_BITS) -> np.ndarray:
+    """Градусы и проценты -> ближайшие значения формата"""
+    hue_range, full = _scales(bits)
+    values = np.asarray(values, dtype=np.float64)
+    fixed = np.rint(values * np.array([hue_range / 360.0, full / 100.0, full / 100.0])).astype(np.int64)
+    fixed[..., 0] %= hue_range
+    return np.clip(fixed, 0, full).astype(FORMATS[bits])
+
+
+def verify(bits: int, step: int = 1) -> dict:
+    """Наибольшие погрешности на кубе RGB (каждый step-й уровень по каналу)"""
+    hue_range, full = _scales(bits)
+    levels = np.arange(0, 256, step, dtype=np.uint8)
+    rgb = np.stack(np.meshgrid(levels, levels, levels, indexing='ij'), axis=-1).reshape(-1, 3)
+    report = {}
+    for model, forward, inverse, exact_forward in (
+            ('hsv', rgb_to_hsv_fixed_batch, hsv_fixed_to_rgb_batch, color_engine.rgb_to_hsv_batch),
+            ('hls', rgb_to_hls_fixed_batch, hls_fixed_to_rgb_batch, color_engine.rgb_to_hls_batch)):
+        fixed = forward(rgb, bits)
+        exact = exact_forward(rgb) * np.array([hue_range / 360.0, full / 100.0, full / 100.0])
+        diff = np.abs(fixed - exact)
+        diff[:, 0] = np.minimum(diff[:, 0], hue_range - diff[:, 0])
+        unit = (color_engine.hsv_to_unit_rgb_batch if model == 'hsv'
+                else color_engine.hls_to_unit_rgb_batch)(to_float(fixed, bits)) * 255
+        back = inverse(fixed, bits)
+        report[model] = {
+            'forward_units': diff.max(axis=0).tolist(),
+            'inverse_levels': float(np.abs(back - unit).max()),
+            'roundtrip_levels': int(np.abs(back.astype(np.int64) - rgb).max()),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Целочисленные HSV/HLS: преобразование и проверка погрешностей")
+    parser.add_argument('colors', nargs='*', help="цвета RGB через запятую")
+    parser.add_argument('--bits', type=int, choices=tuple(FORMATS), default=DEFAULT_BITS)
+    parser.add_argument('--verify', action='store_true', help="проверить оценки погрешности на всём кубе RGB")
+    parser.add_argument('--step', type=int, default=1, help="шаг уровней при проверке")
+    args = parser.parse_args()
+
+    for text in args.colors:
+        rgb = [int(v) for v in text.split(',')]
+        hsv, hls = rgb_to_hsv_fixed(rgb, args.bits), rgb_to_hls_fixed(rgb, args.bits)
+        print(f"{text}: HSV {hsv} -> {hsv_fixed_to_rgb(hsv, args.bits)}, "
+              f"HLS {hls} -> {hls_fixed_to_rgb(hls, args.bits)}")
+    if not args.verify:
+        return 0
+
+    ok = True
+    for model, result in verify(args.bits, args.step).items():
+        bound = ROUNDTRIP_ERROR[(model, args.bits)]
+        passed = (max(result['forward_units']) <= 0.5 + 1e-6 and result['inverse_levels'] <= 0.5 + 1e-6
+                  and result['roundtrip_levels'] <= bound)
+        ok &= passed
+        print(f"{model.upper()} {args.bits} бит: прямое {result['forward_units']} ед., "
+              f"обратное {result['inverse_levels']:.3f} ур., туда и обратно {result['roundtrip_levels']} "
+              f"(граница {bound}) - {'OK' if passed else 'НАРУШЕНО'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
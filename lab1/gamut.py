@@ -0,0 +1,172 @@
+import argparse
+from functools import lru_cache
+from dataclasses import dataclass
+
+import numpy as np
+
+import color_engine
+
+# Допуск в уровнях 8-битного канала: значения, отличающиеся от [0, 255]
+# меньше чем на полуровень, считаются погрешностью округления, а не выходом
+# за охват (LAB и XYZ в полях ввода показаны с двумя знаками)
+DEFAULT_TOLERANCE = 0.5
+GAMUT_MODELS = ('xyz', 'lab')
+SLICE_SIZE = 256
+SLICE_EXTENT = 128.0
+
+
+def srgb_excess(xyz) -> np.ndarray:
+    """На сколько уровней 0..255 цвет выходит за sRGB (0 внутри охвата).
+
+    Это то, что xyz_to_rgb молча отрезает min/max: берётся наибольший выход
+    по трём каналам после гамма-коррекции.
+    """
+    return _excess(color_engine.xyz_to_linear_batch(xyz))
+
+
+def _excess(linear) -> np.ndarray:
+    encoded = color_engine.delinearize_batch(linear) * 255
+    return np.maximum(np.maximum(-encoded, encoded - 255), 0).max(axis=-1)
+
+
+def out_of_gamut(colors, model: str, tolerance: float = DEFAULT_TOLERANCE) -> np.ndarray:
+    """Маска цветов (..., 3) в XYZ или LAB, которые не представимы в sRGB"""
+    if model not in GAMUT_MODELS:
+        raise ValueError(f"Проверка охвата доступна для моделей {GAMUT_MODELS}, получено {model}")
+    xyz = color_engine.lab_to_xyz_batch(colors) if model == 'lab' else colors
+    excess = srgb_excess(xyz)
+    # NaN не представим ни в какой модели
+    return (excess > tolerance) | np.isnan(excess)
+
+
+def xyz_out_of_gamut(xyz, tolerance: float = DEFAULT_TOLERANCE) -> np.ndarray:
+    return out_of_gamut(xyz, 'xyz', tolerance)
+
+
+def lab_out_of_gamut(lab, tolerance: float = DEFAULT_TOLERANCE) -> np.ndarray:
+    return out_of_gamut(lab, 'lab', tolerance)
+
+
+@dataclass
+class GamutSlice:
+    """Срез охвата sRGB плоскостью a*b* при фиксированном L*.
+
+    Строки идут сверху вниз по убыванию b*, столбцы - по возрастанию a*,
+    как на обычной диаграмме. rgb - цвет каждой точки после ограничения.
+    """
+    lightness: float
+    a: np.ndarray
+    b: np.ndarray
+    inside: np.ndarray
+    boundary: np.ndarray
+    rgb: np.ndarray
+
+    @property
+    def coverage(self) -> float:
+        """Доля площади среза внутри охвата"""
+        return float(self.inside.mean())
+
+    def pixel_of(self, a: float, b: float):
+        """Ближайшая точка сетки (столбец, строка) для значений a*, b*"""
+        col = int(round((a - self.a[0]) / (self.a[-1] - self.a[0]) * (len(self.a) - 1)))
+        row = int(round((self.b[0] - b) / (self.b[0] - self.b[-1]) * (len(self.b) - 1)))
+        return col, row
+
+
+def _edges(mask) -> np.ndarray:
+    """Точки маски, у которых хотя бы один из 4 соседей вне маски"""
+    padded = np.pad(mask, 1, constant_values=False)
+    interior = (padded[:-2, 1:-1] & padded[2:, 1:-1] & padded[1:-1, :-2] & padded[1:-1, 2:])
+    return mask & ~interior
+
+
+def ab_slice(lightness: float, size: int = SLICE_SIZE, extent: float = SLICE_EXTENT,
+             tolerance: float = 0.0) -> GamutSlice:
+    """Срез охвата на сетке size x size в квадрате |a*|, |b*| <= extent за один проход.
+
+    При фиксированном L* X зависит только от a*, Z - только от b*, поэтому
+    XYZ считается по столбцам и строкам, а линейный RGB плоскости собирается
+    сложением (xM0 + yM1) по столбцам и zM2 по строкам - в том же порядке
+    операций, что и в xyz_to_rgb_batch, так что цвета совпадают побитно.
+    """
+    if size < 2:
+        raise ValueError("Размер среза должен быть не меньше 2")
+    a = np.linspace(-extent, extent, size)
+    b = np.linspace(extent, -extent, size)
+    xyz = color_engine.lab_to_xyz_batch(np.stack([np.full(size, float(lightness)), a, b], axis=-1))
+    cols, rows = xyz.copy(), np.zeros_like(xyz)
+    cols[:, 2] = 0.0
+    rows[:, 2] = xyz[:, 2]
+    linear = (color_engine.xyz_to_linear_batch(cols)[None, :, :]
+              + color_engine.xyz_to_linear_batch(rows)[:, None, :])
+
+    if tolerance:
+        inside = _excess(linear) <= tolerance
+    else:
+        valid = (linear >= 0) & (linear <= 1)
+        inside = valid[..., 0] & valid[..., 1] & valid[..., 2]
+    rgb = color_engine.linear_to_rgb_batch(linear).astype(np.uint8)
+    return GamutSlice(float(lightness), a, b, inside, _edges(inside), rgb)
+
+
+def max_chroma(lightness, hues, steps: int = 32, limit: float = 200.0) -> np.ndarray:
+    """Наибольшая насыщенность C* в охвате sRGB для каждого тона (градусы).
+
+    Бисекция по лучу от нейтральной оси идёт сразу для всех тонов; срез при
+    фиксированном L* считается звёздным относительно оси.
+    """
+    hues = np.radians(np.asarray(hues, dtype=np.float64))
+    lightness = np.broadcast_to(np.asarray(lightness, dtype=np.float64), hues.shape)
+    lo, hi = np.zeros(hues.shape), np.full(hues.shape, limit)
+    for _ in range(steps):
+        mid = (lo + hi) / 2
+        lab = np.stack([lightness, mid * np.cos(hues), mid * np.sin(hues)], axis=-1)
+        inside = ~out_of_gamut(lab, 'lab', tolerance=0.0)
+        lo, hi = np.where(inside, mid, lo), np.where(inside, hi, mid)
+    return lo
+
+
+@lru_cache(maxsize=8)
+def _checker_board(shape, checker: int) -> np.ndarray:
+    rows, cols = np.indices(shape)
+    dark = ((rows // checker + cols // checker) % 2).astype(bool)
+    return np.where(dark[..., None], np.uint8(170), np.uint8(210)).repeat(3, axis=-1)
+
+
+def slice_image(slc: GamutSlice, checker: int = 8, boundary_color=(0, 0, 0)) -> np.ndarray:
+    """Изображение (H, W, 3) uint8: цвета внутри охвата, шахматка снаружи, контур границы"""
+    image = np.where(slc.inside[..., None], slc.rgb, _checker_board(slc.inside.shape, checker))
+    image[slc.boundary] = boundary_color
+    return image
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка охвата sRGB и срезы границы охвата в LAB")
+    sub = parser.add_subparsers(dest='command', required=True)
+    check = sub.add_parser('check', help="проверить цвета: по одному на аргумент, через запятую")
+    check.add_argument('--from', dest='src', choices=GAMUT_MODELS, default='lab')
+    check.add_argument('colors', nargs='+')
+    check.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    cut = sub.add_parser('slice', help="сохранить срез a*b* при заданном L* в PNG")
+    cut.add_argument('lightness', type=float)
+    cut.add_argument('output')
+    cut.add_argument('--size', type=int, default=SLICE_SIZE)
+    args = parser.parse_args()
+
+    if args.command == 'check':
+        colors = np.array([[float(v) for v in c.split(',')] for c in args.colors])
+        excess = srgb_excess(color_engine.lab_to_xyz_batch(colors) if args.src == 'lab' else colors)
+        for text, value in zip(args.colors, excess):
+            state = "вне охвата" if value > args.tolerance else "в охвате"
+            print(f"{text}: {state} (выход {value:.2f} уровня)")
+        return
+
+    from PIL import Image
+
+    slc = ab_slice(args.lightness, args.size)
+    Image.fromarray(slice_image(slc)).save(args.output)
+    print(f"L* = {slc.lightness:g}: в охвате {slc.coverage:.1%} площади среза")
+
+
+if __name__ == "__main__":
+    main()
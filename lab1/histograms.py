@@ -0,0 +1,298 @@
+import argparse
+import math
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+import color_engine
+import image_io
+
+SPACES = ('rgb', 'hsv', 'lab')
+# Границы бинов по каналам; значения на верхней границе попадают в последний бин
+RANGES = {
+    'rgb': ((0, 256), (0, 256), (0, 256)),
+    'hsv': ((0, 360), (0, 100), (0, 100)),
+    'lab': ((0, 100), (-128, 128), (-128, 128)),
+}
+DEFAULT_BINS = 32
+# Наибольшее число ячеек гистограммы (произведение бинов по каналам)
+MAX_CELLS = 1 << 24
+# Для изображений от этого числа пикселей сначала считается число пикселей
+# каждого цвета (bincount по 24-битным кодам), и в модели переводятся только
+# встретившиеся цвета, а не все пиксели
+COUNT_MIN_PIXELS = 1 << 21
+# Тепловая карта: нулевые ячейки чёрные, остальные по логарифму числа пикселей
+HEAT_STOPS = ((20, 10, 40), (90, 20, 110), (190, 40, 80), (245, 130, 30), (255, 240, 160))
+# Значения остальных каналов при раскраске столбцов одномерной гистограммы
+BAR_BASE = {'rgb': (0, 0, 0), 'hsv': (0, 100, 100), 'lab': (60, 0, 0)}
+
+Channels = Union[str, Sequence[Union[str, int]], None]
+Bins = Union[int, Sequence[int]]
+
+
+@dataclass
+class Histogram:
+    """Число пикселей в ячейках сетки бинов по выбранным каналам модели"""
+    space: str
+    channels: Tuple[int, ...]
+    counts: np.ndarray
+    pixels: int
+    elapsed: float
+
+    @property
+    def bins(self) -> Tuple[int, ...]:
+        return self.counts.shape
+
+    @property
+    def names(self) -> str:
+        return ''.join(self.space[c] for c in self.channels)
+
+    def edges(self) -> List[np.ndarray]:
+        return [np.linspace(*RANGES[self.space][c], n + 1) for c, n in zip(self.channels, self.bins)]
+
+    def marginal(self, channels: Channels) -> 'Histogram':
+        """Гистограмма по части каналов - сумма по остальным осям"""
+        keep = _channels(self.space, channels)
+        missing = [c for c in keep if c not in self.channels]
+        if missing:
+            raise ValueError(f"В гистограмме нет каналов {''.join(self.space[c] for c in missing)}")
+        drop = tuple(axis for axis, c in enumerate(self.channels) if c not in keep)
+        counts = self.counts.sum(axis=drop)
+        # Оси в порядке запрошенных каналов
+        order = [c for c in self.channels if c in keep]
+        counts = np.transpose(counts, [order.index(c) for c in keep])
+        return Histogram(self.space, keep, counts, self.pixels, 0.0)
+
+
+def _channels(space: str, channels: Channels) -> Tuple[int, ...]:
+    if space not in RANGES:
+        raise ValueError(f"Неизвестное пространство: {space}, доступны {SPACES}")
+    if channels is None:
+        return (0, 1, 2)
+    result = []
+    for channel in channels:
+        if isinstance(channel, str):
+            if channel not in space:
+                raise ValueError(f"У модели {space} нет канала {channel}, доступны {tuple(space)}")
+            channel = space.index(channel)
+        if not 0 <= channel < 3 or channel in result:
+            raise ValueError(f"Неверный набор каналов: {channels}")
+        result.append(int(channel))
+    if not result:
+        raise ValueError("Нужен хотя бы один канал")
+    return tuple(result)
+
+
+def _bins(bins: Bins, count: int) -> Tuple[int, ...]:
+    bins = (int(bins),) * count if np.ndim(bins) == 0 else tuple(int(n) for n in bins)
+    if len(bins) != count or min(bins) < 1:
+        raise ValueError(f"Нужно {count} положительных чисел бинов, получено {bins}")
+    if math.prod(bins) > MAX_CELLS:
+        raise ValueError(f"Слишком много ячеек: {math.prod(bins)}, допустимо до {MAX_CELLS}")
+    return bins
+
+
+def color_counts(rgb) -> Tuple[np.ndarray, np.ndarray]:
+    """Встретившиеся цвета (U, 3) uint8 и число пикселей каждого за один bincount"""
+    flat = _as_rgb(rgb).astype(np.uint32)
+    packed = (flat[:, 0] << 16) | (flat[:, 1] << 8) | flat[:, 2]
+    counts = np.bincount(packed, minlength=1 << 24)
+    present = np.flatnonzero(counts).astype(np.uint32)
+    colors = np.stack([present >> 16, (present >> 8) & 0xFF, present & 0xFF], axis=-1).astype(np.uint8)
+    return colors, counts[present]
+
+
+def _as_rgb(rgb) -> np.ndarray:
+    rgb = np.asarray(rgb)
+    if rgb.ndim == 0 or rgb.shape[-1] != 3:
+        raise ValueError(f"Ожидался массив формы (..., 3), получено {rgb.shape}")
+    if rgb.dtype != np.uint8:
+        if rgb.dtype.kind not in 'iu' or (rgb.size and (rgb.min() < 0 or rgb.max() > 255)):
+            raise ValueError("Ожидались целые уровни RGB 0..255")
+        rgb = rgb.astype(np.uint8)
+    return rgb.reshape(-1, 3)
+
+
+def _packed_index(values: np.ndarray, space: str, channels: Tuple[int, ...],
+                  bins: Tuple[int, ...]) -> np.ndarray:
+    """Номер ячейки каждого цвета: индексы бинов по каналам в одном int64"""
+    packed = np.zeros(len(values), dtype=np.int64)
+    for channel, n in zip(channels, bins):
+        lo, hi = RANGES[space][channel]
+        column = values[:, channel]
+        if column.dtype.kind in 'iu':
+            # Уровни RGB: целочисленно и без переполнения uint8
+            index = (column.astype(np.int64) - lo) * n // (hi - lo)
+        else:
+            index = ((column - lo) * n / (hi - lo)).astype(np.int64)
+        np.clip(index, 0, n - 1, out=index)
+        packed *= n
+        packed += index
+    return packed
+
+
+def histograms(rgb, requests: Sequence[Tuple[str, Channels, Bins]]) -> List[Histogram]:
+    """Несколько гистограмм изображения (..., 3) за один проход на пространство.
+
+    requests - тройки (пространство, каналы, бины), например
+    [('rgb', None, 16), ('hsv', 'hs', (36, 10)), ('lab', 'ab', 64)].
+    Цвета переводятся в каждое пространство один раз, затем каждая
+    гистограмма - один np.bincount по упакованным номерам ячеек.
+    """
+    start = time.perf_counter()
+    flat = _as_rgb(rgb)
+    pixels = len(flat)
+    specs = []
+    for space, channels, bins in requests:
+        channels = _channels(space, channels)
+        specs.append((space, channels, _bins(bins, len(channels))))
+
+    if pixels >= COUNT_MIN_PIXELS:
+        colors, weights = color_counts(flat)
+    else:
+        colors, weights = flat, None
+    prepared = time.perf_counter() - start
+
+    results: List[Optional[Histogram]] = [None] * len(specs)
+    for space in dict.fromkeys(space for space, _, _ in specs):
+        t0 = time.perf_counter()
+        values = colors if space == 'rgb' else color_engine.convert(colors, 'rgb', space)
+        for i, (s, channels, bins) in enumerate(specs):
+            if s != space:
+                continue
+            counts = np.bincount(_packed_index(values, space, channels, bins), weights,
+                                 minlength=math.prod(bins))
+            results[i] = Histogram(space, channels, counts.astype(np.int64).reshape(bins), pixels,
+                                   prepared + time.perf_counter() - t0)
+            t0 = time.perf_counter()
+    return results
+
+
+def histogram(rgb, space: str = 'rgb', channels: Channels = None, bins: Bins = DEFAULT_BINS) -> Histogram:
+    return histograms(rgb, [(space, channels, bins)])[0]
+
+
+# Массив (H, W, 3) uint8 из файла, PIL.Image или массива; файл читается полосами
+load_rgb = image_io.load_rgb
+
+
+# ---------------------------------------------------------------------------
+# Тепловые карты
+# ---------------------------------------------------------------------------
+
+def _heat(counts: np.ndarray, peak: int) -> np.ndarray:
+    level = np.log1p(counts) / np.log1p(max(peak, 1)) * (len(HEAT_STOPS) - 1)
+    stops = np.array(HEAT_STOPS, dtype=np.float64)
+    low = np.minimum(level.astype(np.int64), len(HEAT_STOPS) - 2)
+    frac = (level - low)[..., None]
+    rgb = stops[low] * (1 - frac) + stops[low + 1] * frac
+    rgb[counts == 0] = 0
+    return rgb.astype(np.uint8)
+
+
+def _upscale(image: np.ndarray, size: int) -> np.ndarray:
+    scale_y = max(1, size // image.shape[0])
+    scale_x = max(1, size // image.shape[1])
+    return np.repeat(np.repeat(image, scale_y, axis=0), scale_x, axis=1)
+
+
+def _bars(hist: Histogram, size: int) -> np.ndarray:
+    (n,), channel = hist.bins, hist.channels[0]
+    width = max(1, size // n)
+    height = size // 2
+    centers = (hist.edges()[0][:-1] + hist.edges()[0][1:]) / 2
+    base = np.tile(np.array(BAR_BASE[hist.space], dtype=np.float64), (n, 1))
+    base[:, channel] = centers
+    colors = np.clip(color_engine.convert(base, hist.space, 'rgb'), 0, 255).astype(np.uint8)
+    tops = np.round(hist.counts / max(hist.counts.max(), 1) * height).astype(np.int64)
+    rows = np.arange(height)[::-1, None]
+    image = np.where((rows < tops)[..., None], colors[None], np.uint8(24))
+    return np.repeat(image, width, axis=1).astype(np.uint8)
+
+
+def render(hist: Histogram, size: int = 256) -> np.ndarray:
+    """Изображение (H, W, 3) uint8: столбцы для 1D, тепловая карта для 2D,
+    сетка срезов по третьему каналу для 3D.
+
+    На тепловой карте первый канал идёт слева направо, второй - снизу вверх.
+    """
+    if len(hist.bins) == 1:
+        return _bars(hist, size)
+    peak = int(hist.counts.max())
+    # (x, y) -> строки изображения сверху вниз
+    planes = np.moveaxis(hist.counts, (0, 1), (1, 0))[::-1]
+    if len(hist.bins) == 2:
+        return _upscale(_heat(planes, peak), size)
+    slices = planes.shape[2]
+    cols = math.ceil(math.sqrt(slices))
+    rows = math.ceil(slices / cols)
+    tile = _upscale(_heat(planes[:, :, 0], peak), size // cols).shape
+    sheet = np.full(((tile[0] + 1) * rows - 1, (tile[1] + 1) * cols - 1, 3), 64, dtype=np.uint8)
+    for k in range(slices):
+        y, x = divmod(k, cols)
+        sheet[y * (tile[0] + 1):y * (tile[0] + 1) + tile[0],
+              x * (tile[1] + 1):x * (tile[1] + 1) + tile[1]] = _upscale(_heat(planes[:, :, k], peak), size // cols)
+    return sheet
+
+
+def save_png(hist: Histogram, path, size: int = 512) -> Path:
+    path = Path(path)
+    image_io.pil().fromarray(render(hist, size)).save(path)
+    return path
+
+
+def save_csv(hist: Histogram, path) -> Path:
+    """Строка на ячейку: границы бинов по каналам, число пикселей и доля"""
+    path = Path(path)
+    edges = hist.edges()
+    index = np.indices(hist.bins).reshape(len(hist.bins), -1)
+    columns = []
+    for axis_edges, axis_index in zip(edges, index):
+        columns += [axis_edges[axis_index], axis_edges[axis_index + 1]]
+    counts = hist.counts.reshape(-1)
+    columns += [counts, counts / max(hist.pixels, 1)]
+    header = ','.join([f'{name}_{end}' for name in hist.names for end in ('lo', 'hi')] + ['count', 'fraction'])
+    fmt = ['%g'] * (2 * len(edges)) + ['%d', '%.8g']
+    np.savetxt(path, np.column_stack(columns), fmt=fmt, delimiter=',', header=header, comments='')
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Гистограммы цветов изображения в RGB/HSV/LAB")
+    parser.add_argument('image')
+    parser.add_argument('--space', choices=SPACES, default='rgb')
+    parser.add_argument('--channels', help="каналы модели, например hs или ab (по умолчанию все три)")
+    parser.add_argument('--bins', type=int, nargs='+', default=[DEFAULT_BINS],
+                        help="бинов на канал: одно число для всех или по числу на канал")
+    parser.add_argument('-o', '--output', help="CSV с числом пикселей в ячейках")
+    parser.add_argument('--png', help="тепловая карта в PNG")
+    parser.add_argument('--size', type=int, default=512, help="размер тепловой карты")
+    parser.add_argument('--top', type=int, default=10, help="сколько самых заполненных ячеек показать")
+    image_io.add_pixel_limit_argument(parser)
+    args = parser.parse_args()
+    image_io.apply_pixel_limit(args.max_pixels)
+
+    channels = _channels(args.space, args.channels)
+    bins = args.bins[0] if len(args.bins) == 1 else args.bins
+    hist = histogram(load_rgb(args.image), args.space, channels, bins)
+    print(f"{args.space.upper()} {hist.names} {'x'.join(map(str, hist.bins))}: "
+          f"{hist.pixels} пикс., {hist.elapsed:.2f} с, занято ячеек {np.count_nonzero(hist.counts)}")
+    edges = hist.edges()
+    flat = hist.counts.reshape(-1)
+    for cell in np.argsort(-flat, kind='stable')[:args.top]:
+        if not flat[cell]:
+            break
+        index = np.unravel_index(cell, hist.bins)
+        ranges = ', '.join(f"{name} {e[i]:g}..{e[i + 1]:g}" for name, e, i in zip(hist.names, edges, index))
+        print(f"  {ranges}: {flat[cell] / hist.pixels:.2%}")
+    if args.output:
+        print(f"CSV: {save_csv(hist, args.output)}")
+    if args.png:
+        print(f"PNG: {save_png(hist, args.png, args.size)}")
+
+
+if __name__ == "__main__":
+    main()
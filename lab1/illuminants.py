@@ -0,0 +1,219 @@
+import argparse
+from functools import lru_cache
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+
+import color_engine
+
+# Белые точки (X, Y, Z) при Y = 100, стандартный наблюдатель 2° (ASTM E308)
+ILLUMINANTS = {
+    'A': (109.850, 100.000, 35.585),
+    'B': (99.0927, 100.000, 85.313),
+    'C': (98.074, 100.000, 118.232),
+    'D50': (96.422, 100.000, 82.521),
+    'D55': (95.682, 100.000, 92.149),
+    'D65': color_engine.REF_WHITE,
+    'D75': (94.972, 100.000, 122.638),
+    'E': (100.000, 100.000, 100.000),
+    'F2': (99.187, 100.000, 67.395),
+    'F7': (95.044, 100.000, 108.755),
+    'F11': (100.966, 100.000, 64.370),
+}
+# XYZ в color_engine - это XYZ sRGB с белой точкой D65 (экран); D50 - белая
+# точка профилей ICC (печать)
+SCREEN = 'D65'
+PRINT = 'D50'
+
+# Матрицы перехода из XYZ в пространство колбочек (LMS) для адаптации по фон Крису
+CAT_MATRICES = {
+    'bradford': ((0.8951, 0.2664, -0.1614),
+                 (-0.7502, 1.7135, 0.0367),
+                 (0.0389, -0.0685, 1.0296)),
+    'cat02': ((0.7328, 0.4296, -0.1624),
+              (-0.7036, 1.6975, 0.0061),
+              (0.0030, 0.0136, 0.9834)),
+    'von_kries': ((0.40024, 0.70760, -0.08081),
+                  (-0.22630, 1.16532, 0.04570),
+                  (0.0, 0.0, 0.91822)),
+    'xyz_scaling': ((1.0, 0.0, 0.0),
+                    (0.0, 1.0, 0.0),
+                    (0.0, 0.0, 1.0)),
+}
+DEFAULT_METHOD = 'bradford'
+
+Illuminant = Union[str, Sequence[float]]
+
+
+def white_point(illuminant: Illuminant) -> Tuple[float, float, float]:
+    """Белая точка по имени источника ('D50', 'a', ...) или по трём числам X, Y, Z"""
+    if isinstance(illuminant, str):
+        white = ILLUMINANTS.get(illuminant.upper())
+        if white is None:
+            raise ValueError(f"Неизвестный источник: {illuminant}, доступны {tuple(ILLUMINANTS)}")
+        return white
+    white = tuple(float(v) for v in illuminant)
+    if len(white) != 3 or min(white) <= 0:
+        raise ValueError(f"Белая точка должна состоять из трёх положительных чисел, получено {white}")
+    return white
+
+
+def _freeze(matrix: np.ndarray) -> np.ndarray:
+    # Матрицы отдаются из кэша всем вызывающим, поэтому только для чтения
+    matrix.setflags(write=False)
+    return matrix
+
+
+@lru_cache(maxsize=128)
+def _adaptation(src: Tuple[float, ...], dst: Tuple[float, ...], method: str) -> np.ndarray:
+    if src == dst:
+        return _freeze(np.eye(3))
+    cone = np.array(CAT_MATRICES[method])
+    gain = (cone @ np.array(dst)) / (cone @ np.array(src))
+    return _freeze(np.linalg.inv(cone) @ (gain[:, None] * cone))
+
+
+def _check_method(method: str) -> str:
+    if method not in CAT_MATRICES:
+        raise ValueError(f"Неизвестный метод адаптации: {method}, доступны {tuple(CAT_MATRICES)}")
+    return method
+
+
+def _colors(colors) -> np.ndarray:
+    arr = np.asarray(colors, dtype=np.float64)
+    if arr.ndim == 0 or arr.shape[-1] != 3:
+        raise ValueError(f"Ожидался массив формы (..., 3), получено {arr.shape}")
+    return arr
+
+
+def adaptation_matrix(src: Illuminant, dst: Illuminant, method: str = DEFAULT_METHOD) -> np.ndarray:
+    """Матрица 3x3 хроматической адаптации XYZ от белой точки src к dst.
+
+    Считается один раз на пару белых точек и метод, дальше берётся из кэша.
+    """
+    return _adaptation(white_point(src), white_point(dst), _check_method(method))
+
+
+# Составные матрицы пакетных преобразований: адаптация, белая точка и матрица
+# sRGB перемножаются заранее, и на каждый цвет приходится одно умножение 3x3.
+# Матрицы транспонированы под умножение строк массива (..., 3) справа.
+
+@lru_cache(maxsize=128)
+def _xyz_to_ratios(src, dst, method: str) -> np.ndarray:
+    return _freeze((np.diag([1 / v for v in dst]) @ _adaptation(src, dst, method)).T.copy())
+
+
+@lru_cache(maxsize=128)
+def _ratios_to_xyz(src, dst, method: str) -> np.ndarray:
+    return _freeze((_adaptation(src, dst, method) @ np.diag(src)).T.copy())
+
+
+@lru_cache(maxsize=128)
+def _linear_to_ratios(dst, method: str) -> np.ndarray:
+    srgb = np.array(color_engine.RGB_TO_XYZ) * 100
+    return _freeze((np.diag([1 / v for v in dst])
+                    @ _adaptation(white_point(SCREEN), dst, method) @ srgb).T.copy())
+
+
+@lru_cache(maxsize=128)
+def _ratios_to_linear(src, method: str) -> np.ndarray:
+    srgb = np.array(color_engine.XYZ_TO_RGB) / 100
+    return _freeze((srgb @ _adaptation(src, white_point(SCREEN), method) @ np.diag(src)).T.copy())
+
+
+def adapt(xyz: Sequence[float], src: Illuminant, dst: Illuminant,
+          method: str = DEFAULT_METHOD) -> List[float]:
+    """XYZ одного цвета под белой точкой src -> под белой точкой dst"""
+    m = adaptation_matrix(src, dst, method).tolist()
+    x, y, z = xyz[0], xyz[1], xyz[2]
+    return [x * m[0][0] + y * m[0][1] + z * m[0][2],
+            x * m[1][0] + y * m[1][1] + z * m[1][2],
+            x * m[2][0] + y * m[2][1] + z * m[2][2]]
+
+
+def adapt_batch(xyz, src: Illuminant, dst: Illuminant, method: str = DEFAULT_METHOD) -> np.ndarray:
+    """Адаптация массива XYZ (..., 3) одним умножением на матрицу"""
+    return _colors(xyz) @ adaptation_matrix(src, dst, method).T
+
+
+def xyz_to_lab(xyz: Sequence[float], illuminant: Illuminant = PRINT, source: Illuminant = SCREEN,
+               method: str = DEFAULT_METHOD) -> List[float]:
+    """LAB относительно белой точки illuminant для XYZ, заданного под белой точкой source"""
+    return color_engine.xyz_to_lab(adapt(xyz, source, illuminant, method), white_point(illuminant))
+
+
+def lab_to_xyz(lab: Sequence[float], illuminant: Illuminant = PRINT, target: Illuminant = SCREEN,
+               method: str = DEFAULT_METHOD) -> List[float]:
+    """LAB относительно белой точки illuminant -> XYZ под белой точкой target"""
+    return adapt(color_engine.lab_to_xyz(lab, white_point(illuminant)), illuminant, target, method)
+
+
+def rgb_to_lab(rgb: Sequence[float], illuminant: Illuminant = PRINT,
+               method: str = DEFAULT_METHOD) -> List[float]:
+    return xyz_to_lab(color_engine.rgb_to_xyz(rgb), illuminant, SCREEN, method)
+
+
+def lab_to_rgb(lab: Sequence[float], illuminant: Illuminant = PRINT,
+               method: str = DEFAULT_METHOD) -> List[int]:
+    return color_engine.xyz_to_rgb(lab_to_xyz(lab, illuminant, SCREEN, method))
+
+
+def xyz_to_lab_batch(xyz, illuminant: Illuminant = PRINT, source: Illuminant = SCREEN,
+                     method: str = DEFAULT_METHOD) -> np.ndarray:
+    matrix = _xyz_to_ratios(white_point(source), white_point(illuminant), _check_method(method))
+    return color_engine.ratios_to_lab_batch(_colors(xyz) @ matrix)
+
+
+def lab_to_xyz_batch(lab, illuminant: Illuminant = PRINT, target: Illuminant = SCREEN,
+                     method: str = DEFAULT_METHOD) -> np.ndarray:
+    matrix = _ratios_to_xyz(white_point(illuminant), white_point(target), _check_method(method))
+    return color_engine.lab_to_ratios_batch(lab) @ matrix
+
+
+def rgb_to_lab_batch(rgb, illuminant: Illuminant = PRINT, method: str = DEFAULT_METHOD) -> np.ndarray:
+    """LAB под источником illuminant прямо из sRGB: линеаризация и одна матрица 3x3"""
+    matrix = _linear_to_ratios(white_point(illuminant), _check_method(method))
+    return color_engine.ratios_to_lab_batch(color_engine.linearize_batch(rgb) @ matrix)
+
+
+def lab_to_rgb_batch(lab, illuminant: Illuminant = PRINT, method: str = DEFAULT_METHOD) -> np.ndarray:
+    matrix = _ratios_to_linear(white_point(illuminant), _check_method(method))
+    return color_engine.linear_to_rgb_batch(color_engine.lab_to_ratios_batch(lab) @ matrix)
+
+
+def cache_info():
+    """Заполненность кэшей матриц: пары источников, для которых матрицы уже посчитаны"""
+    return {name: func.cache_info() for name, func in (
+        ('adaptation', _adaptation), ('xyz_to_lab', _xyz_to_ratios), ('lab_to_xyz', _ratios_to_xyz),
+        ('rgb_to_lab', _linear_to_ratios), ('lab_to_rgb', _ratios_to_linear))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LAB под разными источниками и матрицы хроматической адаптации")
+    sub = parser.add_subparsers(dest='command', required=True)
+    show = sub.add_parser('matrix', help="показать матрицу адаптации XYZ")
+    show.add_argument('src')
+    show.add_argument('dst')
+    show.add_argument('--method', choices=CAT_MATRICES, default=DEFAULT_METHOD)
+    lab = sub.add_parser('lab', help="LAB цветов RGB (через запятую) под выбранным источником")
+    lab.add_argument('colors', nargs='+')
+    lab.add_argument('--illuminant', default=PRINT)
+    lab.add_argument('--method', choices=CAT_MATRICES, default=DEFAULT_METHOD)
+    args = parser.parse_args()
+
+    if args.command == 'matrix':
+        print(f"{args.src.upper()} -> {args.dst.upper()} ({args.method}):")
+        for row in adaptation_matrix(args.src, args.dst, args.method):
+            print("  " + "  ".join(f"{v:>10.7f}" for v in row))
+        return
+
+    rgb = np.array([[int(v) for v in c.split(',')] for c in args.colors])
+    screen = color_engine.rgb_to_lab_batch(rgb)
+    adapted = rgb_to_lab_batch(rgb, args.illuminant, args.method)
+    for text, d65, other in zip(args.colors, screen, adapted):
+        print(f"{text}: {SCREEN} ({d65[0]:.2f}, {d65[1]:.2f}, {d65[2]:.2f})  "
+              f"{args.illuminant.upper()} ({other[0]:.2f}, {other[1]:.2f}, {other[2]:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import argparse
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+import color_engine
+import image_io
+
+IMAGE_MODELS = ('cmyk', 'hsv', 'hls', 'xyz', 'lab')
+DEFAULT_TILE = 1024
+
+
+@dataclass
+class StageProgress:
+    """Состояние одного этапа: загрузка или преобразование в одну модель"""
+    stage: str
+    done: int
+    total: int
+    elapsed: float
+
+    @property
+    def fraction(self) -> float:
+        return self.done / self.total if self.total else 1.0
+
+    @property
+    def throughput(self) -> float:
+        """Пикселей в секунду"""
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.stage.upper()}: {self.done}/{self.total} пикс., "
+                f"{self.throughput / 1e6:.1f} Мпикс/с")
+
+
+@dataclass
+class ImageConversionResult:
+    width: int
+    height: int
+    paths: Dict[str, Path] = field(default_factory=dict)
+    stages: Dict[str, StageProgress] = field(default_factory=dict)
+
+
+ProgressCallback = Callable[[StageProgress], None]
+
+
+def iter_tiles(width: int, height: int, tile: int) -> Iterator[Tuple[int, int, int, int]]:
+    """Прямоугольники (x0, y0, x1, y1) размером не больше tile x tile"""
+    for y0 in range(0, height, tile):
+        for x0 in range(0, width, tile):
+            yield x0, y0, min(x0 + tile, width), min(y0 + tile, height)
+
+
+def convert_image(source, output_dir, models: Sequence[str] = IMAGE_MODELS,
+                  tile: int = DEFAULT_TILE, progress: Optional[ProgressCallback] = None,
+                  stem: Optional[str] = None, dtype=np.float32) -> ImageConversionResult:
+    """Записать плоскости каналов изображения во всех моделях.
+
+    Каждая модель сохраняется в <stem>_<model>.npy формы (C, H, W). Изображение
+    читается полосами высотой tile (см. image_io.StripReader) и преобразуется
+    тайлами tile x tile, поэтому рабочая память на вещественные значения
+    ограничена размером тайла. Исходные пиксели ограничены полосой только для
+    несжатых файлов; PNG, JPEG и сжатый TIFF Pillow декодирует целиком.
+    Этап load - чтение полос и перевод их в RGB.
+    """
+    for model in models:
+        if model not in color_engine.CHANNELS or model == 'rgb':
+            raise ValueError(f"Неизвестная цветовая модель: {model}")
+    if tile <= 0:
+        raise ValueError("Размер тайла должен быть положительным")
+
+    if stem is None:
+        stem = Path(source).stem if isinstance(source, (str, Path)) else 'image'
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    with image_io.StripReader(source) as src:
+        width, height = src.width, src.height
+        total = width * height
+        result = ImageConversionResult(width, height)
+        load = result.stages['load'] = StageProgress('load', 0, total, 0.0)
+
+        # Смещение данных за заголовком .npy
+        offsets = {}
+        for model in models:
+            path = output_dir / f'{stem}_{model}.npy'
+            shape = (color_engine.CHANNELS[model], height, width)
+            plane = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+            offsets[model] = plane.offset
+            del plane
+            result.paths[model] = path
+            result.stages[model] = StageProgress(model, 0, total, 0.0)
+        itemsize = np.dtype(dtype).itemsize
+
+        t0 = start
+        for y0, y1, strip in src.strips(tile):
+            load.elapsed += time.perf_counter() - t0
+            load.done += strip.shape[0] * width
+            if progress:
+                progress(load)
+            # Строки полосы в каждой плоскости лежат подряд; отображения живут
+            # одну полосу, и записанные страницы не копятся в памяти процесса
+            rows = {model: [np.memmap(result.paths[model], dtype=dtype, mode='r+', shape=(y1 - y0, width),
+                                      offset=offsets[model] + (c * height + y0) * width * itemsize)
+                            for c in range(color_engine.CHANNELS[model])]
+                    for model in models}
+            for x0, _, x1, _ in iter_tiles(width, y1 - y0, tile):
+                rgb = strip[:, x0:x1]
+                for model in models:
+                    stage = result.stages[model]
+                    t1 = time.perf_counter()
+                    values = color_engine.convert(rgb, 'rgb', model)
+                    for c, plane in enumerate(rows[model]):
+                        plane[:, x0:x1] = values[..., c]
+                    stage.elapsed += time.perf_counter() - t1
+                    stage.done += rgb.shape[0] * rgb.shape[1]
+                    if progress:
+                        progress(stage)
+            for planes in rows.values():
+                for plane in planes:
+                    plane.flush()
+            del rows, strip
+            t0 = time.perf_counter()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Поканальное преобразование изображения в цветовые модели")
+    parser.add_argument('image')
+    parser.add_argument('output_dir')
+    parser.add_argument('--models', nargs='+', default=list(IMAGE_MODELS), choices=IMAGE_MODELS)
+    parser.add_argument('--tile', type=int, default=DEFAULT_TILE)
+    image_io.add_pixel_limit_argument(parser)
+    args = parser.parse_args()
+    image_io.apply_pixel_limit(args.max_pixels)
+
+    def report(stage: StageProgress):
+        if stage.done == stage.total:
+            print(f"\r{stage}")
+        elif stage.stage == args.models[-1]:
+            print(f"\r{stage.fraction:.0%}", end='', flush=True)
+
+    result = convert_image(args.image, args.output_dir, args.models, args.tile, report)
+    for model, path in result.paths.items():
+        print(f"{model}: {path}")
+
+
+if __name__ == "__main__":
+    main()
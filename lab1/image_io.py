@@ -0,0 +1,202 @@
+"""Чтение изображений для пакетных режимов (преобразование, палитра, гистограммы).
+
+PIL загружается при первом открытии файла, а не при импорте модуля. Предел
+Pillow на число пикселей (защита от «бомб распаковки») не меняется: поднять
+его можно только явным флагом --max-pixels в командной строке.
+
+Несжатые растры (BMP, PPM/PGM/PBM, TIFF без сжатия, TGA) читаются из файла
+полосами, и в памяти находится только текущая полоса. Сжатые форматы (PNG,
+JPEG, GIF, TIFF со сжатием) Pillow умеет декодировать только целиком: такие
+изображения загружаются один раз в исходном режиме, а в RGB переводится
+каждая полоса отдельно.
+"""
+import math
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Пикселей в полосе по умолчанию (12 МБ в RGB)
+STRIP_PIXELS = 1 << 22
+
+# (первая строка, последняя строка + 1, смещение в файле, rawmode, байт на строку, шаг по y)
+_Piece = Tuple[int, int, int, str, int, int]
+
+
+def pil():
+    from PIL import Image
+    return Image
+
+
+def add_pixel_limit_argument(parser) -> None:
+    parser.add_argument('--max-pixels', type=int, default=None,
+                        help="поднять предел Pillow на число пикселей изображения (0 - без ограничения)")
+
+
+def apply_pixel_limit(max_pixels: Optional[int]) -> None:
+    """Задать Image.MAX_IMAGE_PIXELS из флага --max-pixels; None - оставить как есть"""
+    if max_pixels is not None:
+        if max_pixels < 0:
+            raise ValueError("Предел числа пикселей не может быть отрицательным")
+        pil().MAX_IMAGE_PIXELS = max_pixels or None
+
+
+def _row_bytes(mode: str, rawmode: str, width: int) -> Optional[int]:
+    """Байт на строку для rawmode: наименьшая длина, которой хватает декодеру raw"""
+    Image = pil()
+    for bits in (1, 2, 4, 8, 16, 24, 32, 48, 64):
+        size = (width * bits + 7) // 8
+        try:
+            Image.frombytes(mode, (width, 1), bytes(size), 'raw', rawmode)
+        except ValueError:
+            continue
+        return size
+    return None
+
+
+def _raw_pieces(image) -> Optional[List[_Piece]]:
+    """Расположение строк несжатого файла или None, если его нужно декодировать Pillow"""
+    if getattr(image, 'fp', None) is None or not getattr(image, 'tile', None):
+        return None
+    width, height = image.size
+    pieces = []
+    for tile in image.tile:
+        name, box, offset, args = tile[0], tile[1], tile[2], tile[3]
+        if isinstance(args, str):
+            args = (args,)
+        if name != 'raw' or box[0] != 0 or box[2] != width or not args:
+            return None
+        rawmode = args[0]
+        stride = args[1] if len(args) > 1 else 0
+        ystep = args[2] if len(args) > 2 else 1
+        if ystep not in (1, -1) or stride < 0:
+            return None
+        stride = stride or _row_bytes(image.mode, rawmode, width)
+        if stride is None:
+            return None
+        pieces.append((box[1], box[3], offset, rawmode, stride, ystep))
+    pieces.sort()
+    # Полосы должны покрывать изображение без перекрытий (у SGI, например,
+    # каналы лежат отдельными плоскостями на всю высоту)
+    if pieces[0][0] != 0 or pieces[-1][1] != height or any(a[1] != b[0] for a, b in zip(pieces, pieces[1:])):
+        return None
+    return pieces
+
+
+class StripReader:
+    """Полосы RGB uint8 во всю ширину из файла, PIL.Image или массива (H, W, 3).
+
+    with StripReader(path) as reader:
+        for y0, y1, rgb in reader.strips(256):   # rgb формы (y1 - y0, W, 3)
+            ...
+    """
+
+    def __init__(self, source):
+        self.array = self.image = None
+        self._owned = False
+        self._pieces: Optional[List[_Piece]] = None
+        if isinstance(source, np.ndarray):
+            if source.ndim != 3 or source.shape[2] != 3:
+                raise ValueError(f"Ожидался массив (H, W, 3), получено {source.shape}")
+            self.array = source
+            self.height, self.width = source.shape[:2]
+        else:
+            Image = pil()
+            if isinstance(source, Image.Image):
+                self.image = source
+            else:
+                self.image = Image.open(source)
+                self._owned = True
+            self.width, self.height = self.image.size
+            self._pieces = _raw_pieces(self.image)
+
+    @property
+    def streamed(self) -> bool:
+        """Строки читаются из файла по мере надобности, изображение не декодируется целиком"""
+        return self._pieces is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        if self._owned:
+            self.image.close()
+
+    def draft(self, step: int) -> int:
+        """Перед прореживанием с шагом step: JPEG декодируется сразу уменьшенным
+        (масштабирование DCT в libjpeg). Возвращает оставшийся шаг"""
+        if step <= 1 or not self._owned or self.streamed:
+            return step
+        width = self.width
+        self.image.draft('RGB', (max(1, self.width // step), max(1, self.height // step)))
+        self.width, self.height = self.image.size
+        return max(1, round(step * self.width / width))
+
+    @staticmethod
+    def _to_rgb(image) -> np.ndarray:
+        return np.asarray(image if image.mode == 'RGB' else image.convert('RGB'))
+
+    def read(self, y0: int, y1: int) -> np.ndarray:
+        """Строки y0..y1-1 в RGB"""
+        if self.array is not None:
+            return self.array[y0:y1]
+        if self._pieces is None:
+            # crop загружает всё изображение при первом вызове, дальше только копирует
+            return self._to_rgb(self.image.crop((0, y0, self.width, y1)))
+        Image = pil()
+        parts = []
+        for top, bottom, offset, rawmode, stride, ystep in self._pieces:
+            a, b = max(y0, top), min(y1, bottom)
+            if a >= b:
+                continue
+            # Снизу вверх (BMP, TGA) строки a..b-1 лежат в файле одним блоком в обратном порядке
+            first = a - top if ystep == 1 else bottom - b
+            self.image.fp.seek(offset + first * stride)
+            data = self.image.fp.read((b - a) * stride)
+            strip = Image.frombytes(self.image.mode, (self.width, b - a), data, 'raw', rawmode, stride, ystep)
+            if self.image.palette is not None and strip.mode in ('P', 'PA'):
+                strip.palette = self.image.palette.copy()
+            parts.append(self._to_rgb(strip))
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def strips(self, rows: int) -> Iterator[Tuple[int, int, np.ndarray]]:
+        if rows <= 0:
+            raise ValueError("Высота полосы должна быть положительной")
+        for y0 in range(0, self.height, rows):
+            y1 = min(y0 + rows, self.height)
+            yield y0, y1, self.read(y0, y1)
+
+
+def _strip_rows(width: int, multiple: int = 1) -> int:
+    rows = max(1, STRIP_PIXELS // max(width, 1))
+    return max(multiple, rows - rows % multiple)
+
+
+def load_rgb(source) -> np.ndarray:
+    """Массив (H, W, 3) uint8 из файла, PIL.Image или массива"""
+    if isinstance(source, np.ndarray):
+        return source
+    with StripReader(source) as reader:
+        rgb = np.empty((reader.height, reader.width, 3), dtype=np.uint8)
+        for y0, y1, strip in reader.strips(_strip_rows(reader.width)):
+            rgb[y0:y1] = strip
+    return rgb
+
+
+def sample_rgb(source, max_pixels: int) -> Tuple[np.ndarray, int]:
+    """Прореженное изображение не больше max_pixels пикселей (каждый step-й
+    пиксель по обеим осям) и число пикселей исходного изображения.
+
+    В память попадают только полосы несжатого файла или уменьшенный при
+    декодировании JPEG; остальные сжатые форматы декодируются целиком, но в RGB
+    переводится только выборка.
+    """
+    if max_pixels <= 0:
+        raise ValueError("Размер выборки должен быть положительным")
+    with StripReader(source) as reader:
+        pixels = reader.width * reader.height
+        step = reader.draft(math.ceil(math.sqrt(pixels / max_pixels)))
+        parts = [strip[::step, ::step] for _, _, strip in reader.strips(_strip_rows(reader.width, step))]
+    return np.concatenate(parts), pixels
@@ -1,9 +1,39 @@
 import tkinter as tk
-from tkinter import ttk, colorchooser
-import colorsys
+from tkinter import ttk, colorchooser, filedialog, messagebox
+import threading
+import color_engine
+import color_cube
+import color_cache
+import image_convert
+import palette_quantize
+import histograms
+import latency_trace
+import gamut
+import tk_image
+import picker_planes
+from view_model import ViewModel
+
+# Период кадра: события слайдера за это время сливаются в один пересчёт
+FRAME_MS = 16
+
+# Методы, время которых учитывает трассировщик задержек (F11): {метод: этап}
+TRACED_METHODS = {
+    'read_entry': 'parse_entry',
+    'compute_models': 'convert', 'apply_channel_values': 'convert',
+    'update_sliders': 'update_sliders',
+    'update_entry_fields': 'update_entry_fields',
+    'update_value_labels': 'update_value_labels',
+    'update_preview': 'preview', 'update_plane': 'preview',
+    'update_from_entry': 'edit', 'update_from_hex': 'edit', 'update_from_rgb_entries': 'edit',
+    'update_from_slider': 'edit', 'flush_pending_updates': 'edit', 'apply_rgb': 'edit',
+    'on_tab_changed': 'edit',
+}
+
+ENTRY_FORMATS = {'rgb': '{}', 'cmyk': '{:.1f}', 'hsv': '{:.1f}', 'hls': '{:.1f}',
+                 'xyz': '{:.2f}', 'lab': '{:.2f}'}
 
 class ColorConverterApp:
-    def __init__(self, root):
+    def __init__(self, root, cache_size=color_cache.DEFAULT_CACHE_SIZE, cubes=True):
         self.root = root
         self.root.title("🎨 Конвертер цветовых моделей")
         self.root.geometry("1100x850")
@@ -22,6 +52,25 @@ class ColorConverterApp:
         self.xyz = [20.517, 21.586, 23.507]
         self.lab = [53.585, 0.003, -0.006]
         
+        self.tab_sliders = {}
+        self.tab_entries = {}
+        self.tab_frames = {}
+        self.built_tabs = set()
+        self.view = ViewModel()
+        self.cache = color_cache.ConversionCache(cache_size)
+        self.stale_tabs = set()
+        self.pending_updates = {}
+        self.update_job = None
+        self.palette = None
+        self.gamut_labels = {}
+        self.planes = {'hsv': picker_planes.HsvPlane(), 'lab': picker_planes.LabPlane()}
+        self.plane_views = {}
+        # Обёртки ставятся до создания виджетов: команды кнопок запоминают
+        # метод в момент создания
+        self.tracer = latency_trace.LatencyTracer()
+        self.tracer.instrument(self, TRACED_METHODS)
+        self.latency_panel = None
+        
         self.colors = {
             'bg': '#f0f0f0',
             'card': '#ffffff',
@@ -33,6 +82,15 @@ class ColorConverterApp:
         self.setup_styles()
         self.create_widgets()
         self.update_all_displays()
+        
+        for entry in [self.hex_entry, self.r_entry, self.g_entry, self.b_entry]:
+            self.view.track_user_edits(entry)
+        self.root.bind('<F12>', lambda e: messagebox.showinfo(
+            "Статистика", f"{self.view.summary()}\n{self.cache.summary()}"))
+        self.root.bind('<F11>', lambda e: self.show_latency_panel())
+        
+        if cubes:
+            color_cube.enable_cubes_async()
     
     def setup_styles(self):
         style = ttk.Style()
@@ -42,117 +100,6 @@ class ColorConverterApp:
         style.configure('Header.TLabel', font=('Arial', 14, 'bold'), foreground=self.colors['primary'])
         style.configure('Primary.TButton', font=('Arial', 10, 'bold'))
     
-    def rgb_to_cmyk(self, rgb):
-        r, g, b = rgb[0]/255.0, rgb[1]/255.0, rgb[2]/255.0
-        k = 1 - max(r, g, b)
-        if k == 1:
-            return [0.0, 0.0, 0.0, 100.0]
-        c = (1 - r - k) / (1 - k)
-        m = (1 - g - k) / (1 - k)
-        y = (1 - b - k) / (1 - k)
-        return [c*100, m*100, y*100, k*100]
-    
-    def cmyk_to_rgb(self, cmyk):
-        c, m, y, k = cmyk[0]/100.0, cmyk[1]/100.0, cmyk[2]/100.0, cmyk[3]/100.0
-        r = 255 * (1 - c) * (1 - k)
-        g = 255 * (1 - m) * (1 - k)
-        b = 255 * (1 - y) * (1 - k)
-        return [int(max(0, min(255, r))), 
-                int(max(0, min(255, g))), 
-                int(max(0, min(255, b)))]
-    
-    def rgb_to_hsv(self, rgb):
-        r, g, b = rgb[0]/255.0, rgb[1]/255.0, rgb[2]/255.0
-        h, s, v = colorsys.rgb_to_hsv(r, g, b)
-        return [h * 360, s * 100, v * 100]
-    
-    def hsv_to_rgb(self, hsv):
-        h, s, v = hsv[0]/360.0, hsv[1]/100.0, hsv[2]/100.0
-        r, g, b = colorsys.hsv_to_rgb(h, s, v)
-        return [int(r * 255), int(g * 255), int(b * 255)]
-    
-    def rgb_to_hls(self, rgb):
-        r, g, b = rgb[0]/255.0, rgb[1]/255.0, rgb[2]/255.0
-        h, l, s = colorsys.rgb_to_hls(r, g, b)
-        return [h * 360, l * 100, s * 100]
-    
-    def hls_to_rgb(self, hls):
-        h, l, s = hls[0]/360.0, hls[1]/100.0, hls[2]/100.0
-        r, g, b = colorsys.hls_to_rgb(h, l, s)
-        return [int(r * 255), int(g * 255), int(b * 255)]
-    
-    def rgb_to_xyz(self, rgb):
-        r, g, b = rgb[0]/255.0, rgb[1]/255.0, rgb[2]/255.0
-        
-        r = r/12.92 if r <= 0.04045 else ((r + 0.055)/1.055) ** 2.4
-        g = g/12.92 if g <= 0.04045 else ((g + 0.055)/1.055) ** 2.4
-        b = b/12.92 if b <= 0.04045 else ((b + 0.055)/1.055) ** 2.4
-        
-        x = r * 0.4124564 + g * 0.3575761 + b * 0.1804375
-        y = r * 0.2126729 + g * 0.7151522 + b * 0.0721750
-        z = r * 0.0193339 + g * 0.1191920 + b * 0.9503041
-        
-        return [x * 100, y * 100, z * 100]
-    
-    def xyz_to_rgb(self, xyz):
-        x, y, z = xyz[0]/100.0, xyz[1]/100.0, xyz[2]/100.0
-        
-        r_linear = x * 3.2404542 + y * -1.5371385 + z * -0.4985314
-        g_linear = x * -0.9692660 + y * 1.8760108 + z * 0.0415560
-        b_linear = x * 0.0556434 + y * -0.2040259 + z * 1.0572252
-        
-        r = 12.92 * r_linear if r_linear <= 0.0031308 else 1.055 * (r_linear ** (1/2.4)) - 0.055
-        g = 12.92 * g_linear if g_linear <= 0.0031308 else 1.055 * (g_linear ** (1/2.4)) - 0.055
-        b = 12.92 * b_linear if b_linear <= 0.0031308 else 1.055 * (b_linear ** (1/2.4)) - 0.055
-        
-        return [int(max(0, min(255, r * 255))), 
-                int(max(0, min(255, g * 255))), 
-                int(max(0, min(255, b * 255)))]
-    
-    def xyz_to_lab(self, xyz):
-        ref_x, ref_y, ref_z = 95.047, 100.000, 108.883
-        x, y, z = xyz[0], xyz[1], xyz[2]
-        
-        x = x / ref_x
-        y = y / ref_y
-        z = z / ref_z
-        
-        x = x ** (1/3) if x > 0.008856 else (7.787 * x) + (16/116)
-        y = y ** (1/3) if y > 0.008856 else (7.787 * y) + (16/116)
-        z = z ** (1/3) if z > 0.008856 else (7.787 * z) + (16/116)
-        
-        l = max(0, min(100, (116 * y) - 16))
-        a = max(-128, min(127, 500 * (x - y)))
-        b = max(-128, min(127, 200 * (y - z)))
-        
-        return [l, a, b]
-    
-    def lab_to_xyz(self, lab):
-        ref_x, ref_y, ref_z = 95.047, 100.000, 108.883
-        l, a, b = lab[0], lab[1], lab[2]
-        
-        y = (l + 16) / 116
-        x = a / 500 + y
-        z = y - b / 200
-        
-        x3 = x ** 3
-        y3 = y ** 3
-        z3 = z ** 3
-        
-        x = x3 if x3 > 0.008856 else (x - 16/116) / 7.787
-        y = y3 if y3 > 0.008856 else (y - 16/116) / 7.787
-        z = z3 if z3 > 0.008856 else (z - 16/116) / 7.787
-        
-        return [x * ref_x, y * ref_y, z * ref_z]
-    
-    def rgb_to_lab(self, rgb):
-        xyz = self.rgb_to_xyz(rgb)
-        return self.xyz_to_lab(xyz)
-    
-    def lab_to_rgb(self, lab):
-        xyz = self.lab_to_xyz(lab)
-        return self.xyz_to_rgb(xyz)
-    
     def create_widgets(self):
         main_container = ttk.Frame(self.root, padding="10")
         main_container.pack(fill=tk.BOTH, expand=True)
@@ -196,6 +143,12 @@ class ColorConverterApp:
         
         ttk.Button(top_frame, text="Применить", 
                   command=self.update_from_rgb_entries).pack(side=tk.LEFT, padx=10)
+        
+        ttk.Button(top_frame, text="🖼 Изображение...", 
+                  command=lambda: ImageConversionWindow(self.root)).pack(side=tk.RIGHT)
+        
+        ttk.Button(top_frame, text="📊 Гистограмма...", 
+                  command=lambda: HistogramWindow(self.root)).pack(side=tk.RIGHT, padx=5)
     
     def create_color_preview_panel(self, parent):
         preview_frame = ttk.Frame(parent)
@@ -205,34 +158,102 @@ class ColorConverterApp:
         self.color_preview = tk.Canvas(preview_frame, width=400, height=80, 
                                       highlightthickness=1, highlightbackground="#ccc")
         self.color_preview.pack(pady=5)
+        self.preview_rect = self.color_preview.create_rectangle(0, 0, 400, 80, outline="")
+        
+        palette_frame = ttk.Frame(preview_frame)
+        palette_frame.pack(pady=5)
+        ttk.Label(palette_frame, text="Палитра изображения:").pack(side=tk.LEFT)
+        self.palette_size = tk.IntVar(value=palette_quantize.DEFAULT_COLORS)
+        ttk.Spinbox(palette_frame, from_=2, to=64, width=4,
+                    textvariable=self.palette_size).pack(side=tk.LEFT, padx=5)
+        self.palette_btn = ttk.Button(palette_frame, text="🖼 Из изображения...", command=self.choose_palette_image)
+        self.palette_btn.pack(side=tk.LEFT, padx=5)
+        self.palette_export_btn = ttk.Button(palette_frame, text="💾 Экспорт...", state='disabled',
+                                             command=self.export_palette)
+        self.palette_export_btn.pack(side=tk.LEFT, padx=5)
+        self.palette_status = ttk.Label(palette_frame, text="")
+        self.palette_status.pack(side=tk.LEFT, padx=5)
+        
+        self.palette_canvas = tk.Canvas(preview_frame, width=400, height=30,
+                                        highlightthickness=1, highlightbackground="#ccc")
+        self.palette_canvas.pack()
+    
+    def choose_palette_image(self):
+        path = filedialog.askopenfilename(title="Выберите изображение",
+                                          filetypes=[("Изображения", "*.png *.jpg *.jpeg *.bmp *.tif *.tiff *.gif"),
+                                                     ("Все файлы", "*.*")])
+        if not path:
+            return
+        try:
+            n_colors = self.palette_size.get()
+        except tk.TclError:
+            n_colors = palette_quantize.DEFAULT_COLORS
+        self.palette_btn.config(state='disabled')
+        self.palette_status.config(text="Вычисление...")
+        thread = threading.Thread(target=self.run_palette_extraction, args=(path, n_colors))
+        thread.daemon = True
+        thread.start()
+    
+    def run_palette_extraction(self, path, n_colors):
+        try:
+            palette = palette_quantize.extract_palette(path, n_colors)
+            self.root.after(0, self.show_palette, palette)
+        except Exception as e:
+            self.root.after(0, self.palette_failed, str(e))
+    
+    def palette_failed(self, message):
+        self.palette_btn.config(state='normal')
+        self.palette_status.config(text="")
+        messagebox.showerror("Палитра изображения", f"Ошибка: {message}")
+    
+    def show_palette(self, palette):
+        self.palette = palette
+        self.palette_btn.config(state='normal')
+        self.palette_export_btn.config(state='normal')
+        self.palette_status.config(text=f"{len(palette)} цв., {palette.elapsed:.2f} с")
+        
+        # Ширина полосы пропорциональна доле цвета; щелчок выбирает цвет
+        self.palette_canvas.delete('all')
+        x = 0.0
+        for code, rgb, weight in zip(palette.hex_codes(), palette.rgb.tolist(), palette.weights):
+            width = 400 * weight
+            item = self.palette_canvas.create_rectangle(x, 0, x + width, 30, fill=code, outline="")
+            self.palette_canvas.tag_bind(item, '<Button-1>', lambda e, rgb=rgb: self.apply_rgb(rgb))
+            x += width
+    
+    def export_palette(self):
+        if self.palette is None:
+            return
+        path = filedialog.asksaveasfilename(title="Экспорт палитры", defaultextension='.gpl',
+                                            filetypes=[("Палитра GIMP", "*.gpl"), ("CSV", "*.csv"),
+                                                       ("HEX-коды", "*.txt"), ("Изображение PNG", "*.png")])
+        if not path:
+            return
+        try:
+            palette_quantize.save_palette(self.palette, path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Экспорт палитры", str(e))
     
     def create_tabs(self, parent):
         notebook = ttk.Notebook(parent)
         notebook.pack(fill=tk.BOTH, expand=True, pady=10)
-        
-        rgb_frame = ttk.Frame(notebook, padding="15")
-        self.create_rgb_tab(rgb_frame)
-        notebook.add(rgb_frame, text="RGB")
-        
-        cmyk_frame = ttk.Frame(notebook, padding="15")
-        self.create_cmyk_tab(cmyk_frame)
-        notebook.add(cmyk_frame, text="CMYK")
-        
-        hsv_frame = ttk.Frame(notebook, padding="15")
-        self.create_hsv_tab(hsv_frame)
-        notebook.add(hsv_frame, text="HSV")
-        
-        hls_frame = ttk.Frame(notebook, padding="15")
-        self.create_hls_tab(hls_frame)
-        notebook.add(hls_frame, text="HLS")
-        
-        xyz_frame = ttk.Frame(notebook, padding="15")
-        self.create_xyz_tab(xyz_frame)
-        notebook.add(xyz_frame, text="XYZ")
-        
-        lab_frame = ttk.Frame(notebook, padding="15")
-        self.create_lab_tab(lab_frame)
-        notebook.add(lab_frame, text="LAB")
+        notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+        self.notebook = notebook
+        
+        # Вкладки добавляются пустыми, виджеты строятся при первом открытии
+        # (ensure_tab): до первой отрисовки создаётся только видимая вкладка
+        for model in color_engine.MODELS:
+            frame = ttk.Frame(notebook, padding="15")
+            notebook.add(frame, text=model.upper())
+            self.tab_frames[model] = frame
+    
+    def ensure_tab(self, model):
+        if model in self.built_tabs:
+            return
+        self.built_tabs.add(model)
+        getattr(self, f'create_{model}_tab')(self.tab_frames[model])
+        for entry in self.tab_entries[model]:
+            self.view.track_user_edits(entry)
     
     def create_rgb_tab(self, parent):
         for i, (color, label) in enumerate([("R", "Красный"), ("G", "Зеленый"), ("B", "Синий")]):
@@ -243,14 +264,16 @@ class ColorConverterApp:
             
             slider = tk.Scale(frame, from_=0, to=255, orient=tk.HORIZONTAL,
                             length=300, resolution=1,
-                            command=lambda val, c=i: self.update_from_slider('rgb', c, val))
+                            command=lambda val, c=i: self.schedule_slider_update('rgb', c, val))
             slider.pack(side=tk.LEFT, padx=10)
             setattr(self, f'{color.lower()}_slider', slider)
+            self.tab_sliders.setdefault('rgb', []).append(slider)
             
             entry = ttk.Entry(frame, width=6)
             entry.pack(side=tk.LEFT)
             entry.bind('<Return>', lambda e, c=color: self.update_from_entry('rgb', c))
             setattr(self, f'{color.lower()}_slider_entry', entry)
+            self.tab_entries.setdefault('rgb', []).append(entry)
     
     def create_cmyk_tab(self, parent):
         for i, (color, label) in enumerate([("C", "Голубой"), ("M", "Пурпурный"), 
@@ -262,14 +285,16 @@ class ColorConverterApp:
             
             slider = tk.Scale(frame, from_=0, to=100, orient=tk.HORIZONTAL,
                             length=300, resolution=0.1,
-                            command=lambda val, c=i: self.update_from_slider('cmyk', c, val))
+                            command=lambda val, c=i: self.schedule_slider_update('cmyk', c, val))
             slider.pack(side=tk.LEFT, padx=10)
             setattr(self, f'cmyk_{color.lower()}_slider', slider)
+            self.tab_sliders.setdefault('cmyk', []).append(slider)
             
             entry = ttk.Entry(frame, width=6)
             entry.pack(side=tk.LEFT)
             entry.bind('<Return>', lambda e, c=color: self.update_from_entry('cmyk', c))
             setattr(self, f'cmyk_{color.lower()}_entry', entry)
+            self.tab_entries.setdefault('cmyk', []).append(entry)
     
     def create_hsv_tab(self, parent):
         for i, (color, label, max_val) in enumerate([("H", "Тон", 360), ("S", "Насыщенность", 100), ("V", "Яркость", 100)]):
@@ -280,14 +305,19 @@ class ColorConverterApp:
             
             slider = tk.Scale(frame, from_=0, to=max_val, orient=tk.HORIZONTAL,
                             length=300, resolution=0.1,
-                            command=lambda val, c=i: self.update_from_slider('hsv', c, val))
+                            command=lambda val, c=i: self.schedule_slider_update('hsv', c, val))
             slider.pack(side=tk.LEFT, padx=10)
             setattr(self, f'hsv_{color.lower()}_slider', slider)
+            self.tab_sliders.setdefault('hsv', []).append(slider)
             
             entry = ttk.Entry(frame, width=6)
             entry.pack(side=tk.LEFT)
             entry.bind('<Return>', lambda e, c=color: self.update_from_entry('hsv', c))
             setattr(self, f'hsv_{color.lower()}_entry', entry)
+            self.tab_entries.setdefault('hsv', []).append(entry)
+        
+        self.create_picker_plane(parent, 'hsv', "Насыщенность и яркость при текущем тоне\n"
+                                                "(щелчок или перетаскивание задаёт S и V)")
     
     def create_hls_tab(self, parent):
         for i, (color, label, max_val) in enumerate([("H", "Тон", 360), ("L", "Светлота", 100), ("S", "Насыщенность", 100)]):
@@ -298,14 +328,16 @@ class ColorConverterApp:
             
             slider = tk.Scale(frame, from_=0, to=max_val, orient=tk.HORIZONTAL,
                             length=300, resolution=0.1,
-                            command=lambda val, c=i: self.update_from_slider('hls', c, val))
+                            command=lambda val, c=i: self.schedule_slider_update('hls', c, val))
             slider.pack(side=tk.LEFT, padx=10)
             setattr(self, f'hls_{color.lower()}_slider', slider)
+            self.tab_sliders.setdefault('hls', []).append(slider)
             
             entry = ttk.Entry(frame, width=6)
             entry.pack(side=tk.LEFT)
             entry.bind('<Return>', lambda e, c=color: self.update_from_entry('hls', c))
             setattr(self, f'hls_{color.lower()}_entry', entry)
+            self.tab_entries.setdefault('hls', []).append(entry)
     
     def create_xyz_tab(self, parent):
         for i, (color, label) in enumerate([("X", "X"), ("Y", "Y"), ("Z", "Z")]):
@@ -316,14 +348,19 @@ class ColorConverterApp:
             
             slider = tk.Scale(frame, from_=0, to=100, orient=tk.HORIZONTAL,
                             length=300, resolution=0.1,
-                            command=lambda val, c=i: self.update_from_slider('xyz', c, val))
+                            command=lambda val, c=i: self.schedule_slider_update('xyz', c, val))
             slider.pack(side=tk.LEFT, padx=10)
             setattr(self, f'xyz_{color.lower()}_slider', slider)
+            self.tab_sliders.setdefault('xyz', []).append(slider)
             
             entry = ttk.Entry(frame, width=10)
             entry.pack(side=tk.LEFT)
             entry.bind('<Return>', lambda e, c=color: self.update_from_entry('xyz', c))
             setattr(self, f'xyz_{color.lower()}_entry', entry)
+            self.tab_entries.setdefault('xyz', []).append(entry)
+        
+        self.gamut_labels['xyz'] = ttk.Label(parent, text="", foreground='#c00000')
+        self.gamut_labels['xyz'].pack(anchor='w', pady=5)
     
     def create_lab_tab(self, parent):
         params = [("L", "L*", 0, 100), ("A", "a*", -128, 127), ("B", "b*", -128, 127)]
@@ -336,14 +373,38 @@ class ColorConverterApp:
             
             slider = tk.Scale(frame, from_=min_val, to=max_val, orient=tk.HORIZONTAL,
                             length=300, resolution=0.1,
-                            command=lambda val, c=i: self.update_from_slider('lab', c, val))
+                            command=lambda val, c=i: self.schedule_slider_update('lab', c, val))
             slider.pack(side=tk.LEFT, padx=10)
             setattr(self, f'lab_{color.lower()}_slider', slider)
+            self.tab_sliders.setdefault('lab', []).append(slider)
             
             entry = ttk.Entry(frame, width=8)
             entry.pack(side=tk.LEFT)
             entry.bind('<Return>', lambda e, c=color: self.update_from_entry('lab', c))
             setattr(self, f'lab_{color.lower()}_entry', entry)
+            self.tab_entries.setdefault('lab', []).append(entry)
+        
+        self.gamut_labels['lab'] = ttk.Label(parent, text="", foreground='#c00000')
+        self.gamut_labels['lab'].pack(anchor='w', pady=5)
+        
+        self.create_picker_plane(parent, 'lab', "Срез охвата sRGB при текущем L*\n"
+                                                "(шахматка - вне охвата, щелчок или перетаскивание задаёт a* и b*)")
+    
+    def create_picker_plane(self, parent, model, caption):
+        # Плоскость - одна PhotoImage, которая целиком заменяется при смене
+        # тона или L*; на Canvas только изображение и маркер
+        size = self.planes[model].size
+        frame = ttk.Frame(parent)
+        frame.pack(fill=tk.X, pady=5)
+        canvas = tk.Canvas(frame, width=size, height=size, highlightthickness=1, highlightbackground="#ccc")
+        canvas.pack(side=tk.LEFT)
+        photo = tk.PhotoImage(width=size, height=size)
+        canvas.create_image(0, 0, image=photo, anchor='nw')
+        marker = canvas.create_oval(0, 0, 0, 0, outline='white', width=2)
+        for sequence in ('<Button-1>', '<B1-Motion>'):
+            canvas.bind(sequence, lambda e, m=model: self.pick_from_plane(m, e))
+        ttk.Label(frame, text=caption).pack(side=tk.LEFT, padx=10, anchor='n')
+        self.plane_views[model] = {'canvas': canvas, 'photo': photo, 'marker': marker, 'image': None}
     
     def create_all_values_panel(self, parent):
         ttk.Label(parent, text="Значения во всех моделях:", style='Header.TLabel').pack(anchor='w', pady=(0, 10))
@@ -392,26 +453,14 @@ class ColorConverterApp:
         color = colorchooser.askcolor(title="Выберите цвет")
         if color[0]:
             rgb = [int(color[0][0]), int(color[0][1]), int(color[0][2])]
-            self.rgb = rgb
-            self.cmyk = self.rgb_to_cmyk(rgb)
-            self.hsv = self.rgb_to_hsv(rgb)
-            self.hls = self.rgb_to_hls(rgb)
-            self.xyz = self.rgb_to_xyz(rgb)
-            self.lab = self.rgb_to_lab(rgb)
-            self.update_all_displays()
+            self.apply_rgb(rgb)
     
     def update_from_hex(self, event=None):
         hex_str = self.hex_entry.get().strip().lstrip('#')
         try:
             if len(hex_str) == 6:
                 rgb = [int(hex_str[i:i+2], 16) for i in (0, 2, 4)]
-                self.rgb = rgb
-                self.cmyk = self.rgb_to_cmyk(rgb)
-                self.hsv = self.rgb_to_hsv(rgb)
-                self.hls = self.rgb_to_hls(rgb)
-                self.xyz = self.rgb_to_xyz(rgb)
-                self.lab = self.rgb_to_lab(rgb)
-                self.update_all_displays()
+                self.apply_rgb(rgb)
         except:
             pass
     
@@ -421,218 +470,460 @@ class ColorConverterApp:
             g = int(self.g_entry.get())
             b = int(self.b_entry.get())
             rgb = [r, g, b]
-            self.rgb = rgb
-            self.cmyk = self.rgb_to_cmyk(rgb)
-            self.hsv = self.rgb_to_hsv(rgb)
-            self.hls = self.rgb_to_hls(rgb)
-            self.xyz = self.rgb_to_xyz(rgb)
-            self.lab = self.rgb_to_lab(rgb)
-            self.update_all_displays()
+            self.apply_rgb(rgb)
         except:
             pass
     
-    def update_from_slider(self, model, channel, value):
-        value = float(value)
-        
+    def compute_models(self, rgb, source_model=None, source_values=None):
+        models = self.cache.rgb_to_all(rgb)
+        for model in color_engine.MODELS:
+            setattr(self, model, models[model])
+        if source_model is not None:
+            setattr(self, source_model, source_values)
+    
+    def apply_rgb(self, rgb, source_model=None, source_values=None):
+        self.compute_models(rgb, source_model, source_values)
+        self.update_all_displays()
+    
+    def apply_channel_values(self, model, channels):
         if model == 'rgb':
             rgb = self.rgb.copy()
-            rgb[channel] = int(value)
-            self.rgb = rgb
-            self.cmyk = self.rgb_to_cmyk(rgb)
-            self.hsv = self.rgb_to_hsv(rgb)
-            self.hls = self.rgb_to_hls(rgb)
-            self.xyz = self.rgb_to_xyz(rgb)
-            self.lab = self.rgb_to_lab(rgb)
-            self.update_all_displays()
-        
-        elif model == 'cmyk':
-            cmyk = self.cmyk.copy()
-            cmyk[channel] = value
-            rgb = self.cmyk_to_rgb(cmyk)
-            self.rgb = rgb
-            self.cmyk = cmyk
-            self.hsv = self.rgb_to_hsv(rgb)
-            self.hls = self.rgb_to_hls(rgb)
-            self.xyz = self.rgb_to_xyz(rgb)
-            self.lab = self.rgb_to_lab(rgb)
-            self.update_all_displays()
-        
-        elif model == 'hsv':
-            hsv = self.hsv.copy()
-            hsv[channel] = value
-            rgb = self.hsv_to_rgb(hsv)
-            self.rgb = rgb
-            self.cmyk = self.rgb_to_cmyk(rgb)
-            self.hsv = hsv
-            self.hls = self.rgb_to_hls(rgb)
-            self.xyz = self.rgb_to_xyz(rgb)
-            self.lab = self.rgb_to_lab(rgb)
-            self.update_all_displays()
-        
-        elif model == 'hls':
-            hls = self.hls.copy()
-            hls[channel] = value
-            rgb = self.hls_to_rgb(hls)
-            self.rgb = rgb
-            self.cmyk = self.rgb_to_cmyk(rgb)
-            self.hsv = self.rgb_to_hsv(rgb)
-            self.hls = hls
-            self.xyz = self.rgb_to_xyz(rgb)
-            self.lab = self.rgb_to_lab(rgb)
-            self.update_all_displays()
-        
-        elif model == 'xyz':
-            xyz = self.xyz.copy()
-            xyz[channel] = value
-            rgb = self.xyz_to_rgb(xyz)
-            self.rgb = rgb
-            self.cmyk = self.rgb_to_cmyk(rgb)
-            self.hsv = self.rgb_to_hsv(rgb)
-            self.hls = self.rgb_to_hls(rgb)
-            self.xyz = xyz
-            self.lab = self.rgb_to_lab(rgb)
-            self.update_all_displays()
-        
-        elif model == 'lab':
-            lab = self.lab.copy()
-            lab[channel] = value
-            rgb = self.lab_to_rgb(lab)
-            self.rgb = rgb
-            self.cmyk = self.rgb_to_cmyk(rgb)
-            self.hsv = self.rgb_to_hsv(rgb)
-            self.hls = self.rgb_to_hls(rgb)
-            self.xyz = self.rgb_to_xyz(rgb)
-            self.lab = lab
+            for channel, value in channels.items():
+                rgb[channel] = int(value)
+            self.compute_models(rgb)
+        else:
+            values = getattr(self, model).copy()
+            for channel, value in channels.items():
+                values[channel] = value
+            rgb = self.cache.convert_color(values, model, 'rgb')
+            self.compute_models(rgb, model, values)
+    
+    def update_from_slider(self, model, channel, value):
+        self.apply_channel_values(model, {channel: float(value)})
+        self.update_all_displays()
+    
+    def schedule_slider_update(self, model, channel, value):
+        value = float(value)
+        slider = self.tab_sliders[model][channel]
+        # Tk вызывает command и на программный set(); такие отклики игнорируем
+        if (channel not in self.pending_updates.get(model, {})
+                and self.view.last_value(slider) == value):
+            return
+        self.view.remember(slider, value)
+        self.pending_updates.setdefault(model, {})[channel] = value
+        self.request_flush()
+    
+    def pick_from_plane(self, model, event):
+        x, y = self.planes[model].value_at(event.x, event.y)
+        self.pending_updates.setdefault(model, {}).update({1: round(x, 1), 2: round(y, 1)})
+        self.request_flush()
+    
+    def request_flush(self):
+        if self.update_job is None:
+            self.update_job = self.root.after(FRAME_MS, self.flush_pending_updates)
+    
+    def flush_pending_updates(self):
+        self.update_job = None
+        pending, self.pending_updates = self.pending_updates, {}
+        for model, channels in pending.items():
+            self.apply_channel_values(model, channels)
+        if pending:
             self.update_all_displays()
     
+    def visible_model(self):
+        return color_engine.MODELS[self.notebook.index(self.notebook.select())]
+    
+    def on_tab_changed(self, event=None):
+        model = self.visible_model()
+        if model in self.stale_tabs:
+            self.update_sliders([model])
+    
     def update_from_entry(self, model, channel):
         try:
             if model == 'rgb':
                 entry = getattr(self, f'{channel.lower()}_slider_entry')
-                value = float(entry.get())
+                value = self.read_entry(entry)
                 self.update_from_slider(model, {'R':0, 'G':1, 'B':2}[channel], value)
             
             elif model == 'cmyk':
                 entry = getattr(self, f'cmyk_{channel.lower()}_entry')
-                value = float(entry.get())
+                value = self.read_entry(entry)
                 self.update_from_slider(model, {'C':0, 'M':1, 'Y':2, 'K':3}[channel], value)
             
             elif model == 'hsv':
                 entry = getattr(self, f'hsv_{channel.lower()}_entry')
-                value = float(entry.get())
+                value = self.read_entry(entry)
                 self.update_from_slider(model, {'H':0, 'S':1, 'V':2}[channel], value)
             
             elif model == 'hls':
                 entry = getattr(self, f'hls_{channel.lower()}_entry')
-                value = float(entry.get())
+                value = self.read_entry(entry)
                 self.update_from_slider(model, {'H':0, 'L':1, 'S':2}[channel], value)
             
             elif model == 'xyz':
                 entry = getattr(self, f'xyz_{channel.lower()}_entry')
-                value = float(entry.get())
+                value = self.read_entry(entry)
                 self.update_from_slider(model, {'X':0, 'Y':1, 'Z':2}[channel], value)
             
             elif model == 'lab':
                 entry = getattr(self, f'lab_{channel.lower()}_entry')
-                value = float(entry.get())
+                value = self.read_entry(entry)
                 self.update_from_slider(model, {'L':0, 'A':1, 'B':2}[channel], value)
                 
         except:
             pass
     
+    def read_entry(self, entry):
+        return float(entry.get())
+    
+    def show_latency_panel(self):
+        if self.latency_panel is None:
+            self.latency_panel = LatencyPanel(self.root, self.tracer, self.close_latency_panel)
+        else:
+            self.latency_panel.window.lift()
+    
+    def close_latency_panel(self):
+        self.latency_panel = None
+    
     def update_all_displays(self):
         hex_color = f'#{self.rgb[0]:02x}{self.rgb[1]:02x}{self.rgb[2]:02x}'
         
-        self.hex_entry.delete(0, tk.END)
-        self.hex_entry.insert(0, hex_color.upper())
+        self.view.set_entry(self.hex_entry, hex_color.upper())
+        self.view.set_entry(self.r_entry, str(self.rgb[0]))
+        self.view.set_entry(self.g_entry, str(self.rgb[1]))
+        self.view.set_entry(self.b_entry, str(self.rgb[2]))
         
-        self.r_entry.delete(0, tk.END)
-        self.r_entry.insert(0, str(self.rgb[0]))
-        self.g_entry.delete(0, tk.END)
-        self.g_entry.insert(0, str(self.rgb[1]))
-        self.b_entry.delete(0, tk.END)
-        self.b_entry.insert(0, str(self.rgb[2]))
+        self.update_preview(hex_color)
         
-        self.color_preview.delete("all")
-        self.color_preview.create_rectangle(0, 0, 400, 80, 
-                                          fill=hex_color, outline="")
-        
-        self.update_sliders()
+        visible = self.visible_model()
+        self.stale_tabs = set(color_engine.MODELS) - {visible}
+        self.update_sliders([visible])
         self.update_value_labels()
     
-    def update_sliders(self):
-        self.r_slider.set(self.rgb[0])
-        self.g_slider.set(self.rgb[1])
-        self.b_slider.set(self.rgb[2])
-        
-        for i, color in enumerate(['c', 'm', 'y', 'k']):
-            getattr(self, f'cmyk_{color}_slider').set(round(self.cmyk[i], 1))
-        
-        for i, color in enumerate(['h', 's', 'v']):
-            getattr(self, f'hsv_{color}_slider').set(round(self.hsv[i], 1))
-        
-        for i, color in enumerate(['h', 'l', 's']):
-            getattr(self, f'hls_{color}_slider').set(round(self.hls[i], 1))
-        
-        for i, color in enumerate(['x', 'y', 'z']):
-            getattr(self, f'xyz_{color}_slider').set(round(self.xyz[i], 1))
-        
-        for i, color in enumerate(['l', 'a', 'b']):
-            getattr(self, f'lab_{color}_slider').set(round(self.lab[i], 1))
-        
-        self.update_entry_fields()
+    def update_preview(self, hex_color):
+        self.view.set_item_fill(self.color_preview, self.preview_rect, hex_color)
+    
+    def update_sliders(self, models=color_engine.MODELS):
+        for model in models:
+            self.ensure_tab(model)
+            values = getattr(self, model)
+            for i, slider in enumerate(self.tab_sliders[model]):
+                value = values[i] if model == 'rgb' else round(values[i], 1)
+                self.view.set_scale(slider, float(value))
+            self.stale_tabs.discard(model)
+            if model in gamut.GAMUT_MODELS:
+                self.update_gamut_warning(model)
+            if model in self.planes:
+                self.update_plane(model)
+        
+        self.update_entry_fields(models)
+    
+    def update_gamut_warning(self, model):
+        outside = bool(gamut.out_of_gamut(getattr(self, model), model))
+        self.view.set_label(self.gamut_labels[model],
+                            "⚠ Цвет вне охвата sRGB, RGB ограничен" if outside else "")
+    
+    def update_plane(self, model):
+        values = getattr(self, model)
+        plane, view = self.planes[model], self.plane_views[model]
+        # Плоскость перерисовывается только при смене тона или L*, маркер - всегда
+        image = plane.render(round(values[0], 1))
+        if image is not view['image']:
+            tk_image.put_array(view['photo'], image)
+            view['image'] = image
+        col, row = plane.pixel_of(values[1], values[2])
+        view['canvas'].coords(view['marker'], col - 4, row - 4, col + 4, row + 4)
+    
+    def update_entry_fields(self, models=color_engine.MODELS):
+        for model in models:
+            values = getattr(self, model)
+            for i, entry in enumerate(self.tab_entries[model]):
+                self.view.set_entry(entry, ENTRY_FORMATS[model].format(values[i]))
     
-    def update_entry_fields(self):
-        for i, color in enumerate(['c', 'm', 'y', 'k']):
-            entry = getattr(self, f'cmyk_{color}_entry')
-            entry.delete(0, tk.END)
-            entry.insert(0, f"{self.cmyk[i]:.1f}")
-        
-        for i, color in enumerate(['h', 's', 'v']):
-            entry = getattr(self, f'hsv_{color}_entry')
-            entry.delete(0, tk.END)
-            entry.insert(0, f"{self.hsv[i]:.1f}")
+    def update_value_labels(self):
+        labels = [
+            ("RGB", "R:", f"{self.rgb[0]}"), ("RGB", "G:", f"{self.rgb[1]}"), ("RGB", "B:", f"{self.rgb[2]}"),
+            
+            ("CMYK", "C:", f"{self.cmyk[0]:.1f}%"), ("CMYK", "M:", f"{self.cmyk[1]:.1f}%"),
+            ("CMYK", "Y:", f"{self.cmyk[2]:.1f}%"), ("CMYK", "K:", f"{self.cmyk[3]:.1f}%"),
+            
+            ("HSV", "H:", f"{self.hsv[0]:.1f}°"), ("HSV", "S:", f"{self.hsv[1]:.1f}%"),
+            ("HSV", "V:", f"{self.hsv[2]:.1f}%"),
+            
+            ("HLS", "H:", f"{self.hls[0]:.1f}°"), ("HLS", "L:", f"{self.hls[1]:.1f}%"),
+            ("HLS", "S:", f"{self.hls[2]:.1f}%"),
+            
+            ("XYZ", "X:", f"{self.xyz[0]:.2f}"), ("XYZ", "Y:", f"{self.xyz[1]:.2f}"),
+            ("XYZ", "Z:", f"{self.xyz[2]:.2f}"),
+            
+            ("LAB", "L*:", f"{self.lab[0]:.2f}"), ("LAB", "a*:", f"{self.lab[1]:.2f}"),
+            ("LAB", "b*:", f"{self.lab[2]:.2f}"),
+        ]
+        for model, channel, text in labels:
+            self.view.set_label(self.value_labels[model][channel], text)
+
+class LatencyPanel:
+    """Перцентили времени этапов обновления; трассировка включена, пока окно открыто"""
+    REFRESH_MS = 500
+    
+    def __init__(self, parent, tracer, on_close):
+        self.tracer = tracer
+        self.on_close = on_close
+        self.window = tk.Toplevel(parent)
+        self.window.title("⏱ Задержки обновления")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        
+        frame = ttk.Frame(self.window, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+        self.table = ttk.Label(frame, text="", font=('Courier', 10), justify=tk.LEFT)
+        self.table.pack(anchor='w')
+        
+        buttons = ttk.Frame(frame)
+        buttons.pack(pady=(10, 0))
+        ttk.Button(buttons, text="Сбросить", command=self.tracer.reset).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="💾 Трасса...", command=self.save_trace).pack(side=tk.LEFT, padx=5)
+        
+        self.tracer.enabled = True
+        self.refresh()
+    
+    def refresh(self):
+        self.table.config(text=self.tracer.summary())
+        self.job = self.window.after(self.REFRESH_MS, self.refresh)
+    
+    def save_trace(self):
+        path = filedialog.asksaveasfilename(parent=self.window, title="Сохранить трассу",
+                                            defaultextension='.json', filetypes=[("Chrome Trace", "*.json")])
+        if not path:
+            return
+        try:
+            self.tracer.dump(path)
+        except OSError as e:
+            messagebox.showerror("Трасса задержек", str(e), parent=self.window)
+    
+    def close(self):
+        self.tracer.enabled = False
+        self.window.after_cancel(self.job)
+        self.window.destroy()
+        self.on_close()
+
+class ImageConversionWindow:
+    def __init__(self, parent):
+        self.window = tk.Toplevel(parent)
+        self.window.title("🖼 Преобразование изображения")
+        self.window.geometry("560x420")
+        
+        self.image_path = tk.StringVar()
+        self.output_dir = tk.StringVar()
+        self.tile_size = tk.IntVar(value=image_convert.DEFAULT_TILE)
+        self.model_vars = {model: tk.BooleanVar(value=True) for model in image_convert.IMAGE_MODELS}
+        self.stage_labels = {}
         
-        for i, color in enumerate(['h', 'l', 's']):
-            entry = getattr(self, f'hls_{color}_entry')
-            entry.delete(0, tk.END)
-            entry.insert(0, f"{self.hls[i]:.1f}")
+        self.create_widgets()
+    
+    def create_widgets(self):
+        frame = ttk.Frame(self.window, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        for row, (label, var, command) in enumerate([("Изображение:", self.image_path, self.choose_image),
+                                                     ("Папка вывода:", self.output_dir, self.choose_output_dir)]):
+            ttk.Label(frame, text=label).grid(row=row, column=0, sticky='w', pady=3)
+            ttk.Entry(frame, textvariable=var, width=45).grid(row=row, column=1, padx=5)
+            ttk.Button(frame, text="...", width=3, command=command).grid(row=row, column=2)
+        
+        models_frame = ttk.Frame(frame)
+        models_frame.grid(row=2, column=0, columnspan=3, sticky='w', pady=10)
+        for model, var in self.model_vars.items():
+            ttk.Checkbutton(models_frame, text=model.upper(), variable=var).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(frame, text="Размер тайла:").grid(row=3, column=0, sticky='w')
+        ttk.Spinbox(frame, from_=64, to=8192, increment=64, width=8,
+                    textvariable=self.tile_size).grid(row=3, column=1, sticky='w', padx=5)
+        
+        self.start_btn = ttk.Button(frame, text="Начать", style='Primary.TButton', command=self.start)
+        self.start_btn.grid(row=4, column=0, columnspan=3, pady=10)
+        
+        self.progress_bar = ttk.Progressbar(frame, mode='determinate', maximum=1.0)
+        self.progress_bar.grid(row=5, column=0, columnspan=3, sticky='ew')
+        
+        stages_frame = ttk.Frame(frame)
+        stages_frame.grid(row=6, column=0, columnspan=3, sticky='w', pady=10)
+        for stage in ('load',) + image_convert.IMAGE_MODELS:
+            lbl = ttk.Label(stages_frame, text="")
+            lbl.pack(anchor='w')
+            self.stage_labels[stage] = lbl
+    
+    def choose_image(self):
+        path = filedialog.askopenfilename(parent=self.window, title="Выберите изображение",
+                                          filetypes=[("Изображения", "*.png *.jpg *.jpeg *.bmp *.tif *.tiff *.gif"),
+                                                     ("Все файлы", "*.*")])
+        if path:
+            self.image_path.set(path)
+    
+    def choose_output_dir(self):
+        path = filedialog.askdirectory(parent=self.window, title="Папка для плоскостей каналов")
+        if path:
+            self.output_dir.set(path)
+    
+    def start(self):
+        models = [model for model, var in self.model_vars.items() if var.get()]
+        if not self.image_path.get() or not self.output_dir.get() or not models:
+            messagebox.showwarning("Внимание", "Выберите изображение, папку вывода и хотя бы одну модель",
+                                   parent=self.window)
+            return
+        
+        self.start_btn.config(state='disabled')
+        self.progress_bar['value'] = 0
+        for lbl in self.stage_labels.values():
+            lbl.config(text="")
+        
+        thread = threading.Thread(target=self.run_conversion,
+                                  args=(self.image_path.get(), self.output_dir.get(), models, self.tile_size.get()))
+        thread.daemon = True
+        thread.start()
+    
+    def run_conversion(self, image_path, output_dir, models, tile):
+        def report(stage):
+            self.window.after(0, self.update_stage, stage.stage, str(stage),
+                              stage.fraction if stage.stage == models[-1] else None)
         
-        for i, color in enumerate(['x', 'y', 'z']):
-            entry = getattr(self, f'xyz_{color}_entry')
-            entry.delete(0, tk.END)
-            entry.insert(0, f"{self.xyz[i]:.2f}")
+        try:
+            result = image_convert.convert_image(image_path, output_dir, models, tile, report)
+            self.window.after(0, self.finish, f"Готово: {result.width} × {result.height}, файлов: {len(result.paths)}")
+        except Exception as e:
+            self.window.after(0, self.finish, f"Ошибка: {e}")
+    
+    def update_stage(self, stage, text, fraction):
+        self.stage_labels[stage].config(text=text)
+        if fraction is not None:
+            self.progress_bar['value'] = fraction
+    
+    def finish(self, message):
+        self.start_btn.config(state='normal')
+        messagebox.showinfo("Преобразование изображения", message, parent=self.window)
+
+class HistogramWindow:
+    def __init__(self, parent):
+        self.window = tk.Toplevel(parent)
+        self.window.title("📊 Гистограмма цветов изображения")
+        self.window.geometry("560x680")
+        
+        self.image_path = tk.StringVar()
+        self.space = tk.StringVar(value='hsv')
+        self.bins = tk.IntVar(value=histograms.DEFAULT_BINS)
+        self.channel_vars = [tk.BooleanVar(value=i < 2) for i in range(3)]
+        self.channel_checks = []
+        self.image_cache = {}
+        self.histogram = None
         
-        for i, color in enumerate(['l', 'a', 'b']):
-            entry = getattr(self, f'lab_{color}_entry')
-            entry.delete(0, tk.END)
-            entry.insert(0, f"{self.lab[i]:.2f}")
+        self.create_widgets()
+        self.update_channel_names()
     
-    def update_value_labels(self):
-        self.value_labels["RGB"]["R:"].config(text=f"{self.rgb[0]}")
-        self.value_labels["RGB"]["G:"].config(text=f"{self.rgb[1]}")
-        self.value_labels["RGB"]["B:"].config(text=f"{self.rgb[2]}")
-        
-        self.value_labels["CMYK"]["C:"].config(text=f"{self.cmyk[0]:.1f}%")
-        self.value_labels["CMYK"]["M:"].config(text=f"{self.cmyk[1]:.1f}%")
-        self.value_labels["CMYK"]["Y:"].config(text=f"{self.cmyk[2]:.1f}%")
-        self.value_labels["CMYK"]["K:"].config(text=f"{self.cmyk[3]:.1f}%")
-        
-        self.value_labels["HSV"]["H:"].config(text=f"{self.hsv[0]:.1f}°")
-        self.value_labels["HSV"]["S:"].config(text=f"{self.hsv[1]:.1f}%")
-        self.value_labels["HSV"]["V:"].config(text=f"{self.hsv[2]:.1f}%")
-        
-        self.value_labels["HLS"]["H:"].config(text=f"{self.hls[0]:.1f}°")
-        self.value_labels["HLS"]["L:"].config(text=f"{self.hls[1]:.1f}%")
-        self.value_labels["HLS"]["S:"].config(text=f"{self.hls[2]:.1f}%")
-        
-        self.value_labels["XYZ"]["X:"].config(text=f"{self.xyz[0]:.2f}")
-        self.value_labels["XYZ"]["Y:"].config(text=f"{self.xyz[1]:.2f}")
-        self.value_labels["XYZ"]["Z:"].config(text=f"{self.xyz[2]:.2f}")
-        
-        self.value_labels["LAB"]["L*:"].config(text=f"{self.lab[0]:.2f}")
-        self.value_labels["LAB"]["a*:"].config(text=f"{self.lab[1]:.2f}")
-        self.value_labels["LAB"]["b*:"].config(text=f"{self.lab[2]:.2f}")
+    def create_widgets(self):
+        frame = ttk.Frame(self.window, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(frame, text="Изображение:").grid(row=0, column=0, sticky='w', pady=3)
+        ttk.Entry(frame, textvariable=self.image_path, width=45).grid(row=0, column=1, padx=5)
+        ttk.Button(frame, text="...", width=3, command=self.choose_image).grid(row=0, column=2)
+        
+        options = ttk.Frame(frame)
+        options.grid(row=1, column=0, columnspan=3, sticky='w', pady=10)
+        ttk.Label(options, text="Модель:").pack(side=tk.LEFT)
+        space_box = ttk.Combobox(options, textvariable=self.space, values=histograms.SPACES,
+                                 width=5, state='readonly')
+        space_box.pack(side=tk.LEFT, padx=5)
+        space_box.bind('<<ComboboxSelected>>', lambda e: self.update_channel_names())
+        for var in self.channel_vars:
+            check = ttk.Checkbutton(options, variable=var)
+            check.pack(side=tk.LEFT, padx=3)
+            self.channel_checks.append(check)
+        ttk.Label(options, text="Бинов:").pack(side=tk.LEFT, padx=(15, 5))
+        ttk.Spinbox(options, from_=2, to=256, width=5, textvariable=self.bins).pack(side=tk.LEFT)
+        
+        buttons = ttk.Frame(frame)
+        buttons.grid(row=2, column=0, columnspan=3, pady=5)
+        self.build_btn = ttk.Button(buttons, text="Построить", style='Primary.TButton', command=self.start)
+        self.build_btn.pack(side=tk.LEFT, padx=5)
+        self.csv_btn = ttk.Button(buttons, text="💾 CSV...", state='disabled', command=self.export_csv)
+        self.csv_btn.pack(side=tk.LEFT, padx=5)
+        self.png_btn = ttk.Button(buttons, text="💾 PNG...", state='disabled', command=self.export_png)
+        self.png_btn.pack(side=tk.LEFT, padx=5)
+        
+        self.status = ttk.Label(frame, text="")
+        self.status.grid(row=3, column=0, columnspan=3, sticky='w')
+        
+        self.photo = tk.PhotoImage(width=512, height=512)
+        ttk.Label(frame, image=self.photo).grid(row=4, column=0, columnspan=3, pady=10)
+    
+    def update_channel_names(self):
+        for name, check in zip(self.space.get(), self.channel_checks):
+            check.config(text=name.upper())
+    
+    def choose_image(self):
+        path = filedialog.askopenfilename(parent=self.window, title="Выберите изображение",
+                                          filetypes=[("Изображения", "*.png *.jpg *.jpeg *.bmp *.tif *.tiff *.gif"),
+                                                     ("Все файлы", "*.*")])
+        if path:
+            self.image_path.set(path)
+    
+    def start(self):
+        channels = [i for i, var in enumerate(self.channel_vars) if var.get()]
+        if not self.image_path.get() or not channels:
+            messagebox.showwarning("Внимание", "Выберите изображение и хотя бы один канал", parent=self.window)
+            return
+        try:
+            bins = self.bins.get()
+        except tk.TclError:
+            bins = histograms.DEFAULT_BINS
+        
+        self.build_btn.config(state='disabled')
+        self.status.config(text="Вычисление...")
+        thread = threading.Thread(target=self.run_histogram,
+                                  args=(self.image_path.get(), self.space.get(), channels, bins))
+        thread.daemon = True
+        thread.start()
+    
+    def run_histogram(self, path, space, channels, bins):
+        try:
+            # Изображение читается один раз: повторные построения меняют только модель и бины
+            if path not in self.image_cache:
+                self.image_cache = {path: histograms.load_rgb(path)}
+            hist = histograms.histogram(self.image_cache[path], space, channels, bins)
+            self.window.after(0, self.show_histogram, hist, histograms.render(hist, 512))
+        except Exception as e:
+            self.window.after(0, self.histogram_failed, str(e))
+    
+    def histogram_failed(self, message):
+        self.build_btn.config(state='normal')
+        self.status.config(text="")
+        messagebox.showerror("Гистограмма", f"Ошибка: {message}", parent=self.window)
+    
+    def show_histogram(self, hist, image):
+        self.histogram = hist
+        self.build_btn.config(state='normal')
+        self.csv_btn.config(state='normal')
+        self.png_btn.config(state='normal')
+        self.status.config(text=f"{hist.space.upper()} {hist.names.upper()} {'×'.join(map(str, hist.bins))}: "
+                                f"{hist.pixels} пикс., {hist.elapsed:.2f} с")
+        tk_image.put_array(self.photo, image)
+    
+    def export_csv(self):
+        self.export(histograms.save_csv, '.csv', [("CSV", "*.csv")])
+    
+    def export_png(self):
+        self.export(histograms.save_png, '.png', [("PNG", "*.png")])
+    
+    def export(self, save, extension, filetypes):
+        if self.histogram is None:
+            return
+        path = filedialog.asksaveasfilename(parent=self.window, title="Сохранить гистограмму",
+                                            defaultextension=extension, filetypes=filetypes)
+        if not path:
+            return
+        try:
+            save(self.histogram, path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Экспорт гистограммы", str(e), parent=self.window)
 
 if __name__ == "__main__":
     root = tk.Tk()
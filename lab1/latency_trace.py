@@ -0,0 +1,118 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Mapping, Tuple
+
+import numpy as np
+
+# Этапы обработки правки пользователя в порядке конвейера; edit - вся правка
+# от события Tk до возврата в цикл событий
+STAGES = ('parse_entry', 'convert', 'update_sliders', 'update_entry_fields',
+          'update_value_labels', 'preview', 'edit')
+DEFAULT_WINDOW = 1000
+# Событий в трассе; старые вытесняются новыми
+TRACE_LIMIT = 200_000
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyTracer:
+    """Время этапов обновления интерфейса.
+
+    Для каждого этапа хранятся последние window длительностей, по ним
+    считаются p50/p95/p99. Времена включающие: update_sliders содержит
+    update_entry_fields и перерисовку плоскости выбора. Повторный вход в уже
+    открытый этап (compute_models внутри apply_channel_values) отдельно не
+    учитывается. Выключенный трассировщик обходится одной проверкой флага.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW, enabled: bool = False):
+        if window <= 0:
+            raise ValueError("Размер окна должен быть положительным")
+        self.window = window
+        self.enabled = enabled
+        self.samples: Dict[str, Deque[int]] = {}
+        self.events: Deque[Tuple[str, int, int]] = deque(maxlen=TRACE_LIMIT)
+        self._open: Dict[str, int] = {}
+        self._origin = time.perf_counter_ns()
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled or name in self._open:
+            yield
+            return
+        start = time.perf_counter_ns()
+        self._open[name] = start
+        try:
+            yield
+        finally:
+            del self._open[name]
+            self.record(name, start, time.perf_counter_ns() - start)
+
+    def record(self, name: str, start_ns: int, duration_ns: int) -> None:
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.window)
+        samples.append(duration_ns)
+        self.events.append((name, start_ns, duration_ns))
+
+    def wrap(self, func: Callable, name: str) -> Callable:
+        @wraps(func)
+        def traced(*args, **kwargs):
+            if not self.enabled:
+                return func(*args, **kwargs)
+            with self.stage(name):
+                return func(*args, **kwargs)
+        return traced
+
+    def instrument(self, obj, methods: Mapping[str, str]) -> None:
+        """Заменить методы объекта обёртками: {имя метода: этап}"""
+        for method, name in methods.items():
+            setattr(obj, method, self.wrap(getattr(obj, method), name))
+
+    def percentiles(self, name: str) -> Dict[str, float]:
+        """Число замеров, p50/p95/p99 и максимум в мс по окну этапа"""
+        samples = self.samples.get(name)
+        if not samples:
+            return {'count': 0}
+        values = np.fromiter(samples, dtype=np.float64, count=len(samples)) / 1e6
+        result = {'count': len(values)}
+        for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+            result[f'p{p}'] = float(value)
+        result['max'] = float(values.max())
+        return result
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        names = [name for name in STAGES if name in self.samples]
+        names += sorted(set(self.samples) - set(STAGES))
+        return {name: self.percentiles(name) for name in names}
+
+    def summary(self) -> str:
+        lines = [f"{'этап':<20}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  мс"]
+        for name, s in self.stats().items():
+            lines.append(f"{name:<20}{s['count']:>6}{s['p50']:>9.3f}{s['p95']:>9.3f}"
+                         f"{s['p99']:>9.3f}{s['max']:>9.3f}")
+        return '\n'.join(lines)
+
+    def reset(self) -> None:
+        self.samples.clear()
+        self.events.clear()
+
+    def dump(self, path) -> Path:
+        """Трасса в формате Chrome Trace Event (chrome://tracing, Perfetto)
+        и перцентили этапов в otherData"""
+        path = Path(path)
+        pid, tid = os.getpid(), threading.get_ident()
+        events: List[dict] = [
+            {'name': name, 'cat': 'lab1', 'ph': 'X', 'pid': pid, 'tid': tid,
+             'ts': (start - self._origin) / 1000, 'dur': duration / 1000}
+            for name, start, duration in self.events
+        ]
+        trace = {'traceEvents': events, 'displayTimeUnit': 'ms',
+                 'otherData': {'window': self.window, 'stages_ms': self.stats()}}
+        path.write_text(json.dumps(trace, ensure_ascii=False), encoding='utf-8')
+        return path
@@ -0,0 +1,284 @@
+import argparse
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+
+import color_engine
+
+LUT_SIZES = (17, 33, 65)
+DEFAULT_SIZE = 33
+# Диапазоны каналов, как у слайдеров lab1; каналы называются буквами модели
+CHANNEL_RANGES = {
+    'rgb': ((0, 255),) * 3,
+    'cmyk': ((0, 100),) * 4,
+    'hsv': ((0, 360), (0, 100), (0, 100)),
+    'hls': ((0, 360), (0, 100), (0, 100)),
+    'xyz': ((0, None),) * 3,
+    'lab': ((0, 100), (-128, 127), (-128, 127)),
+}
+# Тон замкнут по кругу: сдвиг на 30° у красного даёт оранжевый, а не упор в 360
+HUE_CHANNELS = {('hsv', 0), ('hls', 0)}
+# Для изображений больше этого числа пикселей LUT сначала разворачивается в
+# полную таблицу 256³ (около 0.4 с), и дальше на пиксель приходится одна
+# выборка вместо восьми углов трилинейной интерполяции
+DENSE_MIN_PIXELS = 1 << 21
+
+_STEP_RE = re.compile(r'^(\w+)\.(\w)([+*=])([-+]?\d*\.?\d+(?:[eE][-+]?\d+)?)$')
+
+
+@dataclass(frozen=True)
+class Adjustment:
+    """Правка одного канала модели: model.channel, операция и величина ('hsv.h+30')"""
+    model: str
+    channel: int
+    op: str
+    amount: float
+
+    @classmethod
+    def parse(cls, text: str) -> 'Adjustment':
+        match = _STEP_RE.match(text.strip().lower())
+        if not match:
+            raise ValueError(f"Неверная правка: {text!r}, ожидалось вида hsv.h+30, lab.l*1.1 или cmyk.k=0")
+        model, name, op, amount = match.groups()
+        if model not in CHANNEL_RANGES:
+            raise ValueError(f"Неизвестная модель: {model}, доступны {tuple(CHANNEL_RANGES)}")
+        if name not in model:
+            raise ValueError(f"У модели {model} нет канала {name}, доступны {tuple(model)}")
+        return cls(model, model.index(name), op, float(amount))
+
+    def __str__(self) -> str:
+        return f"{self.model}.{self.model[self.channel]}{self.op}{self.amount:g}"
+
+    def apply(self, values: np.ndarray) -> None:
+        """Изменить канал массива (..., C) модели на месте"""
+        channel = values[..., self.channel]
+        if self.op == '+':
+            channel += self.amount
+        elif self.op == '*':
+            channel *= self.amount
+        else:
+            channel[...] = self.amount
+        if (self.model, self.channel) in HUE_CHANNELS:
+            np.mod(channel, 360, out=channel)
+        else:
+            lo, hi = CHANNEL_RANGES[self.model][self.channel]
+            np.clip(channel, lo, hi, out=channel)
+
+
+def pipeline(steps: Sequence[Adjustment]) -> Callable[[np.ndarray], np.ndarray]:
+    """Преобразование RGB 0..255 (float) -> RGB 0..255 (float) из цепочки правок.
+
+    Подряд идущие правки одной модели выполняются за один переход в модель и
+    обратно; обратный переход - без усечения до уровней (UNIT_RGB_CONVERSIONS).
+    """
+    groups = []
+    for step in steps:
+        if groups and groups[-1][0] == step.model:
+            groups[-1][1].append(step)
+        else:
+            groups.append((step.model, [step]))
+
+    def transform(rgb: np.ndarray) -> np.ndarray:
+        rgb = np.asarray(rgb, dtype=np.float64)
+        for model, group in groups:
+            values = rgb.copy() if model == 'rgb' else color_engine.convert(rgb, 'rgb', model)
+            for step in group:
+                step.apply(values)
+            rgb = color_engine.UNIT_RGB_CONVERSIONS[model](values) * 255
+        return rgb
+
+    return transform
+
+
+def identity_grid(size: int) -> np.ndarray:
+    """Узлы решётки (size, size, size, 3) в RGB 0..255, индексы [r, g, b]"""
+    axis = np.linspace(0, 255, size)
+    r, g, b = np.meshgrid(axis, axis, axis, indexing='ij')
+    return np.stack([r, g, b], axis=-1)
+
+
+def build_lut(transform: Callable[[np.ndarray], np.ndarray], size: int = DEFAULT_SIZE) -> np.ndarray:
+    """3D LUT (size, size, size, 3) float32 в 0..1: преобразование всех узлов за один вызов"""
+    if size < 2:
+        raise ValueError("Размер LUT должен быть не меньше 2")
+    out = transform(identity_grid(size).reshape(-1, 3))
+    return np.clip(out / 255, 0, 1).reshape(size, size, size, 3).astype(np.float32)
+
+
+def save_cube(lut: np.ndarray, path, title: str = '') -> Path:
+    """Запись в формате .cube (Adobe/Resolve): красный меняется быстрее всего"""
+    path = Path(path)
+    size = lut.shape[0]
+    # [r, g, b] -> порядок строк файла: b внешний, r внутренний
+    rows = np.ascontiguousarray(lut.transpose(2, 1, 0, 3)).reshape(-1, 3)
+    header = []
+    if title:
+        header.append(f'TITLE "{title}"')
+    header += [f'LUT_3D_SIZE {size}', 'DOMAIN_MIN 0.0 0.0 0.0', 'DOMAIN_MAX 1.0 1.0 1.0']
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(header) + '\n')
+        np.savetxt(f, rows, fmt='%.6f')
+    return path
+
+
+def load_cube(path) -> np.ndarray:
+    """Чтение .cube с LUT_3D_SIZE; DOMAIN_MIN/MAX должны быть 0 и 1"""
+    size = None
+    data = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            key = line.split()[0]
+            if key == 'LUT_3D_SIZE':
+                size = int(line.split()[1])
+            elif key in ('DOMAIN_MIN', 'DOMAIN_MAX'):
+                bound = 0.0 if key == 'DOMAIN_MIN' else 1.0
+                if any(float(v) != bound for v in line.split()[1:]):
+                    raise ValueError(f"Поддерживается только область 0..1, в файле {line}")
+            elif key == 'LUT_1D_SIZE':
+                raise ValueError("Одномерные LUT не поддерживаются")
+            elif key[0].isalpha():
+                # TITLE и прочие ключевые слова на таблицу не влияют
+                continue
+            else:
+                data.append(line)
+    if size is None:
+        raise ValueError("В файле нет LUT_3D_SIZE")
+    values = np.loadtxt(data, dtype=np.float32, ndmin=2)
+    if values.shape != (size ** 3, 3):
+        raise ValueError(f"Ожидалось {size ** 3} строк по 3 числа, получено {values.shape}")
+    return np.ascontiguousarray(values.reshape(size, size, size, 3).transpose(2, 1, 0, 3))
+
+
+def _axis_weights(values, size: int):
+    """Нижний узел решётки и доля до следующего узла по одной оси (float32)"""
+    pos = np.asarray(values).astype(np.float32) * np.float32((size - 1) / 255)
+    np.clip(pos, 0, size - 1, out=pos)
+    base = np.minimum(pos.astype(np.intp), size - 2)
+    return base, (pos - base).astype(np.float32)
+
+
+def apply_lut(rgb, lut: np.ndarray) -> np.ndarray:
+    """Трилинейная интерполяция LUT для массива (..., 3) в 0..255; результат float32 0..255"""
+    rgb = np.asarray(rgb)
+    size = lut.shape[0]
+    flat = np.ascontiguousarray(lut, dtype=np.float32).reshape(-1, 3)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    if rgb.dtype == np.uint8:
+        # Узлы и доли для 256 уровней считаются один раз, на пиксель - выборки
+        base, frac = _axis_weights(np.arange(256), size)
+        index = (base * (size * size))[r] + (base * size)[g] + base[b]
+        fr, fg, fb = frac[r], frac[g], frac[b]
+    else:
+        (br, fr), (bg, fg), (bb, fb) = (_axis_weights(c, size) for c in (r, g, b))
+        index = (br * size + bg) * size + bb
+    fr, fg, fb = fr[..., None], fg[..., None], fb[..., None]
+
+    def corner(offset):
+        return np.take(flat, index + offset if offset else index, axis=0)
+
+    # Соседи по r, g, b отстоят в плоском массиве на size², size и 1
+    dr, dg = size * size, size
+    c00 = corner(0)
+    c00 += (corner(dr) - c00) * fr
+    c01 = corner(1)
+    c01 += (corner(dr + 1) - c01) * fr
+    c10 = corner(dg)
+    c10 += (corner(dr + dg) - c10) * fr
+    c11 = corner(dg + 1)
+    c11 += (corner(dr + dg + 1) - c11) * fr
+    c00 += (c10 - c00) * fg
+    c01 += (c11 - c01) * fg
+    c00 += (c01 - c00) * fb
+    c00 *= 255
+    return c00
+
+
+def dense_table(lut: np.ndarray) -> np.ndarray:
+    """LUT, развёрнутый по всем 256³ цветам: (256³,) uint32 с байтами R, G, B, 0.
+
+    Трилинейная интерполяция на регулярной сетке раскладывается по осям,
+    поэтому таблица собирается тремя линейными интерполяциями: по b, по g и
+    построчно по r, без выборки восьми углов для каждого из 16.7 млн цветов.
+    """
+    size = lut.shape[0]
+    base, frac = _axis_weights(np.arange(256), size)
+    lut = np.asarray(lut, dtype=np.float32)
+    w = frac[:, None]
+    grid = lut[:, :, base] * (1 - w) + lut[:, :, base + 1] * w
+    w = frac[:, None, None]
+    grid = np.ascontiguousarray(grid[:, base] * (1 - w) + grid[:, base + 1] * w)
+    table = np.zeros((256, 256 * 256, 4), dtype=np.uint8)
+    for r in range(256):
+        k, w = base[r], frac[r]
+        row = grid[k] * (1 - w)
+        row += grid[k + 1] * w
+        row *= 255
+        table[r, :, :3] = np.rint(row, out=row).reshape(-1, 3)
+    return table.reshape(-1).view(np.uint32)
+
+
+def apply_table(rgb, table: np.ndarray) -> np.ndarray:
+    """Одна выборка на пиксель из таблицы dense_table для массива (..., 3) uint8"""
+    rgb = np.asarray(rgb)
+    if rgb.dtype != np.uint8:
+        raise ValueError(f"Таблица применяется к 8-битным цветам, получено {rgb.dtype}")
+    index = rgb[..., 0].astype(np.uint32)
+    index <<= 16
+    index |= rgb[..., 1].astype(np.uint32) << 8
+    index |= rgb[..., 2]
+    return table[index].view(np.uint8).reshape(rgb.shape[:-1] + (4,))[..., :3]
+
+
+def apply_to_image(rgb, lut: np.ndarray, table: Optional[np.ndarray] = None) -> np.ndarray:
+    """LUT для изображения (H, W, 3) uint8: по готовой таблице, а для больших
+    изображений через развёрнутую таблицу, иначе трилинейно"""
+    rgb = np.asarray(rgb, dtype=np.uint8)
+    if table is None and rgb.size // 3 >= DENSE_MIN_PIXELS:
+        table = dense_table(lut)
+    if table is not None:
+        return np.ascontiguousarray(apply_table(rgb, table))
+    return np.rint(apply_lut(rgb, lut)).astype(np.uint8)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="3D LUT (.cube) из преобразований lab1 и его применение")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="собрать .cube из цепочки правок")
+    build.add_argument('output')
+    build.add_argument('--step', action='append', default=[], metavar='MODEL.CH(+|*|=)N',
+                       help="правка канала, например hsv.h+30 или lab.l*1.1; можно несколько")
+    build.add_argument('--size', type=int, choices=LUT_SIZES, default=DEFAULT_SIZE)
+    build.add_argument('--title', default='')
+    apply = sub.add_parser('apply', help="применить .cube к изображению")
+    apply.add_argument('lut')
+    apply.add_argument('image')
+    apply.add_argument('output')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        steps = [Adjustment.parse(text) for text in args.step]
+        start = time.perf_counter()
+        lut = build_lut(pipeline(steps), args.size)
+        save_cube(lut, args.output, args.title or ' '.join(str(s) for s in steps))
+        print(f"{args.output}: {args.size}³, {len(steps)} правок, {time.perf_counter() - start:.2f} с")
+        return
+
+    from PIL import Image
+
+    lut = load_cube(args.lut)
+    image = np.asarray(Image.open(args.image).convert('RGB'))
+    start = time.perf_counter()
+    result = apply_to_image(image, lut)
+    Image.fromarray(result).save(args.output)
+    print(f"{args.output}: {image.shape[1]} × {image.shape[0]}, {time.perf_counter() - start:.2f} с")
+
+
+if __name__ == "__main__":
+    main()
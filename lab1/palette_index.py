@@ -0,0 +1,327 @@
+import argparse
+import sys
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import batch_convert
+import color_engine
+
+METRICS = ('de76', 'de2000')
+# Уточнений оценки ΔE76 через ΔE2000 на запрос (см. query_lab_batch)
+DE2000_BOUND_STEPS = 4
+# Пар (запрос, кандидат) в одном вызове delta_e2000: ограничивает временные массивы
+DE2000_CHUNK = 1 << 18
+# В палитрах до стольких цветов ΔE2000 считается до всех цветов сразу: это быстрее отбора кандидатов
+DE2000_BRUTE_FORCE = 2048
+
+
+def delta_e76(lab1, lab2) -> np.ndarray:
+    """ΔE*76 - евклидово расстояние в LAB (с трансляцией по осям)"""
+    diff = np.asarray(lab1, dtype=np.float64) - np.asarray(lab2, dtype=np.float64)
+    return np.sqrt((diff ** 2).sum(axis=-1))
+
+
+def delta_e2000(lab1, lab2) -> np.ndarray:
+    """ΔE*00 по CIEDE2000 (Sharma, Wu, Dalal, 2005), с трансляцией по осям"""
+    lab1 = np.asarray(lab1, dtype=np.float64)
+    lab2 = np.asarray(lab2, dtype=np.float64)
+    L1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    L2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+
+    c_bar = (np.hypot(a1, b1) + np.hypot(a2, b2)) / 2
+    c_bar7 = c_bar ** 7
+    g = 0.5 * (1 - np.sqrt(c_bar7 / (c_bar7 + 25.0 ** 7)))
+    a1p, a2p = (1 + g) * a1, (1 + g) * a2
+    c1p, c2p = np.hypot(a1p, b1), np.hypot(a2p, b2)
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360
+    h2p = np.degrees(np.arctan2(b2, a2p)) % 360
+
+    achromatic = (c1p * c2p) == 0
+    dhp = h2p - h1p
+    dhp = np.where(dhp > 180, dhp - 360, np.where(dhp < -180, dhp + 360, dhp))
+    dhp = np.where(achromatic, 0.0, dhp)
+
+    d_l = L2 - L1
+    d_c = c2p - c1p
+    d_h = 2 * np.sqrt(c1p * c2p) * np.sin(np.radians(dhp / 2))
+
+    l_bar = (L1 + L2) / 2
+    cp_bar = (c1p + c2p) / 2
+    h_sum = h1p + h2p
+    h_bar = np.where(np.abs(h1p - h2p) <= 180, h_sum / 2,
+                     np.where(h_sum < 360, (h_sum + 360) / 2, (h_sum - 360) / 2))
+    h_bar = np.where(achromatic, h_sum, h_bar)
+
+    t = (1 - 0.17 * np.cos(np.radians(h_bar - 30)) + 0.24 * np.cos(np.radians(2 * h_bar))
+         + 0.32 * np.cos(np.radians(3 * h_bar + 6)) - 0.20 * np.cos(np.radians(4 * h_bar - 63)))
+    d_theta = 30 * np.exp(-((h_bar - 275) / 25) ** 2)
+    cp_bar7 = cp_bar ** 7
+    r_c = 2 * np.sqrt(cp_bar7 / (cp_bar7 + 25.0 ** 7))
+    s_l = 1 + 0.015 * (l_bar - 50) ** 2 / np.sqrt(20 + (l_bar - 50) ** 2)
+    s_c = 1 + 0.045 * cp_bar
+    s_h = 1 + 0.015 * cp_bar * t
+    r_t = -np.sin(np.radians(2 * d_theta)) * r_c
+
+    dl, dc, dh = d_l / s_l, d_c / s_c, d_h / s_h
+    return np.sqrt(np.maximum(dl ** 2 + dc ** 2 + dh ** 2 + r_t * dc * dh, 0.0))
+
+
+def de76_per_de2000(lab, max_l_offset: float, max_chroma: float) -> np.ndarray:
+    """Во сколько раз ΔE76 между цветом lab (..., 3) и любым цветом с
+    |L - 50| <= max_l_offset и хромой <= max_chroma может превышать ΔE2000
+    (границы можно задавать по запросам массивами).
+
+    ΔE76 не больше расстояния в (L, a', b) CIEDE2000, а его квадрат равен
+    ΔL'^2 + ΔC'^2 + ΔH'^2 = (S_L dl)^2 + (S_C dc)^2 + (S_H dh)^2, где S_H < S_C.
+    Поворот R_T dc dh с |R_T| <= R_C sin 60° уменьшает dc^2 + dh^2 не более чем в
+    (1 - |R_T| / 2) раз. S_L, S_C и R_C растут с отклонением L от 50 и со средней
+    хромой пары, поэтому берутся на их наибольших значениях.
+    """
+    lab = np.asarray(lab, dtype=np.float64)
+    l_offset = (np.abs(lab[..., 0] - 50) + max_l_offset) / 2
+    c_bar = (np.hypot(lab[..., 1], lab[..., 2]) + max_chroma) / 2
+    c_bar7 = c_bar ** 7
+    # (1 + G) * C монотонно растёт с C, так что C' пары не больше этого значения
+    cp_bar = c_bar * (1.5 - 0.5 * np.sqrt(c_bar7 / (c_bar7 + 25.0 ** 7)))
+    cp_bar7 = cp_bar ** 7
+    r_t = 2 * np.sqrt(cp_bar7 / (cp_bar7 + 25.0 ** 7)) * np.sin(np.radians(60))
+    s_l = 1 + 0.015 * l_offset ** 2 / np.sqrt(20 + l_offset ** 2)
+    s_c = 1 + 0.045 * cp_bar
+    # Запас на ошибки округления при вычислении самих ΔE
+    return np.maximum(s_l, s_c / np.sqrt(1 - r_t / 2)) * (1 + 1e-9)
+
+
+class PaletteIndex:
+    """Поиск ближайших цветов палитры в пространстве LAB.
+
+    Палитра раскладывается по равномерной сетке в LAB. Запросы обрабатываются
+    блоками соседних ячеек: для блока берутся точки из окрестности, и поиск
+    расширяется, пока k-е расстояние больше расстояния до границы
+    просмотренной области. Для ΔE76 результат точный. Для ΔE2000 по ΔE76
+    отбираются кандидаты и ранжируются по ΔE2000; пул кандидатов расширяется,
+    пока k-е расстояние ΔE2000, переведённое оценкой de76_per_de2000 в ΔE76,
+    не окажется внутри пула. Поэтому и для ΔE2000 результат точный.
+    """
+
+    def __init__(self, palette_rgb, names: Optional[Sequence[str]] = None,
+                 cell_size: Optional[float] = None, points_per_cell: float = 4.0,
+                 query_block: int = 4):
+        palette_rgb = np.asarray(palette_rgb)
+        if palette_rgb.ndim != 2 or palette_rgb.shape[1] != 3 or len(palette_rgb) == 0:
+            raise ValueError(f"Ожидалась непустая палитра формы (N, 3), получено {palette_rgb.shape}")
+        self.rgb = palette_rgb
+        self.names = list(names) if names is not None else None
+        self.lab = color_engine.rgb_to_lab_batch(palette_rgb)
+        self._max_l_offset = float(np.abs(self.lab[:, 0] - 50).max())
+        self._max_chroma = float(np.hypot(self.lab[:, 1], self.lab[:, 2]).max())
+        self.query_block = max(1, int(query_block))
+        self._build_grid(cell_size, points_per_cell)
+
+    @classmethod
+    def from_lines(cls, lines, **kwargs) -> 'PaletteIndex':
+        """Палитра из строк с HEX-кодами или тройками RGB (как в batch_convert)"""
+        colors, names = [], []
+        for line in lines:
+            values = batch_convert.parse_line(line) if line.strip() else None
+            if values is not None:
+                colors.append(values)
+                names.append(line.strip())
+        return cls(np.array(colors, dtype=np.int64), names, **kwargs)
+
+    @classmethod
+    def from_file(cls, path, **kwargs) -> 'PaletteIndex':
+        with open(path, encoding='utf-8') as f:
+            return cls.from_lines(f, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.lab)
+
+    def _build_grid(self, cell_size, points_per_cell):
+        self.origin = self.lab.min(axis=0)
+        extent = np.maximum(self.lab.max(axis=0) - self.origin, 1e-9)
+        if cell_size is None:
+            cell_size = float(np.cbrt(extent.prod() * points_per_cell / len(self.lab)))
+            # Не больше 256 ячеек по оси, чтобы таблица начала ячеек оставалась маленькой
+            cell_size = max(cell_size, float(extent.max()) / 256, 1e-6)
+        self.cell_size = cell_size
+        self.grid_shape = (np.floor(extent / cell_size).astype(np.int64) + 1)
+
+        cells = self._cells_of(self.lab)
+        keys = np.ravel_multi_index(cells.T, self.grid_shape)
+        order = np.argsort(keys, kind='stable')
+        self._order = order
+        self._sorted_lab = self.lab[order]
+        self._cell_start = np.searchsorted(keys[order], np.arange(int(np.prod(self.grid_shape)) + 1))
+
+    def _cells_of(self, lab) -> np.ndarray:
+        cells = np.floor((lab - self.origin) / self.cell_size).astype(np.int64)
+        return np.clip(cells, 0, self.grid_shape - 1)
+
+    def _box_candidates(self, lo, hi) -> np.ndarray:
+        # Ячейки с одинаковыми (x, y) и соседними z лежат подряд
+        nz = self.grid_shape[2]
+        chunks = []
+        for x in range(lo[0], hi[0] + 1):
+            for y in range(lo[1], hi[1] + 1):
+                base = (x * self.grid_shape[1] + y) * nz
+                start, end = self._cell_start[base + lo[2]], self._cell_start[base + hi[2] + 1]
+                if end > start:
+                    chunks.append(np.arange(start, end))
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+    def _knn_lab(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        m = len(queries)
+        k = min(k, len(self.lab))
+        dist = np.empty((m, k))
+        index = np.empty((m, k), dtype=np.int64)
+
+        blocks = self._cells_of(queries) // self.query_block
+        block_keys = np.ravel_multi_index(blocks.T, blocks.max(axis=0) + 1) if m else np.empty(0, np.int64)
+        order = np.argsort(block_keys, kind='stable')
+        bounds = np.flatnonzero(np.diff(block_keys[order])) + 1
+        top = self.grid_shape - 1
+
+        for members in np.split(order, bounds):
+            if members.size == 0:
+                continue
+            q = queries[members]
+            block_lo = blocks[members[0]] * self.query_block
+            block_hi = np.minimum(block_lo + self.query_block - 1, top)
+            radius = 1
+            while members.size:
+                lo = np.maximum(block_lo - radius, 0)
+                hi = np.minimum(block_hi + radius, top)
+                full = bool((lo == 0).all() and (hi == top).all())
+                cand = self._box_candidates(lo, hi)
+                if cand.size < k and not full:
+                    radius += 1
+                    continue
+
+                d2 = ((q[:, None, :] - self._sorted_lab[cand][None, :, :]) ** 2).sum(axis=-1)
+                part = np.argpartition(d2, k - 1, axis=1)[:, :k] if cand.size > k else \
+                    np.broadcast_to(np.arange(cand.size), (len(q), cand.size))
+                part_d2 = np.take_along_axis(d2, part, axis=1)
+                sort = np.argsort(part_d2, axis=1, kind='stable')
+                best = np.take_along_axis(part, sort, axis=1)
+                best_d = np.sqrt(np.take_along_axis(part_d2, sort, axis=1))
+
+                if full:
+                    done = np.ones(len(q), dtype=bool)
+                else:
+                    # Всё, что вне просмотренной области, не ближе расстояния до её границы
+                    box_lo = self.origin + lo * self.cell_size
+                    box_hi = self.origin + (hi + 1) * self.cell_size
+                    margin_lo = np.where(lo > 0, q - box_lo, np.inf)
+                    margin_hi = np.where(hi < top, box_hi - q, np.inf)
+                    margin = np.minimum(margin_lo, margin_hi).min(axis=1)
+                    done = best_d[:, -1] <= margin
+
+                dist[members[done]] = best_d[done]
+                index[members[done]] = self._order[cand[best[done]]]
+                members, q = members[~done], q[~done]
+                radius += 1
+        return dist, index
+
+    def query_lab_batch(self, lab, k: int = 1, metric: str = 'de76',
+                        candidates: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """k ближайших цветов палитры для массива LAB (M, 3): (расстояния, индексы) формы (M, k).
+
+        candidates - начальный размер пула кандидатов для ΔE2000; для запросов,
+        у которых точность не доказана, пул увеличивается, а если он больше
+        половины палитры (или палитра меньше DE2000_BRUTE_FORCE), ΔE2000
+        считается до всех её цветов.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Неизвестная метрика: {metric}, доступны {METRICS}")
+        if k <= 0:
+            raise ValueError("k должно быть положительным")
+        lab = np.asarray(lab, dtype=np.float64).reshape(-1, 3)
+        if metric == 'de76':
+            return self._knn_lab(lab, k)
+
+        n = len(self.lab)
+        k = min(k, n)
+        pool = min(n, max(candidates or max(16 * k, 64), k))
+        dist = np.empty((len(lab), k))
+        index = np.empty((len(lab), k), dtype=np.int64)
+        todo = np.arange(len(lab))
+        while todo.size:
+            q = lab[todo]
+            if pool * 2 > n or n <= DE2000_BRUTE_FORCE:
+                dist[todo], index[todo] = self._nearest_de2000(q, None, k)
+                break
+            de76, cand = self._knn_lab(q, pool)
+            best, found = self._nearest_de2000(q, cand, k)
+            # Цвет ближе k-го по ΔE2000 лежит по ΔE76 не дальше bound. Его L и
+            # хрома отличаются от запроса не больше чем на ΔE76, что сужает
+            # оценку; каждая следующая оценка тоже верна, поэтому берётся минимум
+            bound = best[:, -1] * de76_per_de2000(q, self._max_l_offset, self._max_chroma)
+            for _ in range(DE2000_BOUND_STEPS):
+                l_offset = np.minimum(self._max_l_offset, np.abs(q[:, 0] - 50) + bound)
+                chroma = np.minimum(self._max_chroma, np.hypot(q[:, 1], q[:, 2]) + bound)
+                bound = np.minimum(bound, best[:, -1] * de76_per_de2000(q, l_offset, chroma))
+            # Цвета вне пула дальше de76[:, -1] по ΔE76
+            done = bound <= de76[:, -1]
+            dist[todo[done]] = best[done]
+            index[todo[done]] = found[done]
+            if not done.all():
+                # Число цветов в шаре растёт примерно как куб радиуса: пул
+                # подбирается так, чтобы большинству оставшихся запросов хватило
+                growth = (bound[~done] / np.maximum(de76[~done, -1], 1e-12)) ** 3
+                pool = int(min(n, max(2 * pool, pool * 1.25 * np.quantile(growth, 0.9))))
+            todo = todo[~done]
+        return dist, index
+
+    def _nearest_de2000(self, q: np.ndarray, cand: Optional[np.ndarray], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """k ближайших по ΔE2000 среди кандидатов cand (M, P) или всей палитры (cand=None)"""
+        width = len(self.lab) if cand is None else cand.shape[1]
+        rows = max(1, DE2000_CHUNK // width)
+        dist = np.empty((len(q), k))
+        index = np.empty((len(q), k), dtype=np.int64)
+        for start in range(0, len(q), rows):
+            part = slice(start, start + rows)
+            if cand is None:
+                ids = np.broadcast_to(np.arange(width), (len(q[part]), width))
+            else:
+                ids = cand[part]
+            de = delta_e2000(q[part, None, :], self.lab[ids])
+            sort = np.argsort(de, axis=1, kind='stable')[:, :k]
+            dist[part] = np.take_along_axis(de, sort, axis=1)
+            index[part] = np.take_along_axis(ids, sort, axis=1)
+        return dist, index
+
+    def query_batch(self, rgb, k: int = 1, metric: str = 'de76',
+                    candidates: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """То же для массива RGB (M, 3)"""
+        return self.query_lab_batch(color_engine.rgb_to_lab_batch(np.asarray(rgb).reshape(-1, 3)),
+                                    k, metric, candidates)
+
+    def query(self, rgb: Sequence[int], k: int = 1, metric: str = 'de76') -> List[Tuple[int, float]]:
+        """k ближайших цветов палитры для одного RGB: [(индекс, ΔE), ...]"""
+        dist, index = self.query_batch([rgb], k, metric)
+        return list(zip(index[0].tolist(), dist[0].tolist()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Поиск ближайших цветов палитры по ΔE76/ΔE2000")
+    parser.add_argument('palette', help="файл палитры: HEX-коды или тройки RGB по строкам")
+    parser.add_argument('colors', nargs='*', help="искомые цвета (HEX или r,g,b); без них - со стандартного ввода")
+    parser.add_argument('-k', type=int, default=1)
+    parser.add_argument('--metric', choices=METRICS, default='de2000')
+    args = parser.parse_args()
+
+    index = PaletteIndex.from_file(args.palette)
+    lines = args.colors or [line for line in sys.stdin if line.strip()]
+    colors = [batch_convert.parse_line(line) for line in lines]
+    valid = [(line.strip(), c) for line, c in zip(lines, colors) if c is not None]
+    if not valid:
+        return
+    dist, found = index.query_batch(np.array([c for _, c in valid], dtype=np.int64), args.k, args.metric)
+    for (line, _), row_d, row_i in zip(valid, dist, found):
+        matches = ', '.join(f"{index.names[i]} (ΔE={d:.2f})" for i, d in zip(row_i, row_d))
+        print(f"{line}: {matches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import argparse
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+import color_engine
+import image_io
+
+DEFAULT_COLORS = 8
+DEFAULT_BATCH = 4096
+DEFAULT_ITERATIONS = 100
+# Из больших изображений берётся случайная выборка пикселей: доли цветов
+# по ней оцениваются с погрешностью порядка 1/sqrt(DEFAULT_SAMPLE)
+DEFAULT_SAMPLE = 1 << 18
+# Выборка для инициализации k-means++: квадратичная по числу центров часть
+# алгоритма считается на ней, а не на всех цветах изображения
+SEED_SAMPLE = 20000
+# Во сколько раз сетка пикселей файла, из которой берётся выборка, больше самой выборки
+SAMPLE_POOL = 4
+EXPORT_FORMATS = ('.txt', '.csv', '.gpl', '.png')
+
+
+@dataclass
+class Palette:
+    """Доминирующие цвета изображения, по убыванию доли пикселей"""
+    rgb: np.ndarray
+    lab: np.ndarray
+    weights: np.ndarray
+    pixels: int
+    sampled: int
+    unique_colors: int
+    elapsed: float
+
+    def __len__(self) -> int:
+        return len(self.rgb)
+
+    def hex_codes(self) -> List[str]:
+        return [f'#{r:02X}{g:02X}{b:02X}' for r, g, b in self.rgb.tolist()]
+
+
+def color_histogram(rgb) -> Tuple[np.ndarray, np.ndarray]:
+    """Уникальные цвета (U, 3) uint8 и число пикселей каждого.
+
+    Цвет упаковывается в 24-битный индекс, поэтому дальше вся работа идёт
+    по уникальным цветам, а не по пикселям.
+    """
+    rgb = np.asarray(rgb)
+    if rgb.shape[-1] != 3:
+        raise ValueError(f"Ожидался массив формы (..., 3), получено {rgb.shape}")
+    rgb = rgb.reshape(-1, 3).astype(np.uint32)
+    packed = (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+    packed, counts = np.unique(packed, return_counts=True)
+    colors = np.stack([packed >> 16, (packed >> 8) & 0xFF, packed & 0xFF], axis=-1).astype(np.uint8)
+    return colors, counts
+
+
+def _nearest(points, centers) -> np.ndarray:
+    """Номер ближайшего центра; |x|^2 не влияет на argmin и не считается"""
+    return (points @ (-2 * centers.T) + (centers ** 2).sum(axis=1)).argmin(axis=1)
+
+
+def _kmeans_pp(points, k: int, rng) -> np.ndarray:
+    """Инициализация k-means++ (точки уже выбраны пропорционально весам)"""
+    centers = np.empty((k, 3))
+    centers[0] = points[rng.integers(len(points))]
+    closest = ((points - centers[0]) ** 2).sum(axis=-1)
+    for i in range(1, k):
+        total = closest.sum()
+        if total <= 0:
+            # Различных цветов меньше, чем центров: остальные центры совпадут
+            centers[i:] = centers[0]
+            break
+        j = np.searchsorted(np.cumsum(closest), rng.random() * total, side='right')
+        centers[i] = points[min(j, len(points) - 1)]
+        closest = np.minimum(closest, ((points - centers[i]) ** 2).sum(axis=-1))
+    return centers
+
+
+def quantize(rgb, n_colors: int = DEFAULT_COLORS, batch_size: int = DEFAULT_BATCH,
+             iterations: int = DEFAULT_ITERATIONS, tol: float = 1e-3,
+             sample: Optional[int] = DEFAULT_SAMPLE, seed: Optional[int] = 0) -> Palette:
+    """Палитра из n_colors цветов для массива RGB (..., 3) с целыми 0..255.
+
+    Кластеризация идёт в LAB: инициализация k-means++, затем мини-пакетные
+    обновления центров (Sculley, 2010) по выборкам, взятым пропорционально
+    числу пикселей, и в конце один точный шаг Ллойда по всем уникальным цветам.
+    Изображения больше sample пикселей обрабатываются по случайной выборке
+    (sample=None - все пиксели).
+    """
+    if n_colors <= 0:
+        raise ValueError("Число цветов должно быть положительным")
+    if batch_size <= 0 or iterations < 0:
+        raise ValueError("Размер пакета должен быть положительным, число итераций - неотрицательным")
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+
+    flat = np.asarray(rgb).reshape(-1, 3)
+    pixels = len(flat)
+    if not pixels:
+        raise ValueError("Пустое изображение")
+    if sample and pixels > sample:
+        flat = flat[rng.integers(0, pixels, sample)]
+    colors, counts = color_histogram(flat)
+    lab = color_engine.rgb_to_lab_batch(colors)
+    cdf = np.cumsum(counts)
+    sampled = int(cdf[-1])
+
+    def draw(size):
+        return np.searchsorted(cdf, rng.integers(0, sampled, size), side='right')
+
+    k = min(n_colors, len(colors))
+    centers = _kmeans_pp(lab[draw(max(SEED_SAMPLE, 20 * k))], k, rng)
+
+    seen = np.zeros(k)
+    for _ in range(iterations):
+        batch = lab[draw(batch_size)]
+        labels = _nearest(batch, centers)
+        n = np.bincount(labels, minlength=k).astype(np.float64)
+        sums = np.stack([np.bincount(labels, batch[:, c], minlength=k) for c in range(3)], axis=-1)
+        hit = n > 0
+        seen[hit] += n[hit]
+        # Сумма последовательных шагов с темпом 1/seen по каждой точке пакета
+        step = (sums[hit] - n[hit, None] * centers[hit]) / seen[hit, None]
+        centers[hit] += step
+        if np.abs(step).max(initial=0.0) < tol:
+            break
+
+    labels = _nearest(lab, centers)
+    weights = np.bincount(labels, counts, minlength=k)
+    sums = np.stack([np.bincount(labels, lab[:, c] * counts, minlength=k) for c in range(3)], axis=-1)
+    used = weights > 0
+    centers, weights = sums[used] / weights[used, None], weights[used]
+
+    order = np.argsort(-weights, kind='stable')
+    centers, weights = centers[order], weights[order] / sampled
+    return Palette(rgb=color_engine.lab_to_rgb_batch(centers), lab=centers, weights=weights,
+                   pixels=pixels, sampled=sampled, unique_colors=len(colors),
+                   elapsed=time.perf_counter() - start)
+
+
+def extract_palette(source, n_colors: int = DEFAULT_COLORS, **kwargs) -> Palette:
+    """То же для файла изображения, PIL.Image или массива (H, W, 3).
+
+    С выборкой файл не переводится в RGB целиком: случайная выборка берётся из
+    равномерной сетки пикселей в SAMPLE_POOL раз больше неё (image_io.sample_rgb).
+    """
+    if isinstance(source, np.ndarray):
+        return quantize(source, n_colors, **kwargs)
+    sample = kwargs.get('sample', DEFAULT_SAMPLE)
+    if not sample:
+        return quantize(image_io.load_rgb(source), n_colors, **kwargs)
+    rgb, pixels = image_io.sample_rgb(source, SAMPLE_POOL * sample)
+    return replace(quantize(rgb, n_colors, **kwargs), pixels=pixels)
+
+
+def save_palette(palette: Palette, path) -> Path:
+    """Экспорт по расширению: .txt (HEX по строкам), .csv, .gpl (GIMP) или .png"""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix not in EXPORT_FORMATS:
+        raise ValueError(f"Неизвестный формат палитры: {path.suffix}, доступны {EXPORT_FORMATS}")
+    codes = palette.hex_codes()
+
+    if suffix == '.png':
+        # Полосы с шириной, пропорциональной доле цвета
+        width, height = 512, 64
+        edges = np.round(np.concatenate([[0], np.cumsum(palette.weights)]) * width).astype(int)
+        strip = np.repeat(palette.rgb.astype(np.uint8), np.diff(edges), axis=0)
+        image_io.pil().fromarray(np.broadcast_to(strip, (height,) + strip.shape).copy()).save(path)
+        return path
+
+    if suffix == '.gpl':
+        lines = ['GIMP Palette', f'Name: {path.stem}', 'Columns: 0', '#']
+        lines += [f'{r:3d} {g:3d} {b:3d}\t{code} {w:.2%}'
+                  for (r, g, b), code, w in zip(palette.rgb.tolist(), codes, palette.weights)]
+    elif suffix == '.csv':
+        lines = ['hex,r,g,b,lab_l,lab_a,lab_b,weight']
+        lines += [f'{code},{r},{g},{b},{l:.2f},{a:.2f},{bb:.2f},{w:.6f}'
+                  for code, (r, g, b), (l, a, bb), w
+                  in zip(codes, palette.rgb.tolist(), palette.lab.tolist(), palette.weights)]
+    else:
+        lines = codes
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Доминирующая палитра изображения (k-means в LAB)")
+    parser.add_argument('image')
+    parser.add_argument('-n', '--colors', type=int, default=DEFAULT_COLORS)
+    parser.add_argument('-o', '--output', help=f"файл палитры {'/'.join(EXPORT_FORMATS)}")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH)
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument('--sample', type=int, default=DEFAULT_SAMPLE, help="0 - все пиксели")
+    parser.add_argument('--seed', type=int, default=0)
+    image_io.add_pixel_limit_argument(parser)
+    args = parser.parse_args()
+    image_io.apply_pixel_limit(args.max_pixels)
+
+    palette = extract_palette(args.image, args.colors, batch_size=args.batch_size,
+                              iterations=args.iterations, sample=args.sample or None, seed=args.seed)
+    for code, weight in zip(palette.hex_codes(), palette.weights):
+        print(f"{code} {weight:6.1%}")
+    print(f"Пикселей: {palette.pixels}, в выборке: {palette.sampled}, "
+          f"уникальных цветов в выборке: {palette.unique_colors}, "
+          f"время: {palette.elapsed:.2f} с")
+    if args.output:
+        print(f"Сохранено: {save_palette(palette, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+import gamut
+
+PLANE_SIZE = 256
+
+
+class HsvPlane:
+    """Плоскость выбора S/V при фиксированном тоне: S слева направо, V сверху вниз.
+
+    Изображение считается целиком, без элементов Canvas на пиксель. При
+    фиксированном тоне каждый канал hsv_to_rgb_batch равен v * (1 - s * k), где
+    k (0, 1, f или 1 - f) зависит только от тона, поэтому плоскость собирается
+    из строки и столбца с той же арифметикой, что и пакетное преобразование.
+    """
+
+    def __init__(self, size: int = PLANE_SIZE):
+        self.size = size
+        self.s = np.linspace(0, 100, size)
+        self.v = np.linspace(100, 0, size)
+        self.hue: Optional[float] = None
+        self.image: Optional[np.ndarray] = None
+
+    def render(self, hue: float) -> np.ndarray:
+        if self.image is not None and hue == self.hue:
+            return self.image
+        h = hue / 360.0
+        i = np.trunc(h * 6.0)
+        f = (h * 6.0) - i
+        i = int(i) % 6
+        # Множитель k каналов для v, q, p, t из hsv_to_rgb_batch
+        k = {'v': 0.0, 'q': f, 'p': 1.0, 't': 1.0 - f}
+        channels = (('v', 'q', 'p', 'p', 't', 'v')[i],
+                    ('t', 'v', 'v', 'q', 'p', 'p')[i],
+                    ('p', 'p', 't', 'v', 'v', 'q')[i])
+        s, v = self.s / 100.0, self.v / 100.0
+        factors = np.stack([1.0 - s * k[name] for name in channels], axis=-1)
+        rgb = v[:, None, None] * factors[None, :, :]
+        self.image = (rgb * 255).astype(np.uint8)
+        self.hue = hue
+        return self.image
+
+    def pixel_of(self, s: float, v: float) -> Tuple[int, int]:
+        last = self.size - 1
+        return int(round(s / 100 * last)), int(round((100 - v) / 100 * last))
+
+    def value_at(self, col: int, row: int) -> Tuple[float, float]:
+        """(S, V) точки плоскости; координаты вне плоскости прижимаются к краю"""
+        last = self.size - 1
+        return float(self.s[min(max(col, 0), last)]), float(self.v[min(max(row, 0), last)])
+
+
+class LabPlane:
+    """Плоскость выбора a*b* при фиксированном L* со срезом охвата sRGB"""
+
+    def __init__(self, size: int = PLANE_SIZE, extent: float = gamut.SLICE_EXTENT):
+        self.size = size
+        self.extent = extent
+        self.slice: Optional[gamut.GamutSlice] = None
+        self.image: Optional[np.ndarray] = None
+
+    def render(self, lightness: float) -> np.ndarray:
+        if self.image is not None and lightness == self.slice.lightness:
+            return self.image
+        self.slice = gamut.ab_slice(lightness, self.size, self.extent)
+        self.image = gamut.slice_image(self.slice)
+        return self.image
+
+    def pixel_of(self, a: float, b: float) -> Tuple[int, int]:
+        last = self.size - 1
+        return (int(round((a + self.extent) / (2 * self.extent) * last)),
+                int(round((self.extent - b) / (2 * self.extent) * last)))
+
+    def value_at(self, col: int, row: int) -> Tuple[float, float]:
+        """(a*, b*) точки плоскости; координаты вне плоскости прижимаются к краю"""
+        last = self.size - 1
+        col, row = min(max(col, 0), last), min(max(row, 0), last)
+        step = 2 * self.extent / last
+        return -self.extent + col * step, self.extent - row * step
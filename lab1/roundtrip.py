@@ -0,0 +1,226 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import color_engine
+
+ROUNDTRIP_MODELS = ('cmyk', 'hsv', 'hls', 'xyz', 'lab')
+ENGINES = ('batch', 'scalar')
+CUBE_SIZE = 256 ** 3
+# Порция - слой с одним значением R, 65536 цветов
+SLAB = 256 * 256
+DEFAULT_EXAMPLES = 20
+# Обратные преобразования отбрасывают дробную часть (int(), как в исходном
+# приложении), поэтому ошибка в один уровень ожидаема; больше - уже нет
+DEFAULT_TOLERANCE = 1
+
+# Прямые преобразования без кубов: проверяются сами формулы
+_FORWARD = {
+    'cmyk': color_engine.rgb_to_cmyk_batch,
+    'hsv': color_engine.rgb_to_hsv_batch,
+    'hls': color_engine.rgb_to_hls_batch,
+    'xyz': lambda rgb: color_engine.rgb_to_xyz_batch(rgb, use_cube=False),
+    'lab': lambda rgb: color_engine.rgb_to_lab_batch(rgb, use_cube=False),
+}
+
+
+@dataclass
+class ModelReport:
+    """Итог по одной модели; ошибка цвета - наибольшее отличие канала RGB в уровнях"""
+    model: str
+    max_error: int
+    mean_error: float
+    failures: int
+    histogram: Dict[int, int] = field(default_factory=dict)
+    examples: List[Tuple[str, List[int], int]] = field(default_factory=list)
+
+
+@dataclass
+class SweepReport:
+    colors: int
+    engine: str
+    workers: int
+    tolerance: int
+    elapsed: float
+    models: Dict[str, ModelReport] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return all(report.failures == 0 for report in self.models.values())
+
+
+def cube_colors(start: int, stop: int) -> np.ndarray:
+    """Цвета с упакованными индексами (r << 16) | (g << 8) | b из [start, stop)"""
+    index = np.arange(start, stop, dtype=np.int64)
+    return np.stack([index >> 16, (index >> 8) & 0xFF, index & 0xFF], axis=-1)
+
+
+def roundtrip(rgb, model: str, engine: str = 'batch') -> np.ndarray:
+    """RGB -> модель -> RGB для массива (N, 3)"""
+    if engine == 'batch':
+        return color_engine.BATCH_CONVERSIONS[(model, 'rgb')](_FORWARD[model](rgb))
+    forward = color_engine.SCALAR_CONVERSIONS[('rgb', model)]
+    back = color_engine.SCALAR_CONVERSIONS[(model, 'rgb')]
+    return np.array([back(forward(color)) for color in np.asarray(rgb).tolist()], dtype=np.int64)
+
+
+def roundtrip_errors(rgb, model: str, engine: str = 'batch') -> np.ndarray:
+    """Ошибка каждого цвета (N,) uint8: max |RGB - RGB'| по каналам"""
+    rgb = np.asarray(rgb, dtype=np.int64)
+    back = roundtrip(rgb, model, engine)
+    return np.abs(back - rgb).max(axis=-1).clip(0, 255).astype(np.uint8)
+
+
+# Разделяемый массив ошибок (модели x цвета диапазона), подключается
+# в каждом процессе один раз
+_errors: Optional[np.ndarray] = None
+_offset = 0
+_shm: Optional[shared_memory.SharedMemory] = None
+
+
+def _attach(name: str, models: int, offset: int, total: int) -> None:
+    global _errors, _offset, _shm
+    _shm = shared_memory.SharedMemory(name=name)
+    _errors = np.ndarray((models, total), dtype=np.uint8, buffer=_shm.buf)
+    _offset = offset
+
+
+def _release() -> None:
+    global _errors, _shm
+    _errors = None
+    if _shm is not None:
+        _shm.close()
+        _shm = None
+
+
+def _sweep_range(start: int, stop: int, models: Sequence[str], engine: str) -> int:
+    rgb = cube_colors(start, stop)
+    for row, model in enumerate(models):
+        _errors[row, start - _offset:stop - _offset] = roundtrip_errors(rgb, model, engine)
+    return stop - start
+
+
+def _summarize(model: str, errors: np.ndarray, offset: int, tolerance: int, max_examples: int,
+               engine: str) -> ModelReport:
+    counts = np.bincount(errors, minlength=1)
+    failing = np.flatnonzero(errors > tolerance)
+    examples = []
+    if len(failing):
+        picked = failing[:max_examples]
+        index = picked + offset
+        rgb = np.stack([index >> 16, (index >> 8) & 0xFF, index & 0xFF], axis=-1)
+        back = roundtrip(rgb, model, engine)
+        examples = [(f'#{r:02X}{g:02X}{b:02X}', row, int(err))
+                    for (r, g, b), row, err in zip(rgb.tolist(), back.tolist(), errors[picked])]
+    return ModelReport(
+        model=model,
+        max_error=int(errors.max()),
+        mean_error=float(np.dot(np.arange(len(counts)), counts) / len(errors)),
+        failures=int(len(failing)),
+        histogram={int(e): int(n) for e, n in enumerate(counts) if n},
+        examples=examples,
+    )
+
+
+def sweep(models: Sequence[str] = ROUNDTRIP_MODELS, workers: int = 1, chunk: int = SLAB,
+          tolerance: int = DEFAULT_TOLERANCE, engine: str = 'batch', max_examples: int = DEFAULT_EXAMPLES,
+          progress: Optional[Callable[[int, int], None]] = None,
+          start: int = 0, stop: int = CUBE_SIZE) -> SweepReport:
+    """Проверка обратимости для цветов [start, stop) куба RGB.
+
+    Рабочие процессы пишут ошибки прямо в разделяемую память, обратно
+    передаются только размеры порций; итоги считаются по общему массиву.
+    """
+    for model in models:
+        if model not in ROUNDTRIP_MODELS:
+            raise ValueError(f"Неизвестная модель: {model}, доступны {ROUNDTRIP_MODELS}")
+    if engine not in ENGINES:
+        raise ValueError(f"Неизвестный движок: {engine}, доступны {ENGINES}")
+    if chunk <= 0 or not 0 <= start < stop <= CUBE_SIZE:
+        raise ValueError("Неверный размер порции или диапазон цветов")
+
+    began = time.perf_counter()
+    total = stop - start
+    shm = shared_memory.SharedMemory(create=True, size=len(models) * total)
+    try:
+        errors = np.ndarray((len(models), total), dtype=np.uint8, buffer=shm.buf)
+        ranges = [(lo, min(lo + chunk, stop)) for lo in range(start, stop, chunk)]
+        done = 0
+
+        if workers <= 1:
+            _attach(shm.name, len(models), start, total)
+            try:
+                for lo, hi in ranges:
+                    done += _sweep_range(lo, hi, models, engine)
+                    if progress:
+                        progress(done, total)
+            finally:
+                _release()
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                     initargs=(shm.name, len(models), start, total)) as pool:
+                futures = [pool.submit(_sweep_range, lo, hi, models, engine) for lo, hi in ranges]
+                for future in futures:
+                    done += future.result()
+                    if progress:
+                        progress(done, total)
+
+        report = SweepReport(total, engine, max(workers, 1), tolerance, 0.0)
+        for row, model in enumerate(models):
+            report.models[model] = _summarize(model, errors[row], start, tolerance, max_examples, engine)
+        del errors
+    finally:
+        shm.close()
+        shm.unlink()
+    report.elapsed = time.perf_counter() - began
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Проверка RGB -> модель -> RGB для всех 16.7 млн цветов")
+    parser.add_argument('--models', nargs='+', default=list(ROUNDTRIP_MODELS), choices=ROUNDTRIP_MODELS)
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk', type=int, default=SLAB, help="цветов в порции")
+    parser.add_argument('--tolerance', type=int, default=DEFAULT_TOLERANCE, help="допустимая ошибка в уровнях")
+    parser.add_argument('--engine', choices=ENGINES, default='batch',
+                        help="batch - пакетные формулы, scalar - построчные (медленно)")
+    parser.add_argument('--examples', type=int, default=DEFAULT_EXAMPLES,
+                        help="сколько неудачных цветов показать по каждой модели")
+    parser.add_argument('--json', help="сохранить отчёт в JSON")
+    args = parser.parse_args()
+
+    shown = []
+
+    def report_progress(done, total):
+        percent = 100 * done // total
+        if not shown or percent != shown[-1]:
+            shown.append(percent)
+            print(f"\r{percent}%", end='', file=sys.stderr, flush=True)
+
+    report = sweep(args.models, args.workers, args.chunk, args.tolerance, args.engine,
+                   args.examples, report_progress)
+    print(file=sys.stderr)
+    print(f"Цветов: {report.colors}, движок: {report.engine}, процессов: {report.workers}, "
+          f"время: {report.elapsed:.1f} с")
+    for model in report.models.values():
+        print(f"{model.model.upper():<5} макс. ошибка {model.max_error}, средняя {model.mean_error:.6f}, "
+              f"не восстановлено: {model.failures}")
+        for code, back, error in model.examples:
+            print(f"    {code} -> {back} (ошибка {error})")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(asdict(report), f, ensure_ascii=False, indent=2)
+    return 0 if report.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
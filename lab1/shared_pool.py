@@ -0,0 +1,215 @@
+"""Пакетные преобразования больших массивов цветов в пуле процессов.
+
+Массив делится на порции по chunk цветов. Процессы подключаются к входному и
+выходному блокам multiprocessing.shared_memory и пишут результат на место,
+поэтому через очереди пула идут только имена блоков и границы порций.
+Массивы, полученные из SharedConverter.array(), передаются без копирования,
+остальные один раз копируются в разделяемую память.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+import color_engine
+
+DEFAULT_CHUNK = 1 << 20
+# Меньшие массивы быстрее преобразовать в своём процессе, чем раздавать пулу
+MIN_PARALLEL = 1 << 21
+
+# (имя блока, смещение в байтах, форма (N, C), dtype)
+_Spec = Tuple[str, int, Tuple[int, int], str]
+
+
+def _attach(spec: _Spec):
+    name, offset, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+
+
+def _convert_range(source: _Spec, target: _Spec, start: int, stop: int, src: str, dst: str) -> int:
+    src_shm, colors = _attach(source)
+    dst_shm, out = _attach(target)
+    try:
+        out[start:stop] = color_engine.convert(colors[start:stop], src, dst)
+    finally:
+        # Блоки можно закрыть, только когда на их память не ссылается ни один массив
+        del colors, out
+        src_shm.close()
+        dst_shm.close()
+    return stop - start
+
+
+class SharedConverter:
+    """Пул процессов для color_engine.convert над массивами в разделяемой памяти.
+
+    with SharedConverter(workers=8) as pool:
+        rgb = pool.array((height, width, 3), np.uint8)   # заполнить на месте
+        lab = pool.array((height, width, 3), np.float32)
+        pool.convert(rgb, 'rgb', 'lab', out=lab)
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunk: int = DEFAULT_CHUNK,
+                 min_parallel: int = MIN_PARALLEL):
+        if chunk <= 0:
+            raise ValueError("Размер порции должен быть положительным")
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.chunk = chunk
+        self.min_parallel = min_parallel
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # (блок, адрес начала) для поиска массива по адресу его данных
+        self._blocks: List[Tuple[shared_memory.SharedMemory, int]] = []
+        self._orphans: List[shared_memory.SharedMemory] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def array(self, shape, dtype=np.float64) -> np.ndarray:
+        """Массив в разделяемой памяти; живёт до close()"""
+        shape = tuple(shape) if np.ndim(shape) else (int(shape),)
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        base = np.frombuffer(shm.buf, dtype=np.uint8).__array_interface__['data'][0]
+        self._blocks.append((shm, base))
+        return np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+    def _spec(self, flat: np.ndarray) -> Optional[_Spec]:
+        if not flat.flags.c_contiguous:
+            return None
+        address = flat.__array_interface__['data'][0]
+        for shm, base in self._blocks:
+            if base <= address and address + flat.nbytes <= base + shm.size:
+                return shm.name, address - base, flat.shape, flat.dtype.str
+        return None
+
+    def _free(self, name: str) -> None:
+        for index, (shm, _) in enumerate(self._blocks):
+            if shm.name == name:
+                del self._blocks[index]
+                shm.unlink()
+                try:
+                    shm.close()
+                except BufferError:
+                    # Вызывающий ещё держит массив: память уйдёт вместе с процессом
+                    self._orphans.append(shm)
+                return
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def convert(self, colors, src: str, dst: str, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Преобразование массива (..., C) из модели src в dst.
+
+        out - массив формы (..., C_dst); если он создан через array(), процессы
+        пишут прямо в него, иначе результат копируется из временного блока.
+        Тип out может быть уже результата (например, float32), значения
+        приводятся при записи.
+        """
+        for model in (src, dst):
+            if model not in color_engine.CHANNELS:
+                raise ValueError(f"Неизвестная цветовая модель: {model}")
+        channels, out_channels = color_engine.CHANNELS[src], color_engine.CHANNELS[dst]
+        colors = np.asarray(colors)
+        if colors.ndim == 0 or colors.shape[-1] != channels:
+            raise ValueError(f"Ожидался массив формы (..., {channels}), получено {colors.shape}")
+        shape = colors.shape[:-1] + (out_channels,)
+        if out is not None and out.shape != shape:
+            raise ValueError(f"Массив результата должен иметь форму {shape}, получено {out.shape}")
+
+        count = colors.size // channels
+        if self.workers == 1 or count < self.min_parallel:
+            result = color_engine.convert(colors, src, dst)
+            if out is None:
+                return result
+            out[...] = result
+            return out
+
+        flat = colors.reshape(-1, channels)
+        staged = []
+        source = self._spec(flat)
+        if source is None:
+            copy = self.array(flat.shape, flat.dtype)
+            copy[...] = flat
+            source = self._spec(copy)
+            staged.append(source[0])
+            del copy
+        target = self._spec(out.reshape(-1, out_channels)) if out is not None else None
+        if target is None:
+            dtype = out.dtype if out is not None else color_engine.convert(flat[:1], src, dst).dtype
+            result = self.array((count, out_channels), dtype)
+            target = self._spec(result)
+            staged.append(target[0])
+        else:
+            result = None
+        del flat
+
+        try:
+            ranges = [(lo, min(lo + self.chunk, count)) for lo in range(0, count, self.chunk)]
+            pool = self._executor()
+            futures = [pool.submit(_convert_range, source, target, lo, hi, src, dst) for lo, hi in ranges]
+            for future in futures:
+                future.result()
+            if result is not None:
+                if out is None:
+                    out = result.reshape(shape).copy()
+                else:
+                    out[...] = result.reshape(shape)
+        finally:
+            del result
+            for name in staged:
+                self._free(name)
+        return out
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        for shm, _ in list(self._blocks):
+            self._free(shm.name)
+
+
+def convert(colors, src: str, dst: str, out: Optional[np.ndarray] = None,
+            workers: Optional[int] = None, chunk: int = DEFAULT_CHUNK) -> np.ndarray:
+    """Разовое преобразование во временном пуле процессов"""
+    with SharedConverter(workers, chunk) as pool:
+        return pool.convert(colors, src, dst, out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер преобразования большого массива цветов в пуле процессов")
+    parser.add_argument('src', choices=color_engine.MODELS)
+    parser.add_argument('dst', choices=color_engine.MODELS)
+    parser.add_argument('--pixels', type=int, default=100_000_000)
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK, help="цветов в порции")
+    args = parser.parse_args()
+
+    channels = color_engine.CHANNELS[args.src]
+    with SharedConverter(args.workers, args.chunk) as pool:
+        # Входные значения - RGB-цвета, переведённые в исходную модель, тоже пулом
+        colors = pool.array((args.pixels, channels), np.float64 if args.src != 'rgb' else np.uint8)
+        rng = np.random.default_rng(0)
+        for lo in range(0, args.pixels, DEFAULT_CHUNK):
+            hi = min(lo + DEFAULT_CHUNK, args.pixels)
+            rgb = rng.integers(0, 256, (hi - lo, 3), dtype=np.uint8)
+            colors[lo:hi] = rgb if args.src == 'rgb' else color_engine.convert(rgb, 'rgb', args.src)
+        out = pool.array((args.pixels, color_engine.CHANNELS[args.dst]), np.float32)
+        start = time.perf_counter()
+        pool.convert(colors, args.src, args.dst, out=out)
+        elapsed = time.perf_counter() - start
+        print(f"{args.src.upper()} -> {args.dst.upper()}: {args.pixels} цветов, процессов {pool.workers}, "
+              f"порция {pool.chunk}: {elapsed:.2f} с, {args.pixels / elapsed / 1e6:.1f} Мцветов/с")
+        del colors, out
+
+
+if __name__ == "__main__":
+    main()
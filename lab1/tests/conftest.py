@@ -0,0 +1,23 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Модули лабораторной импортируются плоско, как в lab1.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import color_engine  # noqa: E402
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(20240101)
+
+
+@pytest.fixture(autouse=True)
+def no_cubes():
+    """Тесты не зависят от кубов, подключённых другими тестами"""
+    color_engine.unregister_cube()
+    yield
+    color_engine.unregister_cube()
@@ -0,0 +1,73 @@
+"""Пакетное преобразование списка цветов: разбор строк и строки CSV"""
+import csv
+import io
+
+import numpy as np
+import pytest
+
+import batch_convert
+import color_engine
+
+
+@pytest.mark.parametrize('line, src, expected', [
+    ('#ff8000', 'rgb', [255, 128, 0]),
+    ('0f0', 'rgb', [0, 255, 0]),
+    ('#ABC', 'lab', [170, 187, 204]),
+    ('12, 34; 56', 'rgb', [12, 34, 56]),
+    ('255 255 255.0', 'rgb', [255, 255, 255]),
+    ('10 20 30 40', 'cmyk', [10.0, 20.0, 30.0, 40.0]),
+    ('360 100 0', 'hsv', [360.0, 100.0, 0.0]),
+    ('95.047 100 108.883', 'xyz', [95.047, 100.0, 108.883]),
+    ('50 -128 127', 'lab', [50.0, -128.0, 127.0]),
+])
+def test_parse_line(line, src, expected):
+    assert batch_convert.parse_line(line, src) == expected
+
+
+@pytest.mark.parametrize('line, src', [
+    ('300,-5,12', 'rgb'), ('12.9 0 0', 'rgb'), ('1e9 0 0', 'rgb'), ('nan 1 2', 'rgb'),
+    ('-1 0 0', 'rgb'), ('1 2', 'rgb'), ('red', 'rgb'), ('#12345', 'rgb'),
+    ('10 20 30 101', 'cmyk'), ('361 0 0', 'hsv'), ('0 -1 0', 'hls'),
+    ('96 0 0', 'xyz'), ('inf 0 0', 'xyz'), ('50 0 128', 'lab'), ('101 0 0', 'lab'),
+])
+def test_parse_line_rejects(line, src):
+    assert batch_convert.parse_line(line, src) is None
+
+
+def test_convert_lines_matches_engine(rng):
+    rgb = rng.integers(0, 256, (200, 3))
+    lines = [(i, f'{r},{g},{b}\n') for i, (r, g, b) in enumerate(rgb.tolist(), start=1)]
+    lines += [(201, '#fff\n'), (202, '\n'), (203, '256,0,0\n'), (204, 'oops\n')]
+    text, count, errors = batch_convert.convert_lines(lines, 'rgb', precision=6)
+    assert count == 201
+    assert errors == [(203, '256,0,0'), (204, 'oops')]
+
+    rows = list(csv.reader(io.StringIO(text)))
+    assert len(rows) == count and all(len(row) == len(batch_convert.COLUMNS) for row in rows)
+    expected = color_engine.rgb_to_all_batch(np.vstack([rgb, [[255, 255, 255]]]))
+    table = np.hstack([expected[model] for model in color_engine.MODELS])
+    values = np.array([[float(v) for v in row[1:]] for row in rows])
+    np.testing.assert_allclose(values, table, rtol=0, atol=5e-7)
+
+
+def test_convert_lines_keeps_source_values():
+    lines = [(1, '120 50 50'), (2, '#000000'), (3, '0 0 100')]
+    text, count, errors = batch_convert.convert_lines(lines, 'hsv', precision=4)
+    assert (count, errors) == (3, [])
+    rows = list(csv.reader(io.StringIO(text)))
+    hsv = batch_convert.COLUMNS.index('hsv_h')
+    assert [float(v) for v in rows[0][hsv:hsv + 3]] == [120, 50, 50]
+    assert [int(v) for v in rows[0][1:4]] == color_engine.hsv_to_rgb([120, 50, 50])
+    assert [int(v) for v in rows[1][1:4]] == [0, 0, 0]
+    assert [int(v) for v in rows[2][1:4]] == [255, 255, 255]
+
+
+def test_run_streams_chunks():
+    source = io.StringIO('r,g,b\n1,2,3\n#010203\n999,0,0\n4 5 6\n')
+    output, errors = io.StringIO(), io.StringIO()
+    converted, failed = batch_convert.run(source, output, chunk_size=2, skip_header=True, error_stream=errors)
+    assert (converted, failed) == (3, 1)
+    lines = output.getvalue().splitlines()
+    assert lines[0] == ','.join(batch_convert.COLUMNS)
+    assert len(lines) == 4
+    assert 'Строка 3' in errors.getvalue()
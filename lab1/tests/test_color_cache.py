@@ -0,0 +1,154 @@
+"""Кэш преобразований и кубы RGB -> XYZ/LAB против движка"""
+import numpy as np
+import pytest
+
+import color_cache
+import color_cube
+import color_engine
+
+# Кубы хранят float32: относительная погрешность значения - половина шага мантиссы
+CUBE_RTOL = 2 ** -24
+
+
+def repeated_rgb(rng, count, palette, dtype=np.int64):
+    if isinstance(palette, int):
+        palette = rng.integers(0, 256, (palette, 3))
+    return palette[rng.integers(0, len(palette), count)].astype(dtype)
+
+
+def test_scalar_calls_match_engine(rng):
+    cache = color_cache.ConversionCache(maxsize=256)
+    colors = rng.integers(0, 256, (40, 3)).tolist()
+    for _ in range(2):
+        for color in colors:
+            for dst in ('cmyk', 'hsv', 'hls', 'xyz', 'lab'):
+                assert cache.convert_color(color, 'rgb', dst) == color_engine.convert_color(color, 'rgb', dst)
+            assert cache.rgb_to_all(color) == color_engine.rgb_to_all(color)
+    # 128 и 128.0 - один ключ
+    assert cache.convert_color([128.0, 0, 0], 'rgb', 'hsv') == color_engine.convert_color([128, 0, 0], 'rgb', 'hsv')
+    stats = cache.stats()
+    assert stats['size'] == 40 * 6 + 1
+    assert stats['hits'] > 0
+
+
+def test_scalar_eviction_keeps_results(rng):
+    cache = color_cache.ConversionCache(maxsize=8)
+    lab = rng.uniform([0, -128, -128], [100, 127, 127], (50, 3)).tolist()
+    for color in lab + lab[::-1]:
+        assert cache.convert_color(color, 'lab', 'rgb') == color_engine.convert_color(color, 'lab', 'rgb')
+    assert cache.stats()['size'] == 8
+
+
+@pytest.mark.parametrize('dtype', [np.uint8, np.int32, np.int64])
+@pytest.mark.parametrize('dst', ['cmyk', 'hsv', 'hls', 'xyz', 'lab'])
+def test_batch_matches_engine(rng, dtype, dst):
+    # Меньше слотов, чем цветов: часть цветов вытесняется между пакетами
+    cache = color_cache.ConversionCache(maxsize=300)
+    palette = rng.integers(0, 256, (500, 3))
+    for _ in range(4):
+        rgb = repeated_rgb(rng, 5000, palette, dtype)
+        np.testing.assert_array_equal(cache.convert(rgb, 'rgb', dst), color_engine.convert(rgb, 'rgb', dst))
+    stats = cache.stats()
+    assert stats['hits'] > 0
+    assert stats['batch_colors'] <= 300
+
+
+def test_batch_targets_share_slots(rng):
+    cache = color_cache.ConversionCache(maxsize=100)
+    rgb = repeated_rgb(rng, 2000, 150)
+    for dst in ('lab', 'hsv', 'lab', 'cmyk', 'hsv'):
+        np.testing.assert_array_equal(cache.convert(rgb, 'rgb', dst), color_engine.convert(rgb, 'rgb', dst))
+
+
+def test_batch_shapes_and_bypass(rng):
+    cache = color_cache.ConversionCache()
+    image = repeated_rgb(rng, 600, 20).reshape(20, 30, 3)
+    result = cache.convert(image, 'rgb', 'lab')
+    assert result.shape == (20, 30, 3)
+    np.testing.assert_array_equal(result, color_engine.convert(image, 'rgb', 'lab'))
+    # Почти все цвета разные: пакет идёт мимо кэша
+    noise = rng.integers(0, 256, (20000, 3))
+    np.testing.assert_array_equal(cache.convert(noise, 'rgb', 'xyz'), color_engine.convert(noise, 'rgb', 'xyz'))
+    # Дробные значения и другие модели не кэшируются
+    floats = rng.uniform(0, 255, (100, 3))
+    np.testing.assert_array_equal(cache.convert(floats, 'rgb', 'hsv'), color_engine.convert(floats, 'rgb', 'hsv'))
+    hsv = rng.uniform(0, [360, 100, 100], (100, 3))
+    np.testing.assert_array_equal(cache.convert(hsv, 'hsv', 'lab'), color_engine.convert(hsv, 'hsv', 'lab'))
+    with pytest.raises(ValueError):
+        cache.convert(np.zeros((5, 4)), 'rgb', 'lab')
+
+
+def test_resize_and_clear(rng):
+    cache = color_cache.ConversionCache(maxsize=50)
+    rgb = repeated_rgb(rng, 1000, 40)
+    cache.convert(rgb, 'rgb', 'lab')
+    cache.resize(10)
+    np.testing.assert_array_equal(cache.convert(rgb, 'rgb', 'lab'), color_engine.convert(rgb, 'rgb', 'lab'))
+    assert cache.stats()['batch_colors'] <= 10
+    cache.clear()
+    assert cache.stats()['hits'] == 0
+    np.testing.assert_array_equal(cache.convert(rgb, 'rgb', 'lab'), color_engine.convert(rgb, 'rgb', 'lab'))
+
+
+# ---------------------------------------------------------------------------
+# Кубы: полный куб - 16.7 млн цветов, поэтому тесты собирают его начало
+# (R = 0..SLABS-1) теми же формулами и в том же формате, что и build_cube
+# ---------------------------------------------------------------------------
+
+SLABS = 4
+
+
+def partial_cube(model):
+    levels = np.arange(256 * 256 * SLABS)
+    rgb = np.stack([levels >> 16, (levels >> 8) & 255, levels & 255], axis=-1)
+    cube = object.__new__(color_cube.ColorCube)
+    cube.model = model
+    cube.table = color_cube._BUILDERS[model](rgb, use_cube=False).astype(color_cube.CUBE_DTYPE)
+    return cube
+
+
+@pytest.fixture
+def cubes():
+    for model in color_cube.CUBE_MODELS:
+        color_engine.register_cube(model, partial_cube(model))
+
+
+def cube_rgb(rng, count, dtype=np.uint8):
+    return rng.integers(0, [SLABS, 256, 256], (count, 3)).astype(dtype)
+
+
+@pytest.mark.parametrize('dtype', [np.uint8, np.int64])
+def test_cube_matches_engine(rng, cubes, dtype):
+    rgb = cube_rgb(rng, color_engine.CUBE_MIN_SIZE * 2, dtype)
+    for model in color_cube.CUBE_MODELS:
+        exact = color_engine.convert(rgb.astype(np.float64), 'rgb', model)
+        looked_up = color_engine.convert(rgb, 'rgb', model)
+        np.testing.assert_array_equal(looked_up, exact.astype(np.float32))
+        np.testing.assert_allclose(looked_up, exact, rtol=CUBE_RTOL, atol=1e-12)
+    everything = color_engine.rgb_to_all_batch(rgb)
+    np.testing.assert_array_equal(everything['lab'], color_engine.rgb_to_lab_batch(rgb, use_cube=False)
+                                  .astype(np.float32))
+
+
+def test_cube_skips_small_and_float_batches(rng, cubes):
+    small = cube_rgb(rng, color_engine.CUBE_MIN_SIZE - 1)
+    np.testing.assert_array_equal(color_engine.rgb_to_lab_batch(small),
+                                  color_engine.rgb_to_lab_batch(small, use_cube=False))
+    floats = cube_rgb(rng, color_engine.CUBE_MIN_SIZE * 2, np.float64)
+    np.testing.assert_array_equal(color_engine.rgb_to_xyz_batch(floats),
+                                  color_engine.rgb_to_xyz_batch(floats, use_cube=False))
+
+
+def test_cache_over_cube_matches_engine(rng, cubes):
+    cache = color_cache.ConversionCache(maxsize=1000)
+    palette = cube_rgb(rng, 3000)
+    for _ in range(3):
+        rgb = palette[rng.integers(0, len(palette), color_engine.CUBE_MIN_SIZE * 2)]
+        for model in color_cube.CUBE_MODELS:
+            exact = color_engine.convert(rgb, 'rgb', model)
+            np.testing.assert_allclose(cache.convert(rgb, 'rgb', model), exact, rtol=CUBE_RTOL, atol=1e-12)
+
+
+def test_fingerprint_tracks_builder():
+    assert color_cube.engine_fingerprint('lab') == color_cube.engine_fingerprint('lab')
+    assert color_cube.engine_fingerprint('lab') != color_cube.engine_fingerprint('xyz')
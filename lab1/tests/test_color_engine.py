@@ -0,0 +1,254 @@
+"""Движок против исходных методов ColorConverterApp из первой версии lab1.py"""
+import colorsys
+
+import numpy as np
+import pytest
+
+import color_engine
+
+
+# ---------------------------------------------------------------------------
+# Исходные формулы интерфейса (до выноса в color_engine), без изменений
+# ---------------------------------------------------------------------------
+
+def orig_rgb_to_cmyk(rgb):
+    r, g, b = rgb[0]/255.0, rgb[1]/255.0, rgb[2]/255.0
+    k = 1 - max(r, g, b)
+    if k == 1:
+        return [0.0, 0.0, 0.0, 100.0]
+    c = (1 - r - k) / (1 - k)
+    m = (1 - g - k) / (1 - k)
+    y = (1 - b - k) / (1 - k)
+    return [c*100, m*100, y*100, k*100]
+
+
+def orig_cmyk_to_rgb(cmyk):
+    c, m, y, k = cmyk[0]/100.0, cmyk[1]/100.0, cmyk[2]/100.0, cmyk[3]/100.0
+    r = 255 * (1 - c) * (1 - k)
+    g = 255 * (1 - m) * (1 - k)
+    b = 255 * (1 - y) * (1 - k)
+    return [int(max(0, min(255, r))),
+            int(max(0, min(255, g))),
+            int(max(0, min(255, b)))]
+
+
+def orig_rgb_to_hsv(rgb):
+    r, g, b = rgb[0]/255.0, rgb[1]/255.0, rgb[2]/255.0
+    h, s, v = colorsys.rgb_to_hsv(r, g, b)
+    return [h * 360, s * 100, v * 100]
+
+
+def orig_hsv_to_rgb(hsv):
+    h, s, v = hsv[0]/360.0, hsv[1]/100.0, hsv[2]/100.0
+    r, g, b = colorsys.hsv_to_rgb(h, s, v)
+    return [int(r * 255), int(g * 255), int(b * 255)]
+
+
+def orig_rgb_to_hls(rgb):
+    r, g, b = rgb[0]/255.0, rgb[1]/255.0, rgb[2]/255.0
+    h, l, s = colorsys.rgb_to_hls(r, g, b)
+    return [h * 360, l * 100, s * 100]
+
+
+def orig_hls_to_rgb(hls):
+    h, l, s = hls[0]/360.0, hls[1]/100.0, hls[2]/100.0
+    r, g, b = colorsys.hls_to_rgb(h, l, s)
+    return [int(r * 255), int(g * 255), int(b * 255)]
+
+
+def orig_rgb_to_xyz(rgb):
+    r, g, b = rgb[0]/255.0, rgb[1]/255.0, rgb[2]/255.0
+
+    r = r/12.92 if r <= 0.04045 else ((r + 0.055)/1.055) ** 2.4
+    g = g/12.92 if g <= 0.04045 else ((g + 0.055)/1.055) ** 2.4
+    b = b/12.92 if b <= 0.04045 else ((b + 0.055)/1.055) ** 2.4
+
+    x = r * 0.4124564 + g * 0.3575761 + b * 0.1804375
+    y = r * 0.2126729 + g * 0.7151522 + b * 0.0721750
+    z = r * 0.0193339 + g * 0.1191920 + b * 0.9503041
+
+    return [x * 100, y * 100, z * 100]
+
+
+def orig_xyz_to_rgb(xyz):
+    x, y, z = xyz[0]/100.0, xyz[1]/100.0, xyz[2]/100.0
+
+    r_linear = x * 3.2404542 + y * -1.5371385 + z * -0.4985314
+    g_linear = x * -0.9692660 + y * 1.8760108 + z * 0.0415560
+    b_linear = x * 0.0556434 + y * -0.2040259 + z * 1.0572252
+
+    r = 12.92 * r_linear if r_linear <= 0.0031308 else 1.055 * (r_linear ** (1/2.4)) - 0.055
+    g = 12.92 * g_linear if g_linear <= 0.0031308 else 1.055 * (g_linear ** (1/2.4)) - 0.055
+    b = 12.92 * b_linear if b_linear <= 0.0031308 else 1.055 * (b_linear ** (1/2.4)) - 0.055
+
+    return [int(max(0, min(255, r * 255))),
+            int(max(0, min(255, g * 255))),
+            int(max(0, min(255, b * 255)))]
+
+
+def orig_xyz_to_lab(xyz):
+    ref_x, ref_y, ref_z = 95.047, 100.000, 108.883
+    x, y, z = xyz[0] / ref_x, xyz[1] / ref_y, xyz[2] / ref_z
+
+    x = x ** (1/3) if x > 0.008856 else (7.787 * x) + (16/116)
+    y = y ** (1/3) if y > 0.008856 else (7.787 * y) + (16/116)
+    z = z ** (1/3) if z > 0.008856 else (7.787 * z) + (16/116)
+
+    l = max(0, min(100, (116 * y) - 16))
+    a = max(-128, min(127, 500 * (x - y)))
+    b = max(-128, min(127, 200 * (y - z)))
+
+    return [l, a, b]
+
+
+def orig_lab_to_xyz(lab):
+    ref_x, ref_y, ref_z = 95.047, 100.000, 108.883
+    l, a, b = lab[0], lab[1], lab[2]
+
+    y = (l + 16) / 116
+    x = a / 500 + y
+    z = y - b / 200
+
+    x3, y3, z3 = x ** 3, y ** 3, z ** 3
+
+    x = x3 if x3 > 0.008856 else (x - 16/116) / 7.787
+    y = y3 if y3 > 0.008856 else (y - 16/116) / 7.787
+    z = z3 if z3 > 0.008856 else (z - 16/116) / 7.787
+
+    return [x * ref_x, y * ref_y, z * ref_z]
+
+
+def orig_rgb_to_lab(rgb):
+    return orig_xyz_to_lab(orig_rgb_to_xyz(rgb))
+
+
+def orig_lab_to_rgb(lab):
+    return orig_xyz_to_rgb(orig_lab_to_xyz(lab))
+
+
+ORIGINAL = {
+    ('rgb', 'cmyk'): orig_rgb_to_cmyk, ('cmyk', 'rgb'): orig_cmyk_to_rgb,
+    ('rgb', 'hsv'): orig_rgb_to_hsv, ('hsv', 'rgb'): orig_hsv_to_rgb,
+    ('rgb', 'hls'): orig_rgb_to_hls, ('hls', 'rgb'): orig_hls_to_rgb,
+    ('rgb', 'xyz'): orig_rgb_to_xyz, ('xyz', 'rgb'): orig_xyz_to_rgb,
+    ('xyz', 'lab'): orig_xyz_to_lab, ('lab', 'xyz'): orig_lab_to_xyz,
+    ('rgb', 'lab'): orig_rgb_to_lab, ('lab', 'rgb'): orig_lab_to_rgb,
+}
+
+# Слитые ядра LAB считают кубический корень и матрицы в другом порядке
+LAB_TOLERANCE = 1e-9
+
+
+def sample_colors(model, rng, count=3000):
+    """Случайные цвета модели и края диапазонов"""
+    if model == 'rgb':
+        edges = [[0, 0, 0], [255, 255, 255], [255, 0, 0], [0, 255, 0], [0, 0, 255],
+                 [1, 1, 1], [10, 10, 10], [11, 11, 11], [254, 255, 0], [128, 128, 128]]
+        return np.vstack([edges, rng.integers(0, 256, (count, 3))]).astype(np.int64)
+    if model == 'cmyk':
+        edges = [[0, 0, 0, 0], [0, 0, 0, 100], [100, 100, 100, 0], [50, 0, 0, 50]]
+        return np.vstack([edges, rng.uniform(0, 100, (count, 4))])
+    if model in ('hsv', 'hls'):
+        edges = [[0, 0, 0], [0, 100, 100], [360, 100, 50], [359.9, 100, 100], [120, 50, 100],
+                 [60, 100, 50], [240, 0, 100]]
+        return np.vstack([edges, rng.uniform(0, [360, 100, 100], (count, 3))])
+    if model == 'xyz':
+        edges = [[0, 0, 0], list(color_engine.REF_WHITE), [0.1, 0.1, 0.1]]
+        return np.vstack([edges, rng.uniform(0, color_engine.REF_WHITE, (count, 3))])
+    edges = [[0, 0, 0], [100, 0, 0], [50, 127, -128], [8, 0, 0], [7.9, 0, 0], [100, -128, 127]]
+    return np.vstack([edges, rng.uniform([0, -128, -128], [100, 127, 127], (count, 3))])
+
+
+@pytest.mark.parametrize('pair', sorted(ORIGINAL))
+def test_scalar_matches_original(pair, rng):
+    src, dst = pair
+    func = color_engine.SCALAR_CONVERSIONS[pair]
+    lab_kernel = 'lab' in pair
+    for color in sample_colors(src, rng).tolist():
+        expected = ORIGINAL[pair](color)
+        got = func(color)
+        if dst == 'rgb' and not lab_kernel:
+            assert got == expected, color
+        elif dst == 'rgb':
+            # Значение формулы на границе уровня может уйти в соседний
+            assert np.abs(np.subtract(got, expected)).max() <= 1, color
+        else:
+            np.testing.assert_allclose(got, expected, rtol=0, atol=LAB_TOLERANCE if lab_kernel else 1e-12,
+                                       err_msg=str(color))
+
+
+@pytest.mark.parametrize('pair', sorted(color_engine.BATCH_CONVERSIONS))
+def test_batch_matches_scalar(pair, rng):
+    src, dst = pair
+    colors = sample_colors(src, rng)
+    batch = color_engine.BATCH_CONVERSIONS[pair](colors)
+    scalar = np.array([color_engine.SCALAR_CONVERSIONS[pair](c) for c in colors.tolist()])
+    assert batch.shape == scalar.shape
+    if dst == 'rgb':
+        assert batch.dtype == np.int64
+        if 'lab' in pair:
+            assert np.abs(batch - scalar).max() <= 1
+        else:
+            np.testing.assert_array_equal(batch, scalar)
+    elif 'lab' in pair:
+        np.testing.assert_allclose(batch, scalar, rtol=0, atol=LAB_TOLERANCE)
+    else:
+        np.testing.assert_array_equal(batch, scalar)
+
+
+def test_batch_keeps_leading_shape(rng):
+    rgb = rng.integers(0, 256, (4, 5, 3))
+    for dst in ('cmyk', 'hsv', 'lab'):
+        assert color_engine.convert(rgb, 'rgb', dst).shape == (4, 5, color_engine.CHANNELS[dst])
+    with pytest.raises(ValueError):
+        color_engine.convert(np.zeros((3, 4)), 'rgb', 'hsv')
+
+
+def test_convert_routes_through_rgb(rng):
+    hsv = sample_colors('hsv', rng, 200)
+    batch = color_engine.convert(hsv, 'hsv', 'cmyk')
+    scalar = np.array([color_engine.convert_color(c, 'hsv', 'cmyk') for c in hsv.tolist()])
+    np.testing.assert_array_equal(batch, scalar)
+
+
+def test_rgb_to_all_matches_scalar(rng):
+    rgb = sample_colors('rgb', rng, 500)
+    everything = color_engine.rgb_to_all_batch(rgb)
+    for model in color_engine.MODELS:
+        if model == 'rgb':
+            np.testing.assert_array_equal(everything['rgb'], rgb)
+            continue
+        scalar = np.array([color_engine.SCALAR_CONVERSIONS[('rgb', model)](c) for c in rgb.tolist()])
+        np.testing.assert_allclose(everything[model], scalar, rtol=0, atol=LAB_TOLERANCE)
+
+
+def test_linearize_table():
+    levels = np.repeat(np.arange(256)[:, None], 3, axis=1)
+    exact = [color_engine._srgb_to_linear(i / 255.0) for i in range(256)]
+    np.testing.assert_array_equal(color_engine.linearize_batch(levels)[:, 0], exact)
+    np.testing.assert_allclose(color_engine.linearize_batch(levels.astype(np.float64))[:, 0], exact,
+                               rtol=1e-15, atol=0)
+    assert [color_engine.linearize_channel(i) for i in range(256)] == exact
+
+
+def test_delinearize_table(rng):
+    linear = np.concatenate([rng.uniform(0, 1, 20000), np.linspace(0, 0.01, 2000), [0.0, 1.0, 1.5]])
+    exact = np.array([color_engine._linear_to_srgb(c) if c > color_engine.GAMMA_KNEE else 12.92 * c
+                      for c in linear])
+    # Заявленная погрешность интерполяции - 3e-4 уровня 8-битного канала
+    tolerance = 3e-4 / 255
+    np.testing.assert_allclose(color_engine.delinearize_batch(linear), exact, rtol=0, atol=tolerance)
+    np.testing.assert_allclose([color_engine.delinearize_channel(c) for c in linear], exact,
+                               rtol=0, atol=tolerance)
+
+
+def test_level_thresholds(rng):
+    """linear_to_level совпадает с int(формула * 255) с обрезкой, в том числе у порогов"""
+    thresholds = np.array(color_engine.SRGB_LEVEL_THRESHOLDS)
+    linear = np.concatenate([rng.uniform(-0.1, 1.1, 20000), thresholds,
+                             np.nextafter(thresholds, -np.inf), np.nextafter(thresholds, np.inf)])
+    for c in linear.tolist():
+        formula = 12.92 * c if c <= 0.0031308 else 1.055 * (c ** (1/2.4)) - 0.055
+        assert color_engine.linear_to_level(c) == int(max(0, min(255, formula * 255))), c
+    levels = color_engine.linear_to_rgb_batch(np.repeat(linear[:, None], 3, axis=1))[:, 0]
+    np.testing.assert_array_equal(levels, [color_engine.linear_to_level(c) for c in linear.tolist()])
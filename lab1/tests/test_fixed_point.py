@@ -0,0 +1,82 @@
+"""Целочисленные HSV/HLS против точных формул движка (оценки из документации модуля)"""
+import numpy as np
+import pytest
+
+import color_engine
+import fixed_point
+
+MODELS = {
+    'hsv': (fixed_point.rgb_to_hsv_fixed, fixed_point.hsv_fixed_to_rgb,
+            fixed_point.rgb_to_hsv_fixed_batch, fixed_point.hsv_fixed_to_rgb_batch,
+            color_engine.rgb_to_hsv_batch, color_engine.hsv_to_unit_rgb_batch),
+    'hls': (fixed_point.rgb_to_hls_fixed, fixed_point.hls_fixed_to_rgb,
+            fixed_point.rgb_to_hls_fixed_batch, fixed_point.hls_fixed_to_rgb_batch,
+            color_engine.rgb_to_hls_batch, color_engine.hls_to_unit_rgb_batch),
+}
+
+
+@pytest.fixture
+def rgb(rng):
+    edges = [[0, 0, 0], [255, 255, 255], [255, 0, 0], [0, 255, 0], [0, 0, 255], [255, 255, 0],
+             [1, 0, 0], [254, 255, 255], [128, 127, 128], [0, 1, 255]]
+    return np.vstack([edges, rng.integers(0, 256, (20000, 3))]).astype(np.uint8)
+
+
+@pytest.mark.parametrize('bits', sorted(fixed_point.FORMATS))
+@pytest.mark.parametrize('model', sorted(MODELS))
+def test_error_bounds(rgb, model, bits):
+    _, _, forward, inverse, exact_forward, exact_inverse = MODELS[model]
+    hue_range, full = fixed_point._scales(bits)
+    fixed = forward(rgb, bits)
+    assert fixed.dtype == fixed_point.FORMATS[bits]
+
+    exact = exact_forward(rgb) * np.array([hue_range / 360.0, full / 100.0, full / 100.0])
+    diff = np.abs(fixed - exact)
+    diff[:, 0] = np.minimum(diff[:, 0], hue_range - diff[:, 0])
+    assert diff.max() <= 0.5 + 1e-9
+    if model == 'hsv':
+        np.testing.assert_array_equal(fixed[:, 2], np.rint(exact[:, 2]))
+
+    back = inverse(fixed, bits)
+    assert back.dtype == np.uint8
+    unit = exact_inverse(fixed_point.to_float(fixed, bits)) * 255
+    assert np.abs(back - unit).max() <= 0.5 + 1e-9
+    roundtrip = np.abs(back.astype(np.int64) - rgb).max()
+    assert roundtrip <= fixed_point.ROUNDTRIP_ERROR[(model, bits)]
+
+
+@pytest.mark.parametrize('bits', sorted(fixed_point.FORMATS))
+@pytest.mark.parametrize('model', sorted(MODELS))
+def test_scalar_matches_batch(rgb, model, bits):
+    scalar_forward, scalar_inverse, forward, inverse = MODELS[model][:4]
+    sample = rgb[:2000]
+    fixed = forward(sample, bits)
+    assert [scalar_forward(c, bits) for c in sample.tolist()] == [tuple(c) for c in fixed.tolist()]
+    back = inverse(fixed, bits)
+    assert [scalar_inverse(c, bits) for c in fixed.tolist()] == [tuple(c) for c in back.tolist()]
+
+
+def test_batch_shapes_and_chunks(rgb, monkeypatch):
+    monkeypatch.setattr(fixed_point, 'CHUNK', 777)
+    image = rgb[:20000].reshape(100, 200, 3)
+    hls = fixed_point.rgb_to_hls_fixed_batch(image)
+    assert hls.shape == (100, 200, 3)
+    np.testing.assert_array_equal(hls.reshape(-1, 3), fixed_point.rgb_to_hls_fixed_batch(rgb[:20000]))
+    with pytest.raises(ValueError):
+        fixed_point.rgb_to_hsv_fixed_batch(image, bits=12)
+
+
+def test_float_conversion(rng):
+    for bits in fixed_point.FORMATS:
+        fixed = rng.integers(0, 1 << bits, (1000, 3)).astype(fixed_point.FORMATS[bits])
+        np.testing.assert_array_equal(fixed_point.from_float(fixed_point.to_float(fixed, bits), bits), fixed)
+    # 360° - полный круг, то есть снова 0
+    np.testing.assert_array_equal(fixed_point.from_float([[360, 100, 0]]), [[0, 255, 0]])
+
+
+def test_verify_report():
+    report = fixed_point.verify(8, step=15)
+    for model in MODELS:
+        assert max(report[model]['forward_units']) <= 0.5 + 1e-9
+        assert report[model]['inverse_levels'] <= 0.5 + 1e-9
+        assert report[model]['roundtrip_levels'] <= fixed_point.ROUNDTRIP_ERROR[(model, 8)]
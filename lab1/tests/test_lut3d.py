@@ -0,0 +1,72 @@
+"""3D LUT: трилинейная интерполяция против развёрнутой таблицы"""
+import numpy as np
+import pytest
+
+import lut3d
+
+
+@pytest.fixture(scope='module')
+def lut():
+    steps = [lut3d.Adjustment.parse(text) for text in ('hsv.h+40', 'hsv.s*1.3', 'lab.l*0.9')]
+    return lut3d.build_lut(lut3d.pipeline(steps), 17)
+
+
+@pytest.fixture(scope='module')
+def table(lut):
+    return lut3d.dense_table(lut)
+
+
+def test_identity_lut(rng):
+    lut = lut3d.build_lut(lambda rgb: rgb, 17)
+    rgb = rng.integers(0, 256, (5000, 3)).astype(np.uint8)
+    np.testing.assert_allclose(lut3d.apply_lut(rgb, lut), rgb, atol=1e-3)
+
+
+def test_nodes_are_exact(lut):
+    nodes = lut3d.identity_grid(17).reshape(-1, 3)
+    result = lut3d.apply_lut(nodes, lut)
+    np.testing.assert_allclose(result, lut.reshape(-1, 3) * 255, rtol=1e-5, atol=1e-3)
+
+
+def test_integer_and_float_paths_agree(rng, lut):
+    rgb = rng.integers(0, 256, (20000, 3))
+    np.testing.assert_allclose(lut3d.apply_lut(rgb.astype(np.uint8), lut),
+                               lut3d.apply_lut(rgb.astype(np.float64), lut), rtol=0, atol=1e-3)
+
+
+def test_dense_table_matches_trilinear(rng, lut, table):
+    rgb = np.vstack([rng.integers(0, 256, (200000, 3)),
+                     [[0, 0, 0], [255, 255, 255], [255, 0, 0], [15, 16, 17]]]).astype(np.uint8)
+    trilinear = lut3d.apply_lut(rgb, lut)
+    dense = lut3d.apply_table(rgb, table)
+    assert dense.dtype == np.uint8
+    # Таблица хранит округлённое значение той же интерполяции, посчитанной по осям
+    assert np.abs(dense - trilinear).max() <= 0.5 + 1e-3
+    assert np.abs(dense.astype(np.int64) - np.rint(trilinear)).max() <= 1
+
+
+def test_apply_to_image(rng, lut, table):
+    image = rng.integers(0, 256, (40, 60, 3)).astype(np.uint8)
+    direct = lut3d.apply_to_image(image, lut)
+    assert direct.shape == image.shape and direct.dtype == np.uint8
+    np.testing.assert_array_equal(direct, np.rint(lut3d.apply_lut(image, lut)).astype(np.uint8))
+    assert np.abs(lut3d.apply_to_image(image, lut, table).astype(np.int64) - direct).max() <= 1
+    with pytest.raises(ValueError):
+        lut3d.apply_table(image.astype(np.int64), table)
+
+
+def test_cube_file_roundtrip(tmp_path, lut):
+    path = lut3d.save_cube(lut, tmp_path / 'grade.cube', title='test')
+    np.testing.assert_allclose(lut3d.load_cube(path), lut, atol=1e-6)
+
+
+def test_adjustment_parse():
+    step = lut3d.Adjustment.parse('HSV.h+30')
+    assert (step.model, step.channel, step.op, step.amount) == ('hsv', 0, '+', 30.0)
+    assert str(lut3d.Adjustment.parse('lab.l*1.1')) == 'lab.l*1.1'
+    values = np.array([[350.0, 50, 50]])
+    step.apply(values)
+    np.testing.assert_allclose(values, [[20, 50, 50]])
+    for text in ('hsv.x+1', 'foo.a+1', 'hsv.h^2'):
+        with pytest.raises(ValueError):
+            lut3d.Adjustment.parse(text)
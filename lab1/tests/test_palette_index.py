@@ -0,0 +1,97 @@
+"""Поиск по палитре против перебора всех цветов"""
+import numpy as np
+import pytest
+
+import color_engine
+import palette_index
+from palette_index import PaletteIndex, delta_e76, delta_e2000, de76_per_de2000
+
+
+def brute_force(index, lab, k, metric):
+    """k наименьших расстояний до всех цветов палитры"""
+    distance = delta_e76 if metric == 'de76' else delta_e2000
+    return np.sort(distance(lab[:, None, :], index.lab[None, :, :]), axis=1)[:, :k]
+
+
+def assert_same_neighbours(index, lab, k, metric, **kwargs):
+    dist, found = index.query_lab_batch(lab, k, metric, **kwargs)
+    expected_dist = brute_force(index, lab, k, metric)
+    np.testing.assert_allclose(dist, expected_dist, rtol=1e-12, atol=1e-12)
+    # Индексы могут отличаться только у равноудалённых цветов (повторы в палитре),
+    # поэтому проверяются расстояния до найденных цветов и отсутствие повторов
+    distance = delta_e76 if metric == 'de76' else delta_e2000
+    np.testing.assert_allclose(distance(lab[:, None, :], index.lab[found]), expected_dist,
+                               rtol=1e-12, atol=1e-12)
+    assert all(len(set(row)) == len(row) for row in found.tolist())
+
+
+def random_lab(rng, count):
+    return color_engine.rgb_to_lab_batch(rng.integers(0, 256, (count, 3)))
+
+
+@pytest.mark.parametrize('metric', palette_index.METRICS)
+@pytest.mark.parametrize('size, k', [(1, 1), (7, 5), (300, 3), (5000, 1), (5000, 5)])
+def test_matches_brute_force(rng, metric, size, k):
+    index = PaletteIndex(rng.integers(0, 256, (size, 3)))
+    assert_same_neighbours(index, random_lab(rng, 400), k, metric)
+
+
+def test_de2000_pool_growth(rng):
+    """Маленький начальный пул: точность достигается расширением, а не перебором"""
+    index = PaletteIndex(rng.integers(0, 256, (6000, 3)))
+    assert len(index) > palette_index.DE2000_BRUTE_FORCE
+    lab = np.vstack([random_lab(rng, 300),
+                     [[50, 120, -120], [0, 0, 0], [100, 0, 0], [60, -100, 100], [30, 60, 60]]])
+    assert_same_neighbours(index, lab, 4, 'de2000', candidates=4)
+
+
+def test_clustered_palette(rng):
+    """Палитра в узкой области и запросы далеко от неё"""
+    centre = rng.integers(100, 140, (1, 3))
+    palette = np.clip(centre + rng.integers(-20, 21, (4000, 3)), 0, 255)
+    index = PaletteIndex(palette)
+    lab = np.vstack([random_lab(rng, 200), [[0, 0, 0], [100, 0, 0], [50, -128, 127], [50, 127, -128]]])
+    for metric in palette_index.METRICS:
+        assert_same_neighbours(index, lab, 3, metric)
+
+
+def test_de76_per_de2000_bound(rng):
+    a = rng.uniform([0, -128, -128], [100, 127, 127], (200000, 3))
+    # Половина пар - близкие цвета: там ΔE2000 сильнее всего отличается от ΔE76
+    b = np.where(rng.random((len(a), 1)) < 0.5, a + rng.normal(0, 3, a.shape),
+                 rng.uniform([0, -128, -128], [100, 127, 127], a.shape))
+    ratio = delta_e76(a, b) / np.maximum(delta_e2000(a, b), 1e-300)
+    bound = de76_per_de2000(a, np.abs(b[:, 0] - 50), np.hypot(b[:, 1], b[:, 2]))
+    assert (ratio <= bound).all()
+
+
+def test_query_rgb_and_errors(rng):
+    palette = rng.integers(0, 256, (50, 3))
+    index = PaletteIndex(palette, names=[f'c{i}' for i in range(50)])
+    (first, distance), = index.query(palette[7].tolist())
+    assert distance == 0 or (palette[first] == palette[7]).all()
+    with pytest.raises(ValueError):
+        index.query_batch(palette, metric='cie94')
+    with pytest.raises(ValueError):
+        index.query_batch(palette, k=0)
+    with pytest.raises(ValueError):
+        PaletteIndex(np.zeros((0, 3)))
+
+
+def test_delta_e2000_reference_pairs():
+    """Контрольные пары из статьи Sharma, Wu, Dalal (2005)"""
+    pairs = np.array([
+        [[50.0000, 2.6772, -79.7751], [50.0000, 0.0000, -82.7485], 2.0425],
+        [[50.0000, -1.3802, -84.2814], [50.0000, 0.0000, -82.7485], 1.0000],
+        [[50.0000, 0.0000, 0.0000], [50.0000, -1.0000, 2.0000], 2.3669],
+        [[50.0000, 2.4900, -0.0010], [50.0000, -2.4900, 0.0009], 7.1792],
+        [[50.0000, 2.5000, 0.0000], [73.0000, 25.0000, -18.0000], 27.1492],
+        [[60.2574, -34.0099, 36.2677], [60.4626, -34.1751, 39.4387], 1.2644],
+        [[22.7233, 20.0904, -46.6940], [23.0331, 14.9730, -42.5619], 2.0373],
+        [[90.9257, -0.5406, -0.9208], [88.6381, -0.8985, -0.7239], 1.5381],
+        [[2.0776, 0.0795, -1.1350], [0.9033, -0.0636, -0.5514], 0.9082],
+    ], dtype=object)
+    lab1 = np.array(pairs[:, 0].tolist())
+    lab2 = np.array(pairs[:, 1].tolist())
+    np.testing.assert_allclose(delta_e2000(lab1, lab2), pairs[:, 2].astype(float), atol=5e-5)
+    np.testing.assert_allclose(delta_e2000(lab2, lab1), pairs[:, 2].astype(float), atol=5e-5)
@@ -0,0 +1,15 @@
+import numpy as np
+
+
+def ppm_bytes(rgb) -> bytes:
+    """Массив (H, W, 3) uint8 в двоичном PPM (P6), который Tk читает без PIL"""
+    rgb = np.ascontiguousarray(rgb, dtype=np.uint8)
+    if rgb.ndim != 3 or rgb.shape[2] != 3:
+        raise ValueError(f"Ожидался массив (H, W, 3), получено {rgb.shape}")
+    height, width = rgb.shape[:2]
+    return b'P6 %d %d 255\n' % (width, height) + rgb.tobytes()
+
+
+def put_array(photo, rgb) -> None:
+    """Заменить содержимое PhotoImage целиком одним вызовом Tk"""
+    photo.configure(data=ppm_bytes(rgb), format='PPM')
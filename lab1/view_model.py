@@ -0,0 +1,76 @@
+from typing import Any, Dict
+
+
+class ViewModel:
+    """Последние отрисованные значения виджетов.
+
+    Обращение к Tk выполняется только для значений, которые отличаются от уже
+    показанных; счётчики показывают, сколько вызовов Tk сделано и сколько
+    сэкономлено.
+    """
+
+    def __init__(self):
+        self.rendered: Dict[Any, Any] = {}
+        self.tk_calls = 0
+        self.tk_calls_saved = 0
+
+    def _changed(self, widget, value, calls: int) -> bool:
+        if widget in self.rendered and self.rendered[widget] == value:
+            self.tk_calls_saved += calls
+            return False
+        self.rendered[widget] = value
+        self.tk_calls += calls
+        return True
+
+    def set_entry(self, entry, text: str) -> None:
+        if self._changed(entry, text, 2):
+            entry.delete(0, 'end')
+            entry.insert(0, text)
+
+    def set_label(self, label, text: str) -> None:
+        if self._changed(label, text, 1):
+            label.config(text=text)
+
+    def set_scale(self, scale, value) -> None:
+        if self._changed(scale, value, 1):
+            scale.set(value)
+
+    def set_item_fill(self, canvas, item, color: str) -> None:
+        if self._changed((canvas, item), color, 1):
+            canvas.itemconfig(item, fill=color)
+
+    def last_value(self, widget, default=None):
+        return self.rendered.get(widget, default)
+
+    def remember(self, widget, value) -> None:
+        """Значение уже показано пользователем (например, слайдер сдвинут мышью)"""
+        self.rendered[widget] = value
+
+    def invalidate(self, widget=None) -> None:
+        """Забыть показанное значение: виджет изменён в обход модели"""
+        if widget is None:
+            self.rendered.clear()
+        else:
+            self.rendered.pop(widget, None)
+
+    def track_user_edits(self, entry) -> None:
+        """Ручной ввод в поле делает запомненное значение недостоверным"""
+        for sequence in ('<Key>', '<<Increment>>', '<<Decrement>>', '<<Paste>>', '<<Cut>>'):
+            entry.bind(sequence, lambda e: self.invalidate(entry), add='+')
+
+    def reset_stats(self) -> None:
+        self.tk_calls = 0
+        self.tk_calls_saved = 0
+
+    def stats(self) -> Dict[str, float]:
+        total = self.tk_calls + self.tk_calls_saved
+        return {
+            'tk_calls': self.tk_calls,
+            'tk_calls_saved': self.tk_calls_saved,
+            'saved_ratio': self.tk_calls_saved / total if total else 0.0,
+        }
+
+    def summary(self) -> str:
+        stats = self.stats()
+        return (f"Вызовов Tk: {stats['tk_calls']}, сэкономлено: {stats['tk_calls_saved']} "
+                f"({stats['saved_ratio']:.0%})")
@@ -4,34 +4,31 @@ from PIL import Image, ImageFile, ImageTk
 import os
 from pathlib import Path
 import time
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterator
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import threading
 
+import image_headers
+
 ImageFile.LOAD_TRUNCATED_IMAGES = True
 
+DEFAULT_WORKERS = os.cpu_count() or 1
+# Файлов в одной задаче пула: меньше обменов между процессами и вызовов Tk
+SCAN_BATCH = 32
+
 class ImageMetadataExtractor:
     @staticmethod
     def get_basic_info(file_path: str) -> Dict[str, Any]:
         try:
+            # Обычно хватает заголовка файла; необычные файлы открывает Pillow.
+            # Слишком большие изображения Pillow отклоняет, и ошибку для них тоже даёт он
+            header = image_headers.read_header(file_path)
+            limit = Image.MAX_IMAGE_PIXELS
+            if header is not None and (limit is None or header.width * header.height <= 2 * limit):
+                return ImageMetadataExtractor._collect_info(header, file_path)
             with Image.open(file_path) as img:
-                info = {
-                    'filename': os.path.basename(file_path),
-                    'format': img.format or 'Unknown',
-                    'size_pixels': f"{img.width} × {img.height}",
-                    'width': img.width,
-                    'height': img.height,
-                    'mode': img.mode,
-                    'color_depth': ImageMetadataExtractor._get_color_depth(img),
-                    'dpi': ImageMetadataExtractor._get_dpi(img),
-                    'compression': ImageMetadataExtractor._get_compression(img),
-                    'file_size': f"{os.path.getsize(file_path) / 1024:.1f} KB",
-                    'path': file_path,
-                    'additional_info': {}
-                }
-                
-                info['additional_info'] = ImageMetadataExtractor._get_additional_info(img, file_path)
-                return info
+                return ImageMetadataExtractor._collect_info(img, file_path)
         except Exception as e:
             return {
                 'filename': os.path.basename(file_path),
@@ -43,6 +40,27 @@ class ImageMetadataExtractor:
                 'path': file_path
             }
     
+    @staticmethod
+    def _collect_info(img, file_path: str) -> Dict[str, Any]:
+        """Сводка по открытому изображению Pillow или по image_headers.ImageHeader"""
+        info = {
+            'filename': os.path.basename(file_path),
+            'format': img.format or 'Unknown',
+            'size_pixels': f"{img.width} × {img.height}",
+            'width': img.width,
+            'height': img.height,
+            'mode': img.mode,
+            'color_depth': ImageMetadataExtractor._get_color_depth(img),
+            'dpi': ImageMetadataExtractor._get_dpi(img),
+            'compression': ImageMetadataExtractor._get_compression(img),
+            'file_size': f"{os.path.getsize(file_path) / 1024:.1f} KB",
+            'path': file_path,
+            'additional_info': {}
+        }
+        
+        info['additional_info'] = ImageMetadataExtractor._get_additional_info(img, file_path)
+        return info
+    
     @staticmethod
     def _get_color_depth(img: Image.Image) -> str:
         bits_per_pixel = {
@@ -129,7 +147,7 @@ class ImageMetadataExtractor:
         if progressive is not None:
             info['Прогрессивный'] = "Да" if progressive else "Нет"
         
-        exif = img._getexif()
+        exif = img.exif if isinstance(img, image_headers.ImageHeader) else img._getexif()
         if exif:
             info['EXIF тегов'] = len(exif)
             
@@ -154,18 +172,23 @@ class ImageMetadataExtractor:
     def _get_gif_info(img: Image.Image) -> Dict[str, Any]:
         info = {}
         
-        try:
-            frame_count = 0
-            while True:
-                frame_count += 1
-                img.seek(frame_count)
-        except EOFError:
-            info['Количество кадров'] = frame_count
-        
-        if img.mode == 'P':
-            palette = img.getpalette()
-            if palette:
-                info['Цветов в палитре'] = len(palette) // 3
+        if isinstance(img, image_headers.ImageHeader):
+            info['Количество кадров'] = img.frames
+            if img.palette_colors:
+                info['Цветов в палитре'] = img.palette_colors
+        else:
+            try:
+                frame_count = 0
+                while True:
+                    frame_count += 1
+                    img.seek(frame_count)
+            except EOFError:
+                info['Количество кадров'] = frame_count
+            
+            if img.mode == 'P':
+                palette = img.getpalette()
+                if palette:
+                    info['Цветов в палитре'] = len(palette) // 3
         
         duration = img.info.get('duration')
         if duration:
@@ -221,6 +244,34 @@ class ImageMetadataExtractor:
         info['Формат'] = 'PCX (ZSoft Paintbrush)'
         return info
 
+def _extract_batch(paths: List[str]) -> List[Dict[str, Any]]:
+    return [ImageMetadataExtractor.get_basic_info(path) for path in paths]
+
+def scan_files(image_files: List[str], workers: int = DEFAULT_WORKERS, use_processes: bool = True,
+               ordered: bool = True, batch_size: int = SCAN_BATCH) -> Iterator[List[Dict[str, Any]]]:
+    """Метаданные файлов пакетами по batch_size в пуле процессов или потоков.
+    
+    ordered=True - пакеты идут в порядке списка файлов, иначе по мере готовности,
+    и медленный файл не задерживает вывод остальных.
+    """
+    batches = [image_files[i:i + batch_size] for i in range(0, len(image_files), batch_size)]
+    if workers <= 1:
+        for batch in batches:
+            yield _extract_batch(batch)
+        return
+    
+    executor = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    pool = executor(max_workers=workers)
+    try:
+        if ordered:
+            yield from pool.map(_extract_batch, batches)
+        else:
+            futures = [pool.submit(_extract_batch, batch) for batch in batches]
+            for future in as_completed(futures):
+                yield future.result()
+    finally:
+        pool.shutdown(cancel_futures=True)
+
 class ImageAnalyzerApp:
     def __init__(self, root):
         self.root = root
@@ -231,6 +282,9 @@ class ImageAnalyzerApp:
         self.all_results = []
         self.image_extensions = {'.jpg', '.jpeg', '.gif', '.tif', '.tiff', '.bmp', '.png', '.pcx'}
         self.extractor = ImageMetadataExtractor()
+        self.workers = tk.IntVar(value=DEFAULT_WORKERS)
+        self.use_processes = tk.BooleanVar(value=True)
+        self.ordered = tk.BooleanVar(value=True)
         
         self.setup_styles()
         self.create_widgets()
@@ -313,6 +367,12 @@ class ImageAnalyzerApp:
         
         ttk.Button(top_frame, text="Начать обработку", command=self.start_folder_processing).pack(side=tk.RIGHT, padx=5)
         
+        ttk.Checkbutton(top_frame, text="По порядку", variable=self.ordered).pack(side=tk.RIGHT, padx=5)
+        ttk.Radiobutton(top_frame, text="Потоки", variable=self.use_processes, value=False).pack(side=tk.RIGHT)
+        ttk.Radiobutton(top_frame, text="Процессы", variable=self.use_processes, value=True).pack(side=tk.RIGHT)
+        ttk.Spinbox(top_frame, from_=1, to=256, width=4, textvariable=self.workers).pack(side=tk.RIGHT, padx=5)
+        ttk.Label(top_frame, text="Исполнителей:").pack(side=tk.RIGHT)
+        
         self.progress_frame = ttk.Frame(self.folder_frame)
         self.progress_frame.pack(fill=tk.X, pady=5)
         
@@ -453,33 +513,41 @@ class ImageAnalyzerApp:
         self.progress_bar['maximum'] = len(image_files)
         self.progress_bar['value'] = 0
         
-        thread = threading.Thread(target=self.process_folder_files, args=(image_files,))
+        try:
+            workers = max(1, self.workers.get())
+        except tk.TclError:
+            workers = DEFAULT_WORKERS
+        
+        thread = threading.Thread(target=self.process_folder_files,
+                                  args=(image_files, workers, self.use_processes.get(), self.ordered.get()))
         thread.daemon = True
         thread.start()
     
-    def process_folder_files(self, image_files):
+    def process_folder_files(self, image_files, workers=DEFAULT_WORKERS, use_processes=True, ordered=True):
         start_time = time.time()
         self.all_results = []
+        done = 0
         
-        for i, file_path in enumerate(image_files):
-            if i % 10 == 0:
-                self.root.after(0, self.update_progress, i, len(image_files), os.path.basename(file_path))
-            
-            info = self.extractor.get_basic_info(file_path)
-            self.all_results.append(info)
+        for infos in scan_files(image_files, workers, use_processes, ordered):
+            self.all_results.extend(infos)
+            done += len(infos)
             
-            status = 'OK' if 'error' not in info else 'Ошибка'
-            values = (
-                os.path.basename(file_path),
-                info.get('size_pixels', 'N/A'),
-                info.get('dpi', 'N/A'),
-                info.get('color_depth', 'N/A'),
-                info.get('compression', 'N/A'),
-                info.get('format', 'N/A'),
-                status
-            )
+            rows = []
+            for info in infos:
+                status = 'OK' if 'error' not in info else 'Ошибка'
+                values = (
+                    info['filename'],
+                    info.get('size_pixels', 'N/A'),
+                    info.get('dpi', 'N/A'),
+                    info.get('color_depth', 'N/A'),
+                    info.get('compression', 'N/A'),
+                    info.get('format', 'N/A'),
+                    status
+                )
+                rows.append((values, status))
             
-            self.root.after(0, self.add_tree_item, values, status)
+            self.root.after(0, self.add_tree_items, rows)
+            self.root.after(0, self.update_progress, done, len(image_files), infos[-1]['filename'])
         
         processing_time = time.time() - start_time
         
@@ -490,10 +558,11 @@ class ImageAnalyzerApp:
         self.progress_label.config(text=f"Обработано: {current}/{total} ({filename})")
         self.status_label.config(text=f"Обработка... {current}/{total}")
     
-    def add_tree_item(self, values, status):
-        item = self.results_tree.insert('', 'end', values=values)
-        if status == 'Ошибка':
-            self.results_tree.item(item, tags=('error',))
+    def add_tree_items(self, rows):
+        for values, status in rows:
+            item = self.results_tree.insert('', 'end', values=values)
+            if status == 'Ошибка':
+                self.results_tree.item(item, tags=('error',))
         
         self.results_tree.tag_configure('error', foreground='red')
     
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Модули лабораторной импортируются плоско, как в lab2.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
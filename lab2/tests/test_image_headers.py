@@ -0,0 +1,163 @@
+"""read_header против Image.open на файлах, созданных Pillow"""
+import io
+import struct
+import warnings
+import zlib
+
+import pytest
+from PIL import Image
+from PIL.TiffImagePlugin import IFDRational
+
+import image_headers
+from lab2 import ImageMetadataExtractor
+
+# Ключи info, которые читает анализатор
+INFO_KEYS = ('dpi', 'compression', 'progressive', 'quality', 'duration', 'gamma')
+
+
+def gradient(mode='RGB', size=(37, 23)):
+    im = Image.linear_gradient('L').resize(size)
+    if mode == 'L':
+        return im
+    im = Image.merge('RGB', (im, im.rotate(90), im.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    if mode == 'I;16':
+        return gradient('L', size).convert('I;16')
+    return im if mode == 'RGB' else im.convert(mode)
+
+
+def camera_exif():
+    exif = Image.Exif()
+    exif[271], exif[272], exif[274], exif[306] = 'Canon', 'EOS 5D', 6, '2024:01:01 10:00:00'
+    exif[282] = exif[283] = IFDRational(300, 1)
+    exif[296] = 2
+    sub = exif.get_ifd(0x8769)
+    sub[33434], sub[33437] = IFDRational(1, 125), IFDRational(28, 10)
+    sub[34855], sub[36867] = 400, '2024:01:01 10:00:00'
+    return exif
+
+
+def png_with_chunks():
+    buf = io.BytesIO()
+    gradient().save(buf, 'PNG')
+    data = buf.getvalue()
+
+    def chunk(kind, body):
+        return struct.pack('>I', len(body)) + kind + body + struct.pack('>I', zlib.crc32(kind + body))
+    # gAMA и tEXt сразу после IHDR
+    return data[:33] + chunk(b'gAMA', struct.pack('>I', 45455)) + chunk(b'tEXt', b'a\0b') + data[33:]
+
+
+def corpus():
+    """(имя, функция записи в путь) для поддерживаемых форматов и режимов"""
+    files = []
+
+    def add(name, image, **params):
+        files.append((name, lambda path: image.save(path, **params)))
+
+    for mode in ('RGB', 'L', 'CMYK'):
+        add(f'{mode}.jpg', gradient(mode))
+        add(f'{mode}_progressive.jpg', gradient(mode), progressive=True, dpi=(150, 150))
+        add(f'{mode}_exif.jpg', gradient(mode), exif=camera_exif(), dpi=(96, 96))
+    add('low_quality.jpg', gradient(), quality=20, subsampling=0)
+    for mode in ('1', 'L', 'LA', 'RGB', 'RGBA', 'P', 'I;16'):
+        add(f'{mode}.png', gradient(mode))
+        add(f'{mode}_dpi.png', gradient(mode), dpi=(72.5, 300))
+    add('p2bit.png', gradient().convert('P', palette=Image.Palette.ADAPTIVE, colors=4), bits=2)
+    add('transparent.png', gradient().convert('P', palette=Image.Palette.ADAPTIVE, colors=16), transparency=0)
+    files.append(('gamma.png', lambda path: path.write_bytes(png_with_chunks())))
+    for mode in ('P', 'L', '1'):
+        add(f'{mode}.gif', gradient().convert(mode), duration=120)
+    frames = [gradient().rotate(angle).convert('P') for angle in (0, 10, 20)]
+    add('anim.gif', frames[0], save_all=True, append_images=frames[1:], duration=[100, 200, 300], loop=0)
+    add('anim_disposal.gif', frames[0], save_all=True, append_images=frames[1:], duration=50,
+        transparency=0, disposal=2)
+    for mode in ('1', 'L', 'P', 'RGB', 'RGBA'):
+        add(f'{mode}.bmp', gradient().convert(mode), dpi=(200, 100))
+    for mode in ('1', 'L', 'LA', 'P', 'RGB', 'RGBA', 'CMYK'):
+        image = gradient(mode)
+        for compression in (None, 'tiff_lzw', 'packbits', 'tiff_deflate'):
+            add(f'{mode}_{compression}.tif', image, compression=compression)
+    add('dpi.tif', gradient(), dpi=(300, 300))
+    add('cm.tif', gradient(), resolution=118.11, resolution_unit='cm')
+    add('jpeg.tif', gradient(), compression='jpeg')
+    add('group4.tif', gradient('1'), compression='group4')
+    add('tags.tif', gradient(), tiffinfo={306: '2024:01:01 10:00:00', 274: 6})
+    for mode in ('1', 'L', 'P', 'RGB'):
+        add(f'{mode}.pcx', gradient().convert(mode))
+    return files
+
+
+CORPUS = corpus()
+
+
+@pytest.fixture(scope='module')
+def files(tmp_path_factory):
+    root = tmp_path_factory.mktemp('images')
+    paths = {}
+    for name, write in CORPUS:
+        path = root / name
+        write(path)
+        paths[name] = path
+    return paths
+
+
+def plain(value):
+    """Значение для сравнения: кортежи, рациональные и вложенные словари - как строки"""
+    if isinstance(value, dict):
+        return {key: plain(item) for key, item in value.items()}
+    return str(value)
+
+
+@pytest.mark.parametrize('name', [name for name, _ in CORPUS])
+def test_header_matches_pillow(files, name):
+    path = files[name]
+    header = image_headers.read_header(path)
+    assert header is not None, "файл должен читаться по заголовку"
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        with Image.open(path) as img:
+            assert (header.format, header.width, header.height, header.mode) == \
+                (img.format, img.width, img.height, img.mode)
+            # Анализатор перебирает кадры GIF, и info берётся после перебора
+            expected = ImageMetadataExtractor._collect_info(img, str(path))
+            for key in INFO_KEYS:
+                assert plain(header.info.get(key)) == plain(img.info.get(key)), key
+            if img.format == 'JPEG':
+                assert plain(header.exif or {}) == plain(img._getexif() or {})
+            if img.format == 'TIFF':
+                assert plain(header.tag) == plain(dict(img.tag))
+            if img.format == 'GIF':
+                assert header.frames == img.n_frames
+    assert plain(ImageMetadataExtractor._collect_info(header, str(path))) == plain(expected)
+
+
+def test_get_basic_info_uses_header(files, monkeypatch):
+    def refuse(*args, **kwargs):
+        raise AssertionError("Image.open не должен вызываться")
+    path = str(files['RGB_exif.jpg'])
+    with Image.open(path) as img:
+        expected = ImageMetadataExtractor._collect_info(img, path)
+    monkeypatch.setattr(Image, 'open', refuse)
+    assert plain(ImageMetadataExtractor.get_basic_info(path)) == plain(expected)
+
+
+def test_unsupported_files_fall_back(tmp_path):
+    gradient().save(tmp_path / 'image.webp')
+    gradient().save(tmp_path / 'image.ppm')
+    gradient().save(tmp_path / 'big.tif', big_tiff=True)
+    # Режимы пикселей, которые read_header оставляет Pillow
+    gradient('I;16').save(tmp_path / 'i16.tif')
+    gradient().convert('F').save(tmp_path / 'float.tif', compression='tiff_lzw')
+    frames = [gradient(), gradient().rotate(5)]
+    frames[0].save(tmp_path / 'mpo.jpg', format='MPO', save_all=True, append_images=frames[1:])
+    buf = io.BytesIO()
+    gradient().save(buf, 'PNG')
+    (tmp_path / 'truncated.png').write_bytes(buf.getvalue()[:30])
+    (tmp_path / 'junk.jpg').write_bytes(b'\xff\xd8\xff\x00garbage')
+    (tmp_path / 'empty.gif').write_bytes(b'GIF89a' + b'\x05\x00\x05\x00\x00\x00\x00;')
+    (tmp_path / 'text.txt').write_text('not an image')
+    for path in sorted(tmp_path.iterdir()):
+        assert image_headers.read_header(path) is None, path.name
+    assert image_headers.read_header(tmp_path / 'missing.png') is None
+    info = ImageMetadataExtractor.get_basic_info(str(tmp_path / 'image.webp'))
+    assert info['format'] == 'WEBP' and 'error' not in info